@@ -1,18 +1,17 @@
 """
 Pacote de agentes do sistema Clima.AI
 """
-from .question_classifier import QuestionClassifierAgent, QuestionType
 from .station_identifier import StationIdentifierAgent
 from .climate_data import ClimateDataAgent
 from .llm_analysis import LLMAnalysisAgent
-from .request_collector import RequestCollectorAgent, DataType
+from .request_collector import RequestCollectorAgent, DataType, RequestIntent, ClimateRequest
 
 __all__ = [
-    'QuestionClassifierAgent',
-    'QuestionType',
     'StationIdentifierAgent',
     'ClimateDataAgent',
     'LLMAnalysisAgent',
     'RequestCollectorAgent',
-    'DataType'
+    'DataType',
+    'RequestIntent',
+    'ClimateRequest'
 ]
@@ -1,53 +1,185 @@
 """
 Agente responsável por buscar dados climáticos
 """
-from typing import Dict, Any, List, Optional
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
 from config import Config
-import requests
+from services.aggregation import argextreme, fill_calendar, period_stats, resample_daily, rolling
+from services.cache import collect_stale_reads, get_climate_cache, record_stale_reads
+from services.history_store import get_history_store
+from services.http_client import get_icrop_client
+from services.metrics import ERRORS
+from services.timeseries import StationSeries, parse_datetime
+from services.tracing import span
 from datetime import datetime
 
+def _with_context(fn):
+    """
+    Prende a função ao contexto atual para execução em ThreadPoolExecutor
+    
+    Leva aos threads do pool o trace e a coleta de dados antigos
+    (collect_stale_reads), com ou sem rastreamento ativo.
+    """
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(fn, *args)
+
 class ClimateDataAgent:
     """Agente para buscar dados climáticos"""
     
+    # Tipos respondidos com a medição mais recente (por hora, com fallback diário)
+    LATEST_READING_TYPES = ('temperature', 'climate', 'humidity', 'rain', 'wind', 'radiation')
+    
     def __init__(self):
         self.config = Config
+        self.http = get_icrop_client()
+        self.cache = get_climate_cache()
+        self.history = get_history_store() if Config.HISTORY_STORE_ENABLED else None
     
-    def get_daily_climate(self, station_id: int) -> List[Dict[str, Any]]:
+    # Endpoints cujos payloads são guardados como série colunar
+    SERIES_ENDPOINTS = ('clima_por_hora', 'clima_por_dia')
+    
+    # Colunas da tabela comparativa por tipo de dado: (título, campo, unidade)
+    COMPARISON_COLUMNS = {
+        'temperature': [('Temp. mín.', 'temp_min', '°C'), ('Temp. máx.', 'temp_max', '°C'), ('Temp. média', 'temp_med', '°C')],
+        'humidity': [('Umidade', 'umidade', '%')],
+        'rain': [('Chuva', 'chuva', 'mm')],
+        'wind': [('Vento', 'vento', 'km/h')],
+        'radiation': [('Radiação', 'radiacao', 'W/m²')],
+        'forecast': [('Temp. mín.', 'temp_min', '°C'), ('Temp. máx.', 'temp_max', '°C'),
+                     ('Prob. chuva', 'rain_prob', '%'), ('Chuva', 'rain_total', 'mm'), ('Vento', 'wind_spd', 'km/h')]
+    }
+    
+    def get_daily_climate(self, station_id: int) -> StationSeries:
         """Busca dados climáticos por dia"""
         try:
-            response = requests.get(
-                f"{self.config.ICROP_BASE_URL}/clima_por_dia/{station_id}",
-                headers={"Authorization": f"Bearer {self.config.ICROP_API_KEY}"}
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._get_cached('clima_por_dia', station_id)
         except Exception as e:
             raise Exception(f"Erro ao buscar clima por dia: {str(e)}")
     
-    def get_hourly_climate(self, station_id: int) -> List[Dict[str, Any]]:
+    def get_hourly_climate(self, station_id: int) -> StationSeries:
         """Busca dados climáticos por hora"""
         try:
-            response = requests.get(
-                f"{self.config.ICROP_BASE_URL}/clima_por_hora/{station_id}",
-                headers={"Authorization": f"Bearer {self.config.ICROP_API_KEY}"}
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._get_cached('clima_por_hora', station_id)
         except Exception as e:
             raise Exception(f"Erro ao buscar clima por hora: {str(e)}")
     
     def get_forecast(self, station_id: int) -> List[Dict[str, Any]]:
         """Busca previsões do tempo"""
         try:
-            response = requests.get(
-                f"{self.config.ICROP_BASE_URL}/previsao/{station_id}",
-                headers={"Authorization": f"Bearer {self.config.ICROP_API_KEY}"}
-            )
-            response.raise_for_status()
-            return response.json()
+            return self._get_cached('previsao', station_id)
         except Exception as e:
             raise Exception(f"Erro ao buscar previsão: {str(e)}")
     
+    def _get_cached(self, endpoint: str, station_id: int) -> Any:
+        """
+        Dados do endpoint via cache
+        
+        Se a iCrop falhar, servem os últimos dados conhecidos (cache ou
+        histórico local), registrados em collect_stale_reads().
+        """
+        return self.cache.get_or_fetch(
+            endpoint, station_id,
+            lambda: self._fetch(endpoint, station_id),
+            fallback=lambda: self._history_fallback(endpoint, station_id)
+        )
+    
+    def _history_fallback(self, endpoint: str, station_id: int) -> Optional[StationSeries]:
+        """Medições mais recentes do histórico local, usadas quando a iCrop falha e não há cache"""
+        if self.history is None or endpoint not in self.SERIES_ENDPOINTS:
+            return None
+        time_key = 'datahora' if endpoint == 'clima_por_hora' else 'data'
+        latest = self.history.latest_time(station_id, time_key)
+        if latest is None:
+            return None
+        janela = np.timedelta64(Config.HOURLY_SERIES_MAX_ROWS, 'h') if time_key == 'datahora' else np.timedelta64(90, 'D')
+        return self.history.query(station_id, time_key, start=latest - janela)
+    
+    def refresh_station_data(self, endpoint: str, station_id: int) -> Any:
+        """Atualiza no cache os dados de um endpoint da estação, independente da validade"""
+        return self.cache.refresh_entry(endpoint, station_id, lambda: self._fetch(endpoint, station_id))
+    
+    def _fetch(self, endpoint: str, station_id: int) -> Any:
+        """
+        Busca os dados de um endpoint da iCrop para a estação
+        
+        Dados por hora e por dia são convertidos uma única vez para StationSeries.
+        """
+        with span('icrop.fetch', endpoint=endpoint, station_id=station_id):
+            try:
+                if endpoint == 'clima_por_hora' and Config.HOURLY_DELTA_SYNC:
+                    return self._sync_hourly(station_id)
+                payload = self.http.get_json(f"/{endpoint}/{station_id}")
+                if endpoint in self.SERIES_ENDPOINTS:
+                    series = StationSeries.from_records(payload)
+                    self._save_history(station_id, series)
+                    return series
+                return payload
+            except Exception as e:
+                ERRORS.inc(component='climate_data', type=type(e).__name__)
+                raise
+    
+    def _sync_hourly(self, station_id: int) -> StationSeries:
+        """
+        Sincronização incremental da série por hora da estação
+        
+        Parte da série já conhecida (cache ou histórico local) e lê o payload da
+        iCrop em streaming, interrompendo a leitura ao alcançar medições já
+        conhecidas. Só as medições novas são convertidas e mescladas, e a série
+        resultante é limitada às HOURLY_SERIES_MAX_ROWS mais recentes.
+        """
+        max_rows = Config.HOURLY_SERIES_MAX_ROWS
+        known_series = self._known_hourly(station_id)
+        known = known_series.times[0] if len(known_series) else None
+        
+        novos = []
+        previous = None
+        descending = None
+        for record in self.http.iter_json_array(f"/clima_por_hora/{station_id}"):
+            instante = parse_datetime(record.get('datahora'))
+            if instante is None:
+                continue
+            if previous is not None and descending is None and instante != previous:
+                descending = bool(instante < previous)
+            previous = instante
+            
+            # A medição mais recente já conhecida é lida de novo (a iCrop pode tê-la
+            # revisado) e vence na mescla; só as anteriores a ela são descartadas
+            if known is not None and instante < known:
+                if descending:
+                    break  # Daqui em diante tudo já é conhecido
+                continue
+            novos.append(record)
+            if descending and len(novos) >= max_rows:
+                break
+        
+        series = StationSeries.from_records(novos, 'datahora')
+        self._save_history(station_id, series)
+        with span('hourly.merge', known_rows=len(known_series), new_rows=len(series)):
+            return known_series.merge(series, max_rows)
+    
+    def _known_hourly(self, station_id: int) -> StationSeries:
+        """Série por hora já conhecida da estação (cache em memória ou histórico local)"""
+        cached = self.cache.peek(('clima_por_hora', int(station_id)))
+        if isinstance(cached, StationSeries) and len(cached):
+            return cached
+        if self.history is not None:
+            try:
+                latest = self.history.latest_time(station_id, 'datahora')
+                if latest is not None:
+                    start = latest - np.timedelta64(Config.HOURLY_SERIES_MAX_ROWS, 'h')
+                    return self.history.query(station_id, 'datahora', start=start)
+            except Exception:
+                pass
+        return StationSeries.empty('datahora')
+    
+    def _save_history(self, station_id: int, series: StationSeries):
+        """Acumula as medições buscadas no histórico local (gravação em segundo plano)"""
+        if self.history is not None:
+            self.history.save_series_async(station_id, series)
+    
     def get_data_by_request(self, request_data: Dict[str, Any], station: Dict[str, Any]) -> str:
         """
         Busca dados baseado no JSON estruturado do pedido
@@ -57,155 +189,558 @@ class ClimateDataAgent:
             station: Dados da estação encontrada
             
         Returns:
-            str: Resposta formatada
+            str: Resposta formatada (com aviso se usou dados antigos por falha da iCrop)
         """
+        with collect_stale_reads() as stale:
+            resposta = self._data_by_request(request_data, station)
+        return resposta + self._stale_notice(stale, resposta)
+    
+    def _data_by_request(self, request_data: Dict[str, Any], station: Dict[str, Any]) -> str:
+        """Resposta ao pedido conforme o tipo de dado e o período"""
         try:
             data_type = request_data['data_type']['primary']
             
-            if data_type == 'temperature':
-                return self.get_current_temperature(station)
-            elif data_type == 'climate':
-                return self.get_current_climate_data(station)
+            if self._is_period_request(request_data):
+                return self.get_period_summary(station, request_data)
+            elif self._is_historical_request(request_data):
+                return self.get_historical_data(station, request_data)
             elif data_type == 'forecast':
                 return self.get_forecast_data(station)
             elif data_type == 'hourly':
                 return self.get_hourly_data(station)
-            elif data_type == 'humidity':
-                return self.get_specific_data(station, 'humidity')
-            elif data_type == 'rain':
-                return self.get_specific_data(station, 'rain')
-            elif data_type == 'wind':
-                return self.get_specific_data(station, 'wind')
-            elif data_type == 'radiation':
-                return self.get_specific_data(station, 'radiation')
+            elif data_type in self.LATEST_READING_TYPES:
+                return self._latest_reading_response(station, data_type)
             else:
                 return self.get_current_climate_data(station)
                 
         except Exception as e:
             return f"❌ Erro ao buscar dados: {str(e)}"
     
-    def get_specific_data(self, station: Dict[str, Any], data_type: str) -> str:
-        """Busca dados específicos (umidade, chuva, vento, radiação)"""
+    async def get_data_by_request_async(self, request_data: Dict[str, Any], station: Dict[str, Any]) -> str:
+        """
+        Versão assíncrona de get_data_by_request
+        
+        Para dados atuais, busca por hora e por dia são disparadas em paralelo.
+        """
+        with collect_stale_reads() as stale:
+            resposta = await self._data_by_request_async(request_data, station)
+        return resposta + self._stale_notice(stale, resposta)
+    
+    async def _data_by_request_async(self, request_data: Dict[str, Any], station: Dict[str, Any]) -> str:
+        """Versão assíncrona de _data_by_request"""
         try:
-            # Primeiro tentar dados por hora (mais atuais)
-            try:
-                dados_hora = self.get_hourly_climate(station['id'])
-                if dados_hora:
-                    # Buscar a medição mais recente (não 00:00:00)
-                    dados_ultimos = self._get_most_recent_data(dados_hora)
-                    return self._format_specific_data(station, dados_ultimos, data_type)
-            except:
-                pass
-            
-            # Se não conseguiu dados por hora, usar dados diários
-            dados_dia = self.get_daily_climate(station['id'])
-            if not dados_dia:
-                return f"❌ Nenhum dado de {data_type} disponível para esta estação."
-            
-            dados_ultimos = dados_dia[0]
-            return self._format_specific_data(station, dados_ultimos, data_type)
+            data_type = request_data['data_type']['primary']
             
+            if self._is_period_request(request_data):
+                return await asyncio.to_thread(self.get_period_summary, station, request_data)
+            elif self._is_historical_request(request_data):
+                return await asyncio.to_thread(self.get_historical_data, station, request_data)
+            elif data_type == 'forecast':
+                return await asyncio.to_thread(self.get_forecast_data, station)
+            elif data_type == 'hourly':
+                return await asyncio.to_thread(self.get_hourly_data, station)
+            elif data_type in self.LATEST_READING_TYPES:
+                return await self._latest_reading_response_async(station, data_type)
+            else:
+                return await self._latest_reading_response_async(station, 'climate')
+                
         except Exception as e:
-            return f"❌ Erro ao buscar {data_type}: {str(e)}"
-    
-    def _get_most_recent_data(self, dados_hora: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Busca a medição mais recente (não 00:00:00)"""
-        # Filtrar dados que não são 00:00:00
-        dados_filtrados = []
-        for dado in dados_hora:
-            if 'datahora' in dado:
-                hora = dado['datahora'].split(' ')[1] if ' ' in dado['datahora'] else dado['datahora']
-                if hora != '00:00:00':
-                    dados_filtrados.append(dado)
-        
-        # Se encontrou dados filtrados, retornar o mais recente
-        if dados_filtrados:
-            return dados_filtrados[0]  # Primeiro item é o mais recente
-        
-        # Se não encontrou, retornar o primeiro dado original
-        return dados_hora[0]
-    
-    def _format_specific_data(self, station: Dict[str, Any], dados: Dict[str, Any], data_type: str) -> str:
-        """Formata dados específicos"""
-        data_labels = {
-            'humidity': ('Umidade', 'umidade', '%'),
-            'rain': ('Chuva', 'chuva', 'mm'),
-            'wind': ('Vento', 'vento', 'km/h'),
-            'radiation': ('Radiação', 'radiacao', 'W/m²')
-        }
+            return f"❌ Erro ao buscar dados: {str(e)}"
+    
+    def compare_stations(self, request_data: Dict[str, Any], stations: List[Dict[str, Any]]) -> str:
+        """
+        Busca os dados de várias estações em paralelo e monta uma tabela comparativa
         
-        label, key, unit = data_labels.get(data_type, ('Dados', 'dados', ''))
+        Args:
+            request_data: JSON com dados do pedido
+            stations: Estações já resolvidas no catálogo
+            
+        Returns:
+            str: Tabela comparativa formatada
+        """
+        with collect_stale_reads() as stale:
+            with ThreadPoolExecutor(max_workers=max(1, min(Config.COMPARE_MAX_WORKERS, len(stations)))) as executor:
+                readings = list(executor.map(_with_context(lambda station: self._safe_comparison_reading(station, request_data)), stations))
+        tabela = self._format_comparison(request_data, stations, readings)
+        return tabela + self._stale_notice(stale, tabela)
+    
+    async def compare_stations_async(self, request_data: Dict[str, Any], stations: List[Dict[str, Any]]) -> str:
+        """
+        Versão assíncrona de compare_stations
+        
+        As buscas são disparadas juntas, limitadas a COMPARE_MAX_WORKERS simultâneas,
+        de modo que o tempo total fica próximo ao da estação mais lenta.
+        """
+        semaphore = asyncio.Semaphore(max(1, Config.COMPARE_MAX_WORKERS))
+        
+        async def reading(station: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await asyncio.to_thread(self._safe_comparison_reading, station, request_data)
+        
+        with collect_stale_reads() as stale:
+            readings = await asyncio.gather(*(reading(station) for station in stations))
+        tabela = self._format_comparison(request_data, stations, readings)
+        return tabela + self._stale_notice(stale, tabela)
+    
+    def _safe_comparison_reading(self, station: Dict[str, Any], request_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Medição usada na comparação (None se a estação não tiver dados ou a busca falhar)"""
+        try:
+            return self._comparison_reading(station, request_data)
+        except Exception:
+            return None
+    
+    def _comparison_reading(self, station: Dict[str, Any], request_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Medição de uma estação para o período pedido (atual, horário/dia passado ou previsão)"""
+        if request_data['data_type']['primary'] == 'forecast':
+            previsao = self.get_forecast(station['id'])
+            return previsao[0] if previsao else None
+        
+        if self._is_period_request(request_data):
+            datetime_info = request_data['datetime']
+            stats = period_stats(self._daily_period(station['id'], datetime_info['start'], datetime_info['end']))
+            if not stats['count']:
+                return None
+            # Resumo do período no formato de uma medição diária
+            return {
+                'data': f"{stats['first']} a {stats['last']}",
+                'temp_min': stats['temp_min'], 'temp_max': stats['temp_max'], 'temp_med': stats['temp_mean'],
+                'umidade': stats['humidity_mean'], 'chuva': stats['rain_total'],
+                'vento': stats['wind_mean'], 'radiacao': stats['radiation_mean']
+            }
+        
+        if self._is_historical_request(request_data):
+            datetime_info = request_data['datetime']
+            start, end = datetime_info['start'], datetime_info['end']
+            if datetime_info['period'] == 'hour':
+                dados = self._query_period(station['id'], 'datahora', start, end)
+                return dados.record(len(dados) - 1) if dados else None
+            if datetime_info['period'] == 'hours':
+                return self._query_period(station['id'], 'datahora', start, end).latest()
+            return self._query_period(station['id'], 'data', start, end).latest()
         
-        if 'datahora' in dados:
-            return f"📊 **{label} atual em {station['nome']}:**\n\n" + \
-                   f"📅 **{dados['datahora']}**\n" + \
-                   f"📊 **{label}:** {dados[key]} {unit}"
+        return self._get_latest_reading(station)
+    
+    def _format_comparison(self, request_data: Dict[str, Any], stations: List[Dict[str, Any]],
+                           readings: List[Optional[Dict[str, Any]]]) -> str:
+        """Formata a tabela comparativa em markdown"""
+        data_type = request_data['data_type']
+        columns = []
+        for name in [data_type['primary'], *data_type['secondary'], *data_type['specific']]:
+            if name not in self.COMPARISON_COLUMNS:
+                if name not in ('climate', 'hourly'):
+                    continue
+                # Clima geral: todas as medições
+                columns = [col for key in ('temperature', 'humidity', 'rain', 'wind', 'radiation')
+                           for col in self.COMPARISON_COLUMNS[key]]
+                break
+            for col in self.COMPARISON_COLUMNS[name]:
+                if col not in columns:
+                    columns.append(col)
+        if not columns:
+            columns = self.COMPARISON_COLUMNS['temperature']
+        
+        if data_type['primary'] == 'forecast':
+            titulo = "🔮 **Comparação da previsão entre estações:**"
+        elif self._is_period_request(request_data):
+            nome_periodo = self._period_names(request_data['datetime'])[1]
+            titulo = f"📊 **Comparação entre estações {nome_periodo}** (chuva acumulada, demais campos em média/extremos):"
+        elif request_data['datetime']['period'] == 'hours' and self._is_historical_request(request_data):
+            titulo = f"📊 **Comparação entre estações desde {request_data['datetime']['start'][:16]}** (medição mais recente):"
+        elif self._is_historical_request(request_data):
+            periodo = request_data['datetime']['start'][:16 if request_data['datetime']['period'] == 'hour' else 10]
+            titulo = f"📊 **Comparação entre estações em {periodo}:**"
         else:
-            return f"📊 **{label} atual em {station['nome']}:**\n\n" + \
-                   f"📅 **{dados['data']}**\n" + \
-                   f"📊 **{label}:** {dados[key]} {unit}"
+            titulo = "📊 **Comparação entre estações (medição mais recente):**"
+        
+        linhas = [
+            titulo,
+            "",
+            "| Estação | Data | " + " | ".join(title for title, _, _ in columns) + " |",
+            "|---|---|" + "---|" * len(columns)
+        ]
+        for station, dados in zip(stations, readings):
+            if not dados:
+                linhas.append(f"| {station['nome']} | sem dados |" + " — |" * len(columns))
+                continue
+            valores = [f"{dados[key]} {unit}" if dados.get(key) is not None else "—" for _, key, unit in columns]
+            linhas.append(f"| {station['nome']} | {self._reading_date(dados)} | " + " | ".join(valores) + " |")
+        return "\n".join(linhas)
     
-    def get_current_temperature(self, station: Dict[str, Any]) -> str:
-        """Busca apenas a temperatura atual (formato limpo)"""
+    def get_analysis_context(self, station: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Reúne os dados da estação usados como contexto na análise com LLM
+        
+        As buscas são feitas em paralelo e cada parte é opcional: falhas em uma
+        busca não impedem as demais.
+        """
+        agora = np.datetime64(datetime.now(), 's')
+        partes = {
+            'medicao_mais_recente': lambda: self._get_latest_reading(station),
+            'dias': lambda: self.get_daily_climate(station['id']).between(agora - np.timedelta64(30, 'D')),
+            'horas': lambda: self.get_hourly_climate(station['id']).between(agora - np.timedelta64(48, 'h')),
+            'previsao': lambda: self.get_forecast(station['id'])[:5]
+        }
+        contexto: Dict[str, Any] = {'estacao': {'id': station['id'], 'nome': station['nome']}}
+        with collect_stale_reads() as stale:
+            with ThreadPoolExecutor(max_workers=len(partes)) as executor:
+                futures = {nome: executor.submit(_with_context(busca)) for nome, busca in partes.items()}
+            for nome, future in futures.items():
+                try:
+                    contexto[nome] = future.result()
+                except Exception:
+                    pass
+        if stale:
+            contexto['aviso'] = "Atenção: a API iCrop não respondeu; parte dos dados pode estar desatualizada."
+        return contexto
+    
+    def get_historical_data(self, station: Dict[str, Any], request_data: Dict[str, Any]) -> str:
+        """
+        Busca e formata dados de uma data/hora específica do passado
+        
+        Consulta primeiro o histórico local; se não houver medições no período,
+        busca os dados da estação (cache/API) e recorta o intervalo pedido.
+        """
+        datetime_info = request_data['datetime']
+        data_type = request_data['data_type']['primary']
+        reading_type = data_type if data_type in self.LATEST_READING_TYPES else 'climate'
+        start, end = datetime_info['start'], datetime_info['end']
+        
         try:
-            # Primeiro tentar dados por hora (mais atuais)
-            try:
-                dados_hora = self.get_hourly_climate(station['id'])
-                if dados_hora:
-                    # Buscar a medição mais recente (não 00:00:00)
-                    dados_ultimos = self._get_most_recent_data(dados_hora)
-                    return f"🌡️ **Temperatura atual em {station['nome']}:**\n\n" + \
-                           f"📅 **{dados_ultimos['datahora']}**\n" + \
-                           f"🌡️ **{dados_ultimos['temp_min']}°C - {dados_ultimos['temp_max']}°C** (média: {dados_ultimos['temp_med']}°C)"
-            except:
-                pass
+            if datetime_info['period'] == 'hour':
+                dados = self._query_period(station['id'], 'datahora', start, end)
+                if not dados:
+                    return f"❌ Não encontrei medições de {start[:16]} para esta estação."
+                # Medição mais próxima do horário pedido
+                return self._format_latest_reading(station, dados.record(len(dados) - 1), reading_type, current=False)
             
-            # Se não conseguiu dados por hora, usar dados diários
-            dados_dia = self.get_daily_climate(station['id'])
-            if not dados_dia:
-                return "❌ Nenhum dado de temperatura disponível para esta estação."
+            if datetime_info['period'] == 'hours':
+                dados_hora = self._query_period(station['id'], 'datahora', start, end)
+                if not dados_hora:
+                    return f"❌ Não encontrei medições desde {start[:16]} para esta estação."
+                return self._format_hourly_list(f"desde {start[:16]}", station, dados_hora)
+            
+            dados_dia = self._query_period(station['id'], 'data', start, end)
+            if dados_dia and data_type != 'hourly':
+                return self._format_latest_reading(station, dados_dia.latest(), reading_type, current=False)
             
-            dados_ultimos = dados_dia[0]  # Dados mais recentes
-            return f"🌡️ **Temperatura atual em {station['nome']}:**\n\n" + \
-                   f"📅 **{dados_ultimos['data']}**\n" + \
-                   f"🌡️ **{dados_ultimos['temp_min']}°C - {dados_ultimos['temp_max']}°C** (média: {dados_ultimos['temp_med']}°C)"
+            # Sem registro diário (ou pedido por hora): listar as medições por hora do dia
+            dados_hora = self._query_period(station['id'], 'datahora', start, end)
+            if not dados_hora:
+                return f"❌ Não encontrei medições de {start[:10]} para esta estação."
+            return self._format_hourly_list(f"em {start[:10]}", station, dados_hora)
+        except Exception as e:
+            return f"❌ Erro ao buscar dados históricos: {str(e)}"
+    
+    def _format_hourly_list(self, periodo: str, station: Dict[str, Any], dados_hora: StationSeries) -> str:
+        """Lista as medições por hora do período (até 24, da mais antiga para a mais recente)"""
+        resposta = f"⏰ **Dados climáticos por hora de {station['nome']} {periodo}:**\n\n"
+        for d in reversed(dados_hora.head(24)):
+            resposta += f"• **{d['datahora']}**: {d['temp_med']}°C, {d['umidade']}% umidade, {d['vento']} km/h vento\n"
+        return resposta
+    
+    def get_period_summary(self, station: Dict[str, Any], request_data: Dict[str, Any]) -> str:
+        """
+        Resume um período (semana ou mês) com estatísticas agregadas
+        
+        Usa os registros diários do período e completa os dias ausentes com as
+        medições por hora consolidadas por dia.
+        """
+        datetime_info = request_data['datetime']
+        data_type = request_data['data_type']['primary']
+        start, end = datetime_info['start'], datetime_info['end']
+        
+        try:
+            dias = self._daily_period(station['id'], start, end)
+            if not dias:
+                return f"❌ Não encontrei medições entre {start[:10]} e {end[:10]} para esta estação."
+            stats = period_stats(dias)
         except Exception as e:
-            return f"❌ Erro ao buscar temperatura: {str(e)}"
+            return f"❌ Erro ao calcular o resumo do período: {str(e)}"
+        
+        nome_periodo = self._period_names(datetime_info)[0]
+        resposta = f"📆 **Resumo {nome_periodo} em {station['nome']}** ({stats['first']} a {stats['last']}, {stats['count']} dias):\n\n"
+        
+        if data_type == 'rain':
+            resposta += f"🌧️ **Chuva acumulada:** {stats['rain_total']} mm\n"
+            resposta += f"🌧️ **Dias com chuva:** {stats['rain_days']}\n"
+            mais_chuvoso = argextreme(dias, 'chuva')
+            if mais_chuvoso and mais_chuvoso['chuva']:
+                resposta += f"🌧️ **Dia mais chuvoso:** {mais_chuvoso['data']} ({mais_chuvoso['chuva']} mm)\n"
+            calendario = fill_calendar(dias)
+            if len(calendario) >= 3:
+                # Janela de 3 dias de calendário (dias sem registro não estendem a janela)
+                acumulado = rolling(calendario, 'chuva', 3, 'sum')
+                if not np.isnan(acumulado).all():
+                    i = int(np.nanargmax(acumulado))
+                    resposta += f"🌧️ **Maior acumulado em 3 dias:** {round(float(acumulado[i]), 2):g} mm (até {calendario.record(i)['data']})\n"
+            return resposta
+        
+        if data_type == 'temperature':
+            resposta += f"🌡️ **Mínima:** {stats['temp_min']}°C\n"
+            resposta += f"🌡️ **Máxima:** {stats['temp_max']}°C\n"
+            resposta += f"🌡️ **Média:** {stats['temp_mean']}°C\n"
+            mais_quente = argextreme(dias, 'temp_max')
+            if mais_quente:
+                resposta += f"🔥 **Dia mais quente:** {mais_quente['data']} ({mais_quente['temp_max']}°C)\n"
+            return resposta
+        
+        if data_type == 'humidity':
+            return resposta + f"💧 **Umidade média:** {stats['humidity_mean']}%\n"
+        if data_type == 'wind':
+            return resposta + f"💨 **Vento médio:** {stats['wind_mean']} km/h (máximo diário: {stats['wind_max']} km/h)\n"
+        if data_type == 'radiation':
+            return resposta + f"☀️ **Radiação média:** {stats['radiation_mean']} W/m²\n"
+        
+        return resposta + \
+            f"🌡️ **Temperatura:** {stats['temp_min']}°C - {stats['temp_max']}°C (média: {stats['temp_mean']}°C)\n" + \
+            f"💧 **Umidade média:** {stats['humidity_mean']}%\n" + \
+            f"🌧️ **Chuva acumulada:** {stats['rain_total']} mm ({stats['rain_days']} dias com chuva)\n" + \
+            f"💨 **Vento médio:** {stats['wind_mean']} km/h\n" + \
+            f"☀️ **Radiação média:** {stats['radiation_mean']} W/m²\n"
+    
+    def _daily_period(self, station_id: int, start: str, end: str) -> StationSeries:
+        """Série diária do período: registros diários, completados pelas medições por hora"""
+        dias = self._query_period(station_id, 'data', start, end)
+        try:
+            horas = self._query_period(station_id, 'datahora', start, end)
+        except Exception:
+            return dias
+        # Registros diários oficiais prevalecem sobre os consolidados das medições por hora
+        return resample_daily(horas, drop_midnight=True).merge(dias)
+    
+    def _period_names(self, datetime_info: Dict[str, Any]) -> Tuple[str, str]:
+        """Nome do período resumido, com 'de' e com 'em' (ex.: 'da semana', 'na semana')"""
+        if datetime_info['period'] == 'week':
+            return 'da semana', 'na semana'
+        if datetime_info['period'] == 'days':
+            dias = (np.datetime64(datetime_info['end'][:10]) - np.datetime64(datetime_info['start'][:10])).astype(int) + 1
+            return f'dos últimos {dias} dias', f'nos últimos {dias} dias'
+        return 'do mês', 'no mês'
+    
+    def _is_period_request(self, request_data: Dict[str, Any]) -> bool:
+        """Indica se o pedido é de um período (semana, mês ou últimos N dias) a ser resumido"""
+        datetime_info = request_data.get('datetime') or {}
+        return request_data['data_type']['primary'] != 'forecast' and \
+            datetime_info.get('period') in ('week', 'month', 'days')
+    
+    def _is_historical_request(self, request_data: Dict[str, Any]) -> bool:
+        """Indica se o pedido é de um horário específico, das últimas N horas ou de um dia já encerrado"""
+        datetime_info = request_data.get('datetime') or {}
+        if request_data['data_type']['primary'] == 'forecast' or not datetime_info.get('start'):
+            return False
+        if datetime_info['period'] in ('hour', 'hours'):
+            return True
+        if datetime_info['period'] == 'day':
+            return datetime_info['end'] < datetime.now().strftime('%Y-%m-%d 00:00:00')
+        return False
+    
+    def _query_period(self, station_id: int, time_key: str, start: str, end: str) -> StationSeries:
+        """
+        Medições da estação no intervalo, do histórico local ou da iCrop
+        
+        O histórico só é usado sozinho se cobrir todo o intervalo; caso
+        contrário, é completado com os dados da iCrop (que prevalecem em datas
+        repetidas).
+        """
+        historico = StationSeries.empty(time_key)
+        if self.history is not None:
+            historico = self.history.query(station_id, time_key, start, end)
+            if self._covers(historico, start, end):
+                return historico
+        
+        try:
+            series = self.get_hourly_climate(station_id) if time_key == 'datahora' else self.get_daily_climate(station_id)
+        except Exception:
+            if historico:
+                return historico
+            raise
+        return historico.merge(series.between(start, end))
+    
+    def _covers(self, series: StationSeries, start: str, end: str) -> bool:
+        """
+        Indica se a série cobre o intervalo [start, end] (até o momento atual)
+        
+        Além das pontas, nenhuma falha entre medições consecutivas pode passar de
+        um passo (uma hora ou um dia).
+        """
+        if not series:
+            return False
+        passo = np.timedelta64(1, 'h') if series.is_hourly else np.timedelta64(1, 'D')
+        fim = min(np.datetime64(end, 's'), np.datetime64(datetime.now(), 's'))
+        if series.times[-1] > np.datetime64(start, 's') + passo or series.times[0] < fim - passo:
+            return False
+        return len(series) < 2 or (series.times[:-1] - series.times[1:]).max() <= passo
+    
+    def get_specific_data(self, station: Dict[str, Any], data_type: str) -> str:
+        """Busca dados específicos (umidade, chuva, vento, radiação)"""
+        return self._latest_reading_response(station, data_type)
+    
+    def get_current_temperature(self, station: Dict[str, Any]) -> str:
+        """Busca apenas a temperatura atual (formato limpo)"""
+        return self._latest_reading_response(station, 'temperature')
     
     def get_current_climate_data(self, station: Dict[str, Any]) -> str:
         """Busca e formata dados climáticos atuais (SEMPRE o mais recente)"""
+        return self._latest_reading_response(station, 'climate')
+    
+    def _latest_reading_response(self, station: Dict[str, Any], data_type: str) -> str:
+        """Busca a medição mais recente e formata conforme o tipo de dado"""
         try:
-            # Primeiro tentar dados por hora (mais atuais)
+            dados_ultimos = self._get_latest_reading(station)
+            return self._format_latest_reading(station, dados_ultimos, data_type)
+        except Exception as e:
+            return self._format_latest_error(data_type, e)
+    
+    async def _latest_reading_response_async(self, station: Dict[str, Any], data_type: str) -> str:
+        """Versão assíncrona de _latest_reading_response"""
+        try:
+            dados_ultimos = await self._get_latest_reading_async(station)
+            return self._format_latest_reading(station, dados_ultimos, data_type)
+        except Exception as e:
+            return self._format_latest_error(data_type, e)
+    
+    def _get_latest_reading(self, station: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Retorna a medição mais recente da estação
+        
+        Tenta primeiro os dados por hora (mais atuais) e, se não houver,
+        usa o registro diário mais recente. Retorna None se não houver dados.
+        """
+        with span('latest_reading', station_id=station['id']) as current:
             try:
                 dados_hora = self.get_hourly_climate(station['id'])
                 if dados_hora:
                     # Buscar a medição mais recente (não 00:00:00)
-                    dados_ultimos = self._get_most_recent_data(dados_hora)
-                    return f"🌤️ **Dados climáticos de {station['nome']}:**\n\n" + \
-                           f"📅 **{dados_ultimos['datahora']}**\n" + \
-                           f"🌡️ **Temperatura:** {dados_ultimos['temp_min']}°C - {dados_ultimos['temp_max']}°C (média: {dados_ultimos['temp_med']}°C)\n" + \
-                           f"💧 **Umidade:** {dados_ultimos['umidade']}%\n" + \
-                           f"🌧️ **Chuva:** {dados_ultimos['chuva']}mm\n" + \
-                           f"💨 **Vento:** {dados_ultimos['vento']} km/h\n" + \
-                           f"☀️ **Radiação:** {dados_ultimos['radiacao']} W/m²"
+                    return dados_hora.latest_valid()
             except:
                 pass
             
             # Se não conseguiu dados por hora, usar dados diários
+            if current is not None:
+                current.set(daily_fallback=True)
             dados_dia = self.get_daily_climate(station['id'])
-            if not dados_dia:
+            return dados_dia.latest()
+    
+    async def _get_latest_reading_async(self, station: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Versão assíncrona de _get_latest_reading
+        
+        A busca diária só é disparada se a busca por hora falhar, vier vazia ou
+        não terminar em LATEST_DAILY_HEDGE_DELAY segundos; nesse último caso
+        as duas correm juntas e valem os dados por hora, se forem válidos.
+        """
+        with span('latest_reading', station_id=station['id']) as current:
+            # Cada busca registra à parte os dados antigos; só contam os da busca usada na resposta
+            hourly_task = asyncio.create_task(asyncio.to_thread(self._collecting, self.get_hourly_climate, station['id']))
+            daily_task = None
+            try:
+                if Config.LATEST_DAILY_HEDGE_DELAY > 0:
+                    await asyncio.wait({hourly_task}, timeout=Config.LATEST_DAILY_HEDGE_DELAY)
+                    if not hourly_task.done():
+                        daily_task = asyncio.create_task(
+                            asyncio.to_thread(self._collecting, self.get_daily_climate, station['id'])
+                        )
+                try:
+                    dados_hora, stale = await hourly_task
+                    if dados_hora:
+                        record_stale_reads(stale)
+                        return dados_hora.latest_valid()
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    pass
+                
+                if current is not None:
+                    current.set(daily_fallback=True)
+                if daily_task is None:
+                    daily_task = asyncio.create_task(
+                        asyncio.to_thread(self._collecting, self.get_daily_climate, station['id'])
+                    )
+                dados_dia, stale = await daily_task
+                record_stale_reads(stale)
+                return dados_dia.latest()
+            finally:
+                for task in (hourly_task, daily_task):
+                    if task is not None and not task.done():
+                        task.cancel()
+    
+    @staticmethod
+    def _collecting(fetch, station_id: int):
+        """Executa a busca e retorna (dados, dados antigos servidos nela)"""
+        with collect_stale_reads() as stale:
+            return fetch(station_id), stale
+    
+    def _stale_notice(self, stale: List[Dict[str, Any]], resposta: str) -> str:
+        """Aviso para respostas montadas com dados antigos porque a iCrop falhou"""
+        if not stale or resposta.startswith('❌'):
+            return ""
+        idades = [r['age_seconds'] for r in stale if r['age_seconds'] is not None]
+        if idades:
+            minutos = max(idades) // 60
+            if minutos < 1:
+                origem = "atualizados há menos de 1 min"
+            elif minutos < 120:
+                origem = f"atualizados há {minutos} min"
+            else:
+                origem = f"atualizados há {minutos // 60} h"
+        else:
+            origem = "do histórico local"
+        return f"\n\n⚠️ *A API iCrop não respondeu; exibindo os últimos dados conhecidos ({origem}).*"
+    
+    def _format_latest_reading(self, station: Dict[str, Any], dados: Optional[Dict[str, Any]], data_type: str,
+                               current: bool = True) -> str:
+        """Formata a medição mais recente (ou de um instante passado) conforme o tipo de dado pedido"""
+        atual = "atual " if current else ""
+        if data_type == 'temperature':
+            if not dados:
+                return "❌ Nenhum dado de temperatura disponível para esta estação."
+            return f"🌡️ **Temperatura {atual}em {station['nome']}:**\n\n" + \
+                   f"📅 **{self._reading_date(dados)}**\n" + \
+                   f"🌡️ **{dados['temp_min']}°C - {dados['temp_max']}°C** (média: {dados['temp_med']}°C)"
+        
+        if data_type == 'climate':
+            if not dados:
                 return "❌ Nenhum dado climático disponível para esta estação."
-            
-            dados_ultimos = dados_dia[0]  # Dados mais recentes
             return f"🌤️ **Dados climáticos de {station['nome']}:**\n\n" + \
-                   f"📅 **{dados_ultimos['data']}**\n" + \
-                   f"🌡️ **Temperatura:** {dados_ultimos['temp_min']}°C - {dados_ultimos['temp_max']}°C (média: {dados_ultimos['temp_med']}°C)\n" + \
-                   f"💧 **Umidade:** {dados_ultimos['umidade']}%\n" + \
-                   f"🌧️ **Chuva:** {dados_ultimos['chuva']}mm\n" + \
-                   f"💨 **Vento:** {dados_ultimos['vento']} km/h\n" + \
-                   f"☀️ **Radiação:** {dados_ultimos['radiacao']} W/m²"
-        except Exception as e:
-            return f"❌ Erro ao buscar dados climáticos: {str(e)}"
+                   f"📅 **{self._reading_date(dados)}**\n" + \
+                   f"🌡️ **Temperatura:** {dados['temp_min']}°C - {dados['temp_max']}°C (média: {dados['temp_med']}°C)\n" + \
+                   f"💧 **Umidade:** {dados['umidade']}%\n" + \
+                   f"🌧️ **Chuva:** {dados['chuva']}mm\n" + \
+                   f"💨 **Vento:** {dados['vento']} km/h\n" + \
+                   f"☀️ **Radiação:** {dados['radiacao']} W/m²"
+        
+        if not dados:
+            return f"❌ Nenhum dado de {data_type} disponível para esta estação."
+        return self._format_specific_data(station, dados, data_type, current)
+    
+    def _format_latest_error(self, data_type: str, error: Exception) -> str:
+        """Formata mensagem de erro da busca da medição mais recente"""
+        if data_type == 'temperature':
+            return f"❌ Erro ao buscar temperatura: {str(error)}"
+        if data_type == 'climate':
+            return f"❌ Erro ao buscar dados climáticos: {str(error)}"
+        return f"❌ Erro ao buscar {data_type}: {str(error)}"
+    
+    def _reading_date(self, dados: Dict[str, Any]) -> str:
+        """Retorna a data/hora de uma medição (por hora ou diária)"""
+        return dados['datahora'] if 'datahora' in dados else dados['data']
+    
+    def _format_specific_data(self, station: Dict[str, Any], dados: Dict[str, Any], data_type: str,
+                              current: bool = True) -> str:
+        """Formata dados específicos"""
+        data_labels = {
+            'humidity': ('Umidade', 'umidade', '%'),
+            'rain': ('Chuva', 'chuva', 'mm'),
+            'wind': ('Vento', 'vento', 'km/h'),
+            'radiation': ('Radiação', 'radiacao', 'W/m²')
+        }
+        
+        label, key, unit = data_labels.get(data_type, ('Dados', 'dados', ''))
+        
+        atual = "atual " if current else ""
+        return f"📊 **{label} {atual}em {station['nome']}:**\n\n" + \
+               f"📅 **{self._reading_date(dados)}**\n" + \
+               f"📊 **{label}:** {dados[key]} {unit}"
     
     def get_forecast_data(self, station: Dict[str, Any]) -> str:
         """Busca e formata previsões do tempo"""
@@ -233,7 +768,7 @@ class ClimateDataAgent:
                 return "❌ Nenhum dado por hora disponível para esta estação."
             
             resposta = f"⏰ **Dados climáticos por hora de {station['nome']}:**\n\n"
-            for d in dados_hora[:5]:  # Mostrar últimas 5 medições
+            for d in dados_hora.head(5):  # Mostrar últimas 5 medições
                 resposta += f"• **{d['datahora']}**: {d['temp_med']}°C, {d['umidade']}% umidade, {d['vento']} km/h vento\n"
             return resposta
         except Exception as e:
@@ -2,40 +2,141 @@
 Agente responsável por análise e interpretação com LLM
 """
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
 from config import Config
-import requests
+from services.http_client import get_openrouter_client
+from services.llm_cache import get_llm_cache
+from services.llm_context import build_climate_context
+from services.llm_scheduler import LLMQueueTimeout, LLMRateLimited, get_llm_scheduler
+from services.metrics import ERRORS
+from services.tracing import current_span, span
 
 class LLMAnalysisAgent:
     """Agente para análise e interpretação com LLM"""
     
     def __init__(self):
         self.config = Config
+        self.http = get_openrouter_client()
+        self.cache = get_llm_cache() if Config.LLM_CACHE_ENABLED else None
+        self.scheduler = get_llm_scheduler()
     
-    def analyze_with_context(self, question: str, climate_data: Optional[Dict[str, Any]] = None) -> str:
+    def analyze_with_context(self, question: str, climate_data: Optional[Dict[str, Any]] = None,
+                             session_id: str = 'default') -> str:
         """
         Analisa a pergunta com contexto dos dados climáticos
         
+        A chamada passa pelo agendador do processo (limite de taxa, concorrência
+        e fila justa entre sessões).
+        
         Args:
             question: Pergunta do usuário
             climate_data: Dados climáticos opcionais para contexto
+            session_id: Sessão que fez a pergunta (para a fila justa)
         """
-        headers = {
-            "Authorization": f"Bearer {self.config.OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://clima.ai",
-            "X-Title": "Clima.AI",
-        }
+        context = self._build_context(climate_data)
+        
+        # Mesma pergunta sobre os mesmos dados: reaproveitar a resposta anterior
+        cache_key, cached = self._cached_response(question, context)
+        if cached is not None:
+            return cached
+        
+        data = self._build_payload(question, context)
+        
+        try:
+            response = self.scheduler.submit(lambda: self.http.post_json(payload=data), session_id)
+            content = response["choices"][0]["message"]["content"]
+            if cache_key is not None and content:
+                self.cache.set(cache_key, content)
+            return content
+        except (LLMQueueTimeout, LLMRateLimited) as e:
+            self._count_error(e)
+            return f"⚠️ {str(e)}"
+        except Exception as e:
+            self._count_error(e)
+            return f"❌ Erro na análise com LLM: {str(e)}"
+    
+    def stream_analysis(self, question: str, climate_data: Optional[Dict[str, Any]] = None,
+                        session_id: str = 'default') -> Iterator[str]:
+        """
+        Versão em streaming de analyze_with_context
         
-        # Preparar o contexto
-        system_prompt = self._build_system_prompt(climate_data)
+        Gera os trechos da resposta à medida que o OpenRouter os envia (SSE),
+        para que a interface mostre o texto desde o primeiro token.
         
-        data = {
+        Args:
+            question: Pergunta do usuário
+            climate_data: Dados climáticos opcionais para contexto
+            session_id: Sessão que fez a pergunta (para a fila justa)
+        """
+        context = self._build_context(climate_data)
+        cache_key, cached = self._cached_response(question, context)
+        if cached is not None:
+            yield cached
+            return
+        
+        data = self._build_payload(question, context)
+        data["stream"] = True
+        
+        partes = []
+        try:
+            for event in self.scheduler.stream(lambda: self.http.stream_events(payload=data), session_id):
+                chunk = json.loads(event)
+                if chunk.get("error"):
+                    raise Exception(chunk["error"].get("message", chunk["error"]))
+                choices = chunk.get("choices") or [{}]
+                content = (choices[0].get("delta") or {}).get("content")
+                if content:
+                    if not partes and current_span() is not None:
+                        current_span().set(first_token_ms=current_span().duration_ms)
+                    partes.append(content)
+                    yield content
+        except (LLMQueueTimeout, LLMRateLimited) as e:
+            self._count_error(e)
+            separador = "\n\n" if partes else ""
+            yield f"{separador}⚠️ {str(e)}"
+            return
+        except Exception as e:
+            self._count_error(e)
+            separador = "\n\n" if partes else ""
+            yield f"{separador}❌ Erro na análise com LLM: {str(e)}"
+            return
+        
+        if cache_key is not None and partes:
+            self.cache.set(cache_key, "".join(partes))
+    
+    def _count_error(self, error: Exception):
+        """Registra a falha nas métricas de erro"""
+        tipos = {LLMQueueTimeout: 'queue_timeout', LLMRateLimited: 'rate_limited'}
+        ERRORS.inc(component='llm', type=tipos.get(type(error), type(error).__name__))
+    
+    def _build_context(self, climate_data: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Converte os dados climáticos no texto compacto enviado ao LLM (dentro do orçamento de tokens)"""
+        if not climate_data:
+            return None
+        with span('llm.context') as current:
+            context = build_climate_context(climate_data, self.config.LLM_CONTEXT_MAX_TOKENS)
+            if current is not None:
+                current.set(chars=len(context))
+            return context
+    
+    def _cached_response(self, question: str, context: Optional[str] = None):
+        """Retorna (chave, resposta em cache ou None); a chave é None se o cache estiver desativado"""
+        if self.cache is None:
+            return None, None
+        cache_key = self.cache.make_key(self.config.MODEL_NAME, question, context)
+        cached = self.cache.get(cache_key)
+        if current_span() is not None:
+            current_span().set(llm_cache_hit=cached is not None)
+        return cache_key, cached
+    
+    def _build_payload(self, question: str, context: Optional[str] = None) -> Dict[str, Any]:
+        """Monta o corpo da requisição de chat"""
+        return {
             "model": self.config.MODEL_NAME,
             "messages": [
                 {
                     "role": "system",
-                    "content": system_prompt
+                    "content": self._build_system_prompt(context)
                 },
                 {
                     "role": "user",
@@ -43,19 +144,8 @@ class LLMAnalysisAgent:
                 }
             ]
         }
-        
-        try:
-            response = requests.post(
-                self.config.OPENROUTER_URL, 
-                headers=headers, 
-                data=json.dumps(data)
-            )
-            response.raise_for_status()
-            return response.json()["choices"][0]["message"]["content"]
-        except Exception as e:
-            return f"❌ Erro na análise com LLM: {str(e)}"
     
-    def _build_system_prompt(self, climate_data: Optional[Dict[str, Any]] = None) -> str:
+    def _build_system_prompt(self, context: Optional[str] = None) -> str:
         """Constrói o prompt do sistema"""
         base_prompt = """Você é um assistente especializado em análise climática. 
         Você tem acesso a dados meteorológicos da API iCrop e pode analisar informações sobre:
@@ -71,8 +161,8 @@ class LLMAnalysisAgent:
         
         Sempre seja preciso e use os dados disponíveis para fundamentar suas respostas."""
         
-        if climate_data:
-            base_prompt += f"\n\nDados climáticos disponíveis: {json.dumps(climate_data, indent=2)}"
+        if context:
+            base_prompt += f"\n\nDados climáticos disponíveis:\n{context}"
         
         return base_prompt
     
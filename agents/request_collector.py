@@ -1,10 +1,35 @@
 """
 Agente responsável por coletar e estruturar pedidos do usuário
 """
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Hashable, Optional, List, Set, TypedDict
 from datetime import datetime, timedelta
 import re
 from enum import Enum
+from services.keyword_matcher import KeywordMatcher, KeywordHit
+from services.text import normalize_text
+
+# Padrões aplicados ao texto já normalizado (minúsculas, sem acentos), compilados uma única vez
+_STATION_ID = re.compile(r'id\s*(\d+)')
+_DIGIT = re.compile(r'\d')
+# Separador obrigatório e grupos na ordem dia, mês, ano
+_DATE_PATTERNS = [
+    ('/', re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})'), (1, 2, 3)),  # DD/MM/YYYY
+    ('-', re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})'), (3, 2, 1)),  # YYYY-MM-DD
+    ('-', re.compile(r'(\d{1,2})-(\d{1,2})-(\d{4})'), (1, 2, 3)),  # DD-MM-YYYY
+]
+_TIME_PATTERNS = [
+    (':', re.compile(r'(\d{1,2}):(\d{2})')),  # HH:MM
+    ('h', re.compile(r'(\d{1,2})h')),  # HHh
+]
+_PERIOD_WORDS = re.compile(r'\b(ontem|hoje|semana|mes)\b')
+# Período relativo ("últimas 12h", "últimos 3 dias"), verificado antes do padrão HHh
+_RELATIVE_PERIOD = re.compile(r'\bultim[ao]s\s+(\d+)\s*(h|horas?|d|dias?)\b')
+
+# Deslocamentos usados na conversão de períodos
+_ONE_DAY = timedelta(days=1)
+_SIX_DAYS = timedelta(days=6)
+_END_OF_DAY = timedelta(days=1, seconds=-1)
+_END_OF_HOUR = timedelta(hours=1, seconds=-1)
 
 class DataType(Enum):
     """Tipos de dados que podem ser solicitados"""
@@ -17,6 +42,47 @@ class DataType(Enum):
     WIND = "wind"
     RADIATION = "radiation"
 
+class RequestIntent(Enum):
+    """Intenção principal do pedido"""
+    LIST_STATIONS = "list_stations"
+    CLIMATE_DATA = "climate_data"
+    COMPARE_STATIONS = "compare_stations"
+    ANALYSIS = "analysis"
+
+class StationRequest(TypedDict):
+    """Estação pedida"""
+    name: Optional[str]
+    id: Optional[int]
+    found: bool
+
+class DataTypeRequest(TypedDict):
+    """Tipos de dados pedidos (valores de DataType)"""
+    primary: Optional[str]
+    secondary: List[str]
+    specific: List[str]
+
+class DateTimeRequest(TypedDict):
+    """Data e hora pedidas"""
+    date: Optional[str]
+    time: Optional[str]
+    is_specific: bool
+    is_current: bool
+    period: Optional[str]  # 'hour', 'day', 'week', 'month', 'hours' (últimas N horas) ou 'days' (últimos N dias)
+    start: Optional[str]  # 'YYYY-MM-DD HH:MM:SS'
+    end: Optional[str]  # 'YYYY-MM-DD HH:MM:SS'
+
+class ClimateRequest(TypedDict):
+    """Pedido estruturado produzido por RequestCollectorAgent.collect_request"""
+    intent: str
+    station: StationRequest
+    stations: List[StationRequest]  # Todas as estações citadas (comparação quando há mais de uma)
+    data_type: DataTypeRequest
+    datetime: DateTimeRequest
+    original_input: str
+    processed: bool
+    needs_more_info: bool
+    friendly_message: str
+
 class RequestCollectorAgent:
     """Agente para coletar e estruturar pedidos do usuário"""
     
@@ -27,7 +93,7 @@ class RequestCollectorAgent:
             DataType.FORECAST: ['previsão', 'previsao', 'previsões', 'previsoes', 'futuro', 'amanhã', 'amanha'],
             DataType.HOURLY: ['hora', 'horário', 'horario', 'por hora'],
             DataType.HUMIDITY: ['umidade', 'úmido', 'umido'],
-            DataType.RAIN: ['chuva', 'precipitação', 'precipitacao'],
+            DataType.RAIN: ['chuva', 'choveu', 'chover', 'precipitação', 'precipitacao'],
             DataType.WIND: ['vento', 'ventoso'],
             DataType.RADIATION: ['radiação', 'radiacao', 'sol', 'solar']
         }
@@ -39,58 +105,113 @@ class RequestCollectorAgent:
             'retirinho', 'formosa', 'guarani', 'itaverá', 'itavera', 'são geraldo', 'sao geraldo',
             'lageado', 'rui terra', 'andreotti', 'lucinha', 'lagoa', 'lineu', 'edson borges'
         ]
+        
+        # Palavras que identificam dados específicos pedidos junto com o tipo principal
+        self.specific_keywords = {
+            'temperature': ['temperatura', 'temp'],
+            'humidity': ['umidade'],
+            'rain': ['chuva', 'choveu', 'chover'],
+            'wind': ['vento'],
+            'radiation': ['radiação', 'radiacao']
+        }
+        
+        # Palavras que indicam data específica
+        self.date_words = ['ontem', 'hoje', 'amanhã', 'amanha', 'semana', 'mês', 'mes']
+        
+        # Palavras que indicam intenção diferente de consultar dados
+        self.intent_keywords = {
+            RequestIntent.LIST_STATIONS: ['listar', 'todas', 'quais são', 'disponiveis', 'disponíveis'],
+            RequestIntent.ANALYSIS: ['analise', 'analisar', 'tendência', 'tendencia', 'interprete', 'interpretar',
+                                     'explique', 'explicar', 'padrão', 'padroes']
+        }
+        
+        self._build_matcher()
     
-    def collect_request(self, user_input: str, previous_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def set_station_keywords(self, station_keywords: List[str]):
+        """
+        Substitui as palavras-chave de estação (ex.: geradas a partir do catálogo)
+        e recompila o matcher
+        """
+        self.station_keywords = list(station_keywords)
+        self._build_matcher()
+    
+    def _build_matcher(self):
+        """
+        Compila todas as palavras-chave em um único matcher
+        
+        As categorias são tuplas de strings, cujo hash é mais barato que o de membros de Enum.
+        """
+        keywords = {}
+        for data_type, words in self.data_keywords.items():
+            keywords[('data', data_type.value)] = words
+        for name, words in self.specific_keywords.items():
+            keywords[('specific', name)] = words
+        keywords['date_word'] = self.date_words
+        for intent, words in self.intent_keywords.items():
+            keywords[('intent', intent.value)] = words
+        keywords['station'] = self.station_keywords
+        self.matcher = KeywordMatcher(keywords)
+        
+        # Categorias consultadas na interpretação, na ordem de prioridade
+        self._data_categories = [(('data', data_type.value), data_type.value) for data_type in self.data_keywords]
+        self._specific_categories = [(('specific', name), name) for name in self.specific_keywords]
+        self._intent_categories = [(('intent', intent.value), intent) for intent in self.intent_keywords]
+        # Comprimento de cada nome de estação no texto normalizado (para descartar sobreposições)
+        self._station_lengths = {word: len(normalize_text(word)) for word in self.station_keywords}
+    
+    def collect_request(self, user_input: str, previous_context: Optional[Dict[str, Any]] = None) -> ClimateRequest:
         """
         Coleta e estrutura o pedido do usuário em JSON com contexto
         
+        É a única etapa de interpretação do texto: os demais agentes consomem
+        o pedido estruturado em vez de analisar a pergunta novamente.
+        
         Args:
             user_input: Entrada do usuário
             previous_context: Contexto da mensagem anterior
             
         Returns:
-            Dict com dados estruturados do pedido
+            ClimateRequest com dados estruturados do pedido
         """
-        input_lower = user_input.lower()
-        
-        # Estrutura base do JSON
-        request_data = {
-            'station': {
-                'name': None,
-                'id': None,
-                'found': False
-            },
-            'data_type': {
-                'primary': None,
-                'secondary': [],
-                'specific': []
-            },
-            'datetime': {
-                'date': None,
-                'time': None,
-                'is_specific': False,
-                'is_current': True
-            },
-            'original_input': user_input,
-            'processed': True,
-            'needs_more_info': False,
-            'friendly_message': ""
-        }
+        text = normalize_text(user_input)
+        
+        # Uma única passada pelo texto encontra todas as palavras-chave
+        hits = self.matcher.find_all(text, normalized=True)
+        categories = {hit.category for hit in hits}
+        
+        # 0. Identificar intenção
+        intent = self._extract_intent(categories)
         
         # 1. Identificar estação (com contexto)
-        station_info = self._extract_station_with_context(input_lower, previous_context)
-        request_data['station'] = station_info
+        station_info = self._extract_station_with_context(text, previous_context, hits)
+        stations = self._extract_stations(text, previous_context, hits) or \
+            ([station_info] if station_info['found'] else [])
+        if len(stations) > 1 and intent is RequestIntent.CLIMATE_DATA:
+            intent = RequestIntent.COMPARE_STATIONS
         
         # 2. Identificar tipo de dados (com contexto)
-        data_types = self._extract_data_types_with_context(input_lower, previous_context)
-        request_data['data_type'] = data_types
+        data_types = self._extract_data_types_with_context(text, previous_context, categories)
         
         # 3. Identificar data e hora
-        datetime_info = self._extract_datetime(input_lower)
-        request_data['datetime'] = datetime_info
+        datetime_info = self._extract_datetime(text, categories)
+        
+        # Estrutura do JSON
+        request_data: ClimateRequest = {
+            'intent': intent.value,
+            'station': station_info,
+            'stations': stations,
+            'data_type': data_types,
+            'datetime': datetime_info,
+            'original_input': user_input,
+            'processed': True,
+            'needs_more_info': False,
+            'friendly_message': ""
+        }
         
-        # 4. Verificar se precisa de mais informações
-        if not station_info['found'] and data_types['primary']:
+        # 4. Verificar se precisa de mais informações (análises podem ser feitas sem estação)
+        if intent is RequestIntent.ANALYSIS:
+            pass
+        elif not station_info['found'] and data_types['primary']:
             request_data['needs_more_info'] = True
             request_data['friendly_message'] = f"Perfeito! Você quer saber sobre **{data_types['primary']}**. De qual estação você gostaria de ver esses dados?"
         elif station_info['found'] and not data_types['primary']:
@@ -103,8 +224,19 @@ class RequestCollectorAgent:
         
         return request_data
     
-    def _extract_station_with_context(self, input_lower: str, previous_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Extrai informações da estação com contexto"""
+    def _extract_intent(self, categories: Set[Hashable]) -> RequestIntent:
+        """Identifica a intenção principal do pedido a partir das categorias encontradas"""
+        for category, intent in self._intent_categories:
+            if category in categories:
+                return intent
+        return RequestIntent.CLIMATE_DATA
+    
+    def _extract_station_with_context(self, text: str, previous_context: Optional[Dict[str, Any]] = None,
+                                      hits: Optional[List[KeywordHit]] = None) -> Dict[str, Any]:
+        """Extrai informações da estação com contexto (texto já normalizado)"""
+        if hits is None:
+            hits = self.matcher.find_all(text)
+        
         station_info = {
             'name': None,
             'id': None,
@@ -112,18 +244,18 @@ class RequestCollectorAgent:
         }
         
         # Buscar por ID
-        id_match = re.search(r'id\s*(\d+)', input_lower)
+        id_match = _STATION_ID.search(text)
         if id_match:
             station_info['id'] = int(id_match.group(1))
             station_info['found'] = True
             return station_info
         
-        # Buscar por nome
-        for keyword in self.station_keywords:
-            if keyword in input_lower:
-                station_info['name'] = keyword
-                station_info['found'] = True
-                return station_info
+        # Buscar por nome (primeira estação citada no texto)
+        station_hit = next((hit for hit in hits if hit.category == 'station'), None)
+        if station_hit:
+            station_info['name'] = station_hit.keyword
+            station_info['found'] = True
+            return station_info
         
         # Se não encontrou e há contexto anterior, usar estação do contexto
         if previous_context and previous_context.get('station', {}).get('found'):
@@ -131,8 +263,41 @@ class RequestCollectorAgent:
         
         return station_info
     
-    def _extract_data_types_with_context(self, input_lower: str, previous_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def _extract_stations(self, text: str, previous_context: Optional[Dict[str, Any]] = None,
+                          hits: Optional[List[KeywordHit]] = None) -> List[StationRequest]:
+        """
+        Extrai todas as estações citadas no texto, na ordem em que aparecem
+        
+        Sem estação no texto, mantém as estações de uma comparação anterior.
+        """
+        if hits is None:
+            hits = self.matcher.find_all(text)
+        
+        found = [(match.start(), {'name': None, 'id': int(match.group(1)), 'found': True})
+                 for match in _STATION_ID.finditer(text)]
+        
+        # Nomes sobrepostos (ex.: palavra-chave contida em outra) contam uma vez só
+        end = -1
+        for hit in hits:
+            if hit.category != 'station' or hit.start < end:
+                continue
+            found.append((hit.start, {'name': hit.keyword, 'id': None, 'found': True}))
+            end = hit.start + self._station_lengths[hit.keyword]
+        
+        # IDs e nomes vêm de buscas separadas: a posição no texto define a ordem
+        found.sort(key=lambda item: item[0])
+        stations = [station for _, station in found]
+        
+        if not stations and previous_context and len(previous_context.get('stations') or []) > 1:
+            stations = [station.copy() for station in previous_context['stations']]
+        return stations
+    
+    def _extract_data_types_with_context(self, text: str, previous_context: Optional[Dict[str, Any]] = None,
+                                         categories: Optional[Set[Hashable]] = None) -> Dict[str, Any]:
         """Extrai tipos de dados com contexto"""
+        if categories is None:
+            categories = self.matcher.categories(text)
+        
         data_types = {
             'primary': None,
             'secondary': [],
@@ -140,12 +305,12 @@ class RequestCollectorAgent:
         }
         
         # Identificar tipo primário
-        for data_type, keywords in self.data_keywords.items():
-            if any(keyword in input_lower for keyword in keywords):
+        for category, value in self._data_categories:
+            if category in categories:
                 if data_types['primary'] is None:
-                    data_types['primary'] = data_type.value
+                    data_types['primary'] = value
                 else:
-                    data_types['secondary'].append(data_type.value)
+                    data_types['secondary'].append(value)
         
         # Se não encontrou e há contexto anterior, usar tipo do contexto
         if not data_types['primary'] and previous_context and previous_context.get('data_type', {}).get('primary'):
@@ -156,65 +321,133 @@ class RequestCollectorAgent:
             data_types['primary'] = DataType.CLIMATE.value
         
         # Identificar dados específicos
-        if 'temperatura' in input_lower or 'temp' in input_lower:
-            data_types['specific'].append('temperature')
-        if 'umidade' in input_lower:
-            data_types['specific'].append('humidity')
-        if 'chuva' in input_lower:
-            data_types['specific'].append('rain')
-        if 'vento' in input_lower:
-            data_types['specific'].append('wind')
-        if 'radiação' in input_lower or 'radiacao' in input_lower:
-            data_types['specific'].append('radiation')
+        for category, name in self._specific_categories:
+            if category in categories:
+                data_types['specific'].append(name)
         
         return data_types
     
-    def _extract_datetime(self, input_lower: str) -> Dict[str, Any]:
-        """Extrai informações de data e hora"""
+    def _extract_datetime(self, text: str, categories: Optional[Set[Hashable]] = None) -> Dict[str, Any]:
+        """Extrai informações de data e hora (texto já normalizado)"""
+        if categories is None:
+            categories = self.matcher.categories(text)
+        
         datetime_info = {
             'date': None,
             'time': None,
             'is_specific': False,
-            'is_current': True
+            'is_current': True,
+            'period': None,
+            'start': None,
+            'end': None
         }
         
-        # Verificar se é uma data específica
-        date_patterns = [
-            r'(\d{1,2})/(\d{1,2})/(\d{4})',  # DD/MM/YYYY
-            r'(\d{4})-(\d{1,2})-(\d{1,2})',  # YYYY-MM-DD
-            r'(\d{1,2})-(\d{1,2})-(\d{4})',  # DD-MM-YYYY
-        ]
+        # Datas e horários só são procurados quando o texto tem algum dígito e o separador do formato
+        has_digit = _DIGIT.search(text) is not None
         
-        for pattern in date_patterns:
-            match = re.search(pattern, input_lower)
+        # Verificar se é uma data específica
+        date_parts = None
+        for separator, pattern, groups in _DATE_PATTERNS if has_digit else ():
+            match = separator in text and pattern.search(text)
             if match:
                 datetime_info['date'] = match.group(0)
                 datetime_info['is_specific'] = True
                 datetime_info['is_current'] = False
+                date_parts = tuple(int(match.group(g)) for g in groups)
                 break
         
-        # Verificar se é um horário específico
-        time_patterns = [
-            r'(\d{1,2}):(\d{2})',  # HH:MM
-            r'(\d{1,2})h',  # HHh
-        ]
+        # Verificar se é um período relativo ao momento atual
+        relative = None
+        match = has_digit and 'ultim' in text and _RELATIVE_PERIOD.search(text)
+        if match:
+            datetime_info['is_specific'] = True
+            datetime_info['is_current'] = False
+            relative = (int(match.group(1)), 'hours' if match.group(2).startswith('h') else 'days')
         
-        for pattern in time_patterns:
-            match = re.search(pattern, input_lower)
+        # Verificar se é um horário específico (o "12h" de "últimas 12h" não é horário)
+        time_parts = None
+        for separator, pattern in _TIME_PATTERNS if has_digit and not relative else ():
+            match = separator in text and pattern.search(text)
             if match:
                 datetime_info['time'] = match.group(0)
                 datetime_info['is_specific'] = True
                 datetime_info['is_current'] = False
+                time_parts = (int(match.group(1)), int(match.group(2)) if match.lastindex > 1 else 0)
                 break
         
         # Verificar palavras que indicam data específica
-        specific_date_words = ['ontem', 'hoje', 'amanhã', 'amanha', 'semana', 'mês', 'mes']
-        if any(word in input_lower for word in specific_date_words):
+        words = set()
+        if 'date_word' in categories:
             datetime_info['is_specific'] = True
             datetime_info['is_current'] = False
+            words = set(_PERIOD_WORDS.findall(text))
+        
+        if datetime_info['is_current']:
+            return datetime_info
+        
+        # Converter para um intervalo concreto de datas
+        period, start, end = self._resolve_period(date_parts, time_parts, words, relative)
+        if period:
+            datetime_info['period'] = period
+            datetime_info['start'] = start.isoformat(' ', 'seconds')
+            datetime_info['end'] = end.isoformat(' ', 'seconds')
         
         return datetime_info
     
+    def _resolve_period(self, date_parts: Optional[tuple] = None, time_parts: Optional[tuple] = None,
+                        words: Optional[Set[str]] = None, relative: Optional[tuple] = None):
+        """
+        Converte data/hora/palavras do pedido em um intervalo [início, fim]
+        
+        Args:
+            date_parts: (dia, mês, ano) da data citada
+            time_parts: (hora, minuto) do horário citado
+            words: Palavras de período encontradas ('ontem', 'hoje', 'semana', 'mes')
+            relative: (quantidade, 'hours' ou 'days') de um período relativo ("últimas 12h")
+        
+        Returns:
+            Tuple (período, início, fim) ou (None, None, None) se não houver período
+        """
+        words = words or set()
+        if not (date_parts or time_parts or words or relative):
+            return None, None, None
+        
+        now = self._now()
+        today = datetime(now.year, now.month, now.day)
+        
+        try:
+            if relative and not date_parts:
+                amount, unit = relative
+                if amount < 1:
+                    return None, None, None
+                if unit == 'hours':
+                    end = now.replace(microsecond=0)
+                    return 'hours', end - timedelta(hours=amount), end
+                # Os N dias incluem o dia de hoje, como em 'semana'
+                return 'days', today - timedelta(days=amount - 1), today + _END_OF_DAY
+            if date_parts:
+                day = datetime(date_parts[2], date_parts[1], date_parts[0])
+            elif 'ontem' in words:
+                day = today - _ONE_DAY
+            elif 'hoje' in words or time_parts:
+                day = today
+            elif 'semana' in words:
+                return 'week', today - _SIX_DAYS, today + _END_OF_DAY
+            else:
+                return 'month', datetime(now.year, now.month, 1), today + _END_OF_DAY
+            
+            if time_parts:
+                start = datetime(day.year, day.month, day.day, *time_parts)
+                return 'hour', start, start + _END_OF_HOUR
+            return 'day', day, day + _END_OF_DAY
+        except (ValueError, OverflowError):
+            # Data ou hora inválida (ex.: 31/02/2025, 25h, últimos 99999999 dias)
+            return None, None, None
+    
+    def _now(self) -> datetime:
+        """Data/hora atual (isolado para facilitar testes)"""
+        return datetime.now()
+    
     def get_request_summary(self, request_data: Dict[str, Any]) -> str:
         """Retorna um resumo legível do pedido coletado"""
         summary = "📋 **Resumo do Pedido:**\n\n"
@@ -1,9 +1,10 @@
 """
 Aplicativo principal do Clima.AI
 """
+import time
 import streamlit as st
 from config import Config
-from orchestrator import ClimateChatOrchestrator
+from orchestrator import ClimateChatOrchestrator, ConversationSession
 
 # Configuração da página
 st.set_page_config(
@@ -12,6 +13,12 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource(show_spinner=False)
+def get_orchestrator() -> ClimateChatOrchestrator:
+    """Orquestrador (e caches) compartilhado por todas as sessões do processo"""
+    Config.validate()
+    return ClimateChatOrchestrator()
+
 # Título da aplicação
 st.title("🌤️ Clima.AI")
 st.markdown("---")
@@ -25,30 +32,35 @@ if "messages" not in st.session_state:
         "content": "Olá! O que deseja saber sobre o clima?"
     })
 
-# Inicializar orquestrador apenas uma vez
-if "orchestrator" not in st.session_state:
-    try:
-        Config.validate()
-        st.session_state.orchestrator = ClimateChatOrchestrator()
-        st.session_state.system_status = st.session_state.orchestrator.get_system_status()
-    except Exception as e:
-        st.error(f"❌ Erro na configuração: {str(e)}")
-        st.stop()
+# Orquestrador compartilhado; o contexto da conversa é próprio de cada sessão
+try:
+    orchestrator = get_orchestrator()
+except Exception as e:
+    st.error(f"❌ Erro na configuração: {str(e)}")
+    st.stop()
+
+if "conversation" not in st.session_state:
+    st.session_state.conversation = ConversationSession()
+
+# Status calculado em segundo plano (não espera pelas APIs)
+system_status = orchestrator.get_cached_status()
 
 # Sidebar com informações
 with st.sidebar:
     st.header("ℹ️ Informações do Sistema")
     
     # Status do sistema
-    if st.session_state.system_status['status'] == 'operational':
+    if system_status['status'] == 'operational':
         st.success("✅ Sistema Operacional")
-        st.metric("Estações Disponíveis", st.session_state.system_status['stations_count'])
+        st.metric("Estações Disponíveis", system_status['stations_count'])
+    elif system_status['status'] == 'starting':
+        st.info("⏳ Verificando o sistema...")
     else:
         st.error("❌ Sistema com Erro")
-        st.error(st.session_state.system_status['error'])
+        st.error(system_status['error'])
     
     st.markdown("### 🤖 Agentes")
-    for agent, status in st.session_state.system_status['agents'].items():
+    for agent, status in system_status['agents'].items():
         if status == 'active':
             st.success(f"✅ {agent.replace('_', ' ').title()}")
         else:
@@ -62,6 +74,7 @@ with st.sidebar:
     # Botão para limpar histórico
     if st.button("🗑️ Limpar Conversa"):
         st.session_state.messages = []
+        st.session_state.conversation.reset()
         # Adicionar mensagem inicial do bot novamente
         st.session_state.messages.append({
             "role": "assistant", 
@@ -86,19 +99,31 @@ if prompt := st.chat_input("Pergunte sobre estações, clima, previsões..."):
     with st.chat_message("user"):
         st.markdown(prompt)
     
-    # Exibir indicador de carregamento
+    # Exibir a resposta à medida que é gerada (análises com LLM chegam token a token)
     with st.chat_message("assistant"):
-        with st.spinner("🤔 Processando com os agentes..."):
-            try:
-                # Processar pergunta com o orquestrador
-                response = st.session_state.orchestrator.process_question(prompt)
-                
-                # Adicionar resposta ao histórico
-                st.session_state.messages.append({"role": "assistant", "content": response})
-                
-                # Exibir resposta
-                st.markdown(response)
-            except Exception as e:
-                error_msg = f"❌ Erro no processamento: {str(e)}"
-                st.session_state.messages.append({"role": "assistant", "content": error_msg})
-                st.markdown(error_msg)
\ No newline at end of file
+        placeholder = st.empty()
+        response = ""
+        try:
+            chunks = orchestrator.process_question_stream(prompt, st.session_state.conversation)
+            
+            # Indicador de carregamento até a primeira parte da resposta
+            with st.spinner("🤔 Processando com os agentes..."):
+                response = next(chunks, "")
+            placeholder.markdown(response + "▌")
+            
+            ultima_atualizacao = time.monotonic()
+            for chunk in chunks:
+                response += chunk
+                # Limitar a frequência de redesenho do markdown
+                if time.monotonic() - ultima_atualizacao >= 0.05:
+                    placeholder.markdown(response + "▌")
+                    ultima_atualizacao = time.monotonic()
+            placeholder.markdown(response)
+        except Exception as e:
+            # Mantém a parte da resposta já exibida e acrescenta o erro
+            erro = f"❌ Erro no processamento: {str(e)}"
+            response = f"{response}\n\n{erro}" if response else erro
+            placeholder.markdown(response)
+        
+        # Adicionar resposta ao histórico
+        st.session_state.messages.append({"role": "assistant", "content": response})
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+Corpus de perguntas e estações usado pelos benchmarks
+"""
+
+# Estações de exemplo (mesmo formato do endpoint /estacoes)
+STATIONS = [
+    {'id': 2297, 'nome': 'Usina Estrela'},
+    {'id': 2296, 'nome': 'Narandiba'},
+    {'id': 2301, 'nome': 'Bradesco'},
+    {'id': 2302, 'nome': 'São Paulo'},
+    {'id': 2303, 'nome': 'Califórnia'},
+    {'id': 2304, 'nome': 'Porecatu'},
+    {'id': 2305, 'nome': 'São Cipriano'},
+    {'id': 2306, 'nome': 'Miquelina'},
+    {'id': 2307, 'nome': 'Paraguaçu'},
+    {'id': 2308, 'nome': 'Nadir'},
+    {'id': 2309, 'nome': 'Jubran'},
+    {'id': 2310, 'nome': 'Mosquito'},
+    {'id': 2311, 'nome': 'Mutum'},
+    {'id': 2312, 'nome': 'Tapirus'},
+    {'id': 2313, 'nome': 'Igrejinha'},
+    {'id': 2314, 'nome': 'Primavera'},
+    {'id': 2315, 'nome': 'Bartira'},
+    {'id': 2316, 'nome': 'Retirinho'},
+    {'id': 2317, 'nome': 'Formosa'},
+    {'id': 2318, 'nome': 'Guarani'},
+    {'id': 2319, 'nome': 'Itaverá'},
+    {'id': 2320, 'nome': 'São Geraldo'},
+    {'id': 2321, 'nome': 'Lageado'},
+    {'id': 2322, 'nome': 'Rui Terra'},
+    {'id': 2323, 'nome': 'Andreotti'},
+    {'id': 2324, 'nome': 'Lucinha'},
+    {'id': 2325, 'nome': 'Lagoa'},
+    {'id': 2326, 'nome': 'Lineu'},
+    {'id': 2327, 'nome': 'Edson Borges'},
+]
+
+# Perguntas representativas dos usuários
+QUESTIONS = [
+    "Quais estações estão disponíveis?",
+    "Liste todas as estações",
+    "Quero saber o clima da estação Bradesco",
+    "Temperatura da estação ID 2297",
+    "Como está o clima agora na estação Estrela",
+    "Previsão para amanhã da estação Bradesco",
+    "Como estará o tempo na estação ID 2296",
+    "temperatura em Estrela",
+    "qual a umidade em Narandiba?",
+    "vai chover amanhã em Porecatu?",
+    "chuva em Guarani hoje",
+    "dados por hora de São Cipriano",
+    "vento na estação Miquelina",
+    "radiação solar em Paraguaçu",
+    "está muito quente em Tapirus?",
+    "condições climáticas de Igrejinha",
+    "previsões para os próximos dias em Primavera",
+    "quanto choveu essa semana em Guarani?",
+    "temperatura média do mês em Lageado",
+    "clima ontem em Rui Terra",
+    "umidade às 14h em Lucinha",
+    "temperatura em 12/03/2025 na estação Lagoa",
+    "e a umidade?",
+    "Analise os dados climáticos",
+    "analise a tendência de chuva em Narandiba",
+    "compare a temperatura de Estrela e Porecatu",
+    "chuva em Bradesco, Nadir e Jubran",
+]
+
+# Conversas com perguntas de acompanhamento (usam o contexto anterior)
+CONVERSATIONS = [
+    ["temperatura em Estrela", "e a umidade?", "e em Narandiba?", "previsão para amanhã"],
+    ["clima da estação Bradesco", "e a chuva?", "vento", "e em Porecatu?"],
+    ["umidade em Guarani", "e a temperatura?", "dados por hora"],
+    ["previsão em São Paulo", "e em Lagoa?", "e a radiação?"],
+]
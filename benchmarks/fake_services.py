@@ -0,0 +1,235 @@
+"""
+Servidores locais que imitam as APIs iCrop e OpenRouter
+
+Usados pelos benchmarks para exercitar o pipeline completo sem acesso à rede,
+com latência, tamanho dos payloads e taxa de erro configuráveis.
+
+Uso:
+    with FakeServices(FakeSettings(latency_ms=80, error_rate=0.02)) as fake:
+        orchestrator = ClimateChatOrchestrator()  # Config já aponta para os servidores locais
+"""
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+from benchmarks.corpus import STATIONS
+from config import Config
+
+@dataclass
+class FakeSettings:
+    """Comportamento dos servidores falsos"""
+    latency_ms: float = 50.0         # latência média da iCrop
+    jitter_ms: float = 10.0          # variação uniforme (±) da latência
+    error_rate: float = 0.0          # fração das requisições respondidas com `error_status`
+    error_status: int = 503
+    hourly_rows: int = 168           # medições por hora em /clima_por_hora
+    daily_rows: int = 90             # dias em /clima_por_dia
+    forecast_days: int = 7
+    llm_latency_ms: float = 300.0    # espera até o primeiro token
+    llm_tokens: int = 60             # tokens por resposta
+    llm_token_ms: float = 5.0        # intervalo entre tokens no streaming
+    stations: List[Dict[str, Any]] = field(default_factory=lambda: list(STATIONS))
+
+class _Handler(BaseHTTPRequestHandler):
+    """Rotas das APIs falsas"""
+
+    protocol_version = 'HTTP/1.1'
+    ROUTE = re.compile(r'^/(clima_por_dia|clima_por_hora|previsao)/(\d+)$')
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def fake(self) -> 'FakeServices':
+        return self.server.fake
+
+    def do_GET(self):
+        path = self.path.split('?')[0].rstrip('/')
+        self.fake._count(path)
+        if self.fake._fail():
+            self._send_json({'error': 'indisponível'}, self.fake.settings.error_status)
+            return
+        self.fake._sleep(self.fake.settings.latency_ms)
+
+        if path.endswith('/estacoes'):
+            self._send_json(self.fake.settings.stations)
+            return
+        match = self.ROUTE.search(path)
+        if match is None:
+            self._send_json({'error': 'não encontrado'}, 404)
+            return
+        self._send_body(self.fake.payload(match.group(1), int(match.group(2))))
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            request = {}
+        self.fake._count('/chat/completions')
+        if self.fake._fail():
+            self._send_json({'error': {'message': 'indisponível'}}, self.fake.settings.error_status)
+            return
+
+        settings = self.fake.settings
+        self.fake._sleep(settings.llm_latency_ms)
+        tokens = [f"palavra{i} " for i in range(settings.llm_tokens)]
+        if not request.get('stream'):
+            self.fake._sleep(settings.llm_token_ms * settings.llm_tokens)
+            self._send_json({'choices': [{'message': {'content': ''.join(tokens)}}]})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            self._write_chunk(': OPENROUTER PROCESSING\n\n')
+            for token in tokens:
+                self._write_chunk('data: ' + json.dumps({'choices': [{'delta': {'content': token}}]}) + '\n\n')
+                self.fake._sleep(settings.llm_token_ms, jitter=False)
+            self._write_chunk('data: [DONE]\n\n')
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # O cliente parou de ler o stream
+            pass
+
+    def _write_chunk(self, text: str):
+        data = text.encode('utf-8')
+        self.wfile.write(b'%x\r\n' % len(data) + data + b'\r\n')
+        self.wfile.flush()
+
+    def _send_json(self, value: Any, status: int = 200):
+        self._send_body(json.dumps(value, ensure_ascii=False).encode('utf-8'), status)
+
+    def _send_body(self, body: bytes, status: int = 200):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Leitura em streaming interrompida pelo cliente (sincronização incremental)
+            pass
+
+class FakeServices:
+    """
+    Servidor HTTP local com as rotas da iCrop e do OpenRouter
+
+    Ao iniciar, aponta Config.ICROP_BASE_URL e Config.OPENROUTER_URL para si;
+    deve ser iniciado antes de criar o orquestrador (os clientes HTTP são
+    criados uma vez por processo).
+    """
+
+    def __init__(self, settings: Optional[FakeSettings] = None, host: str = '127.0.0.1', port: int = 0):
+        self.settings = settings or FakeSettings()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._payloads: Dict[Any, bytes] = {}
+        self._random = random.Random(42)
+        self.requests: Dict[str, int] = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeServices':
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-services", daemon=True)
+        self._thread.start()
+        Config.ICROP_BASE_URL = self.url
+        Config.OPENROUTER_URL = f"{self.url}/chat/completions"
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeServices':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = {}
+
+    def payload(self, endpoint: str, station_id: int) -> bytes:
+        """Corpo JSON do endpoint para a estação (gerado uma vez e reaproveitado)"""
+        key = (endpoint, station_id, int(time.time() // 3600))
+        with self._lock:
+            body = self._payloads.get(key)
+        if body is None:
+            generators = {'clima_por_hora': self._hourly, 'clima_por_dia': self._daily, 'previsao': self._forecast}
+            body = json.dumps(generators[endpoint](station_id), ensure_ascii=False).encode('utf-8')
+            with self._lock:
+                self._payloads[key] = body
+        return body
+
+    def _hourly(self, station_id: int) -> List[Dict[str, Any]]:
+        """Medições por hora, da mais recente para a mais antiga"""
+        rng = random.Random(station_id)
+        agora = datetime.now().replace(minute=0, second=0, microsecond=0)
+        registros = []
+        for i in range(self.settings.hourly_rows):
+            instante = agora - timedelta(hours=i)
+            temp = 22 + 6 * rng.random() + (4 if 10 <= instante.hour <= 16 else 0)
+            registros.append({
+                'datahora': instante.strftime('%Y-%m-%d %H:%M:%S'),
+                'temp_min': round(temp - 1, 1), 'temp_max': round(temp + 1, 1), 'temp_med': round(temp, 1),
+                'umidade': round(50 + 40 * rng.random(), 1),
+                'chuva': round(rng.random() * 4, 1) if rng.random() < 0.1 else 0.0,
+                'vento': round(2 + 10 * rng.random(), 1),
+                'radiacao': round(800 * rng.random(), 1) if 6 <= instante.hour <= 18 else 0.0
+            })
+        return registros
+
+    def _daily(self, station_id: int) -> List[Dict[str, Any]]:
+        """Registros diários, do mais recente para o mais antigo"""
+        rng = random.Random(station_id * 7)
+        hoje = datetime.now().date()
+        return [{
+            'data': (hoje - timedelta(days=i)).isoformat(),
+            'temp_min': round(15 + 5 * rng.random(), 1), 'temp_max': round(27 + 6 * rng.random(), 1),
+            'temp_med': round(22 + 4 * rng.random(), 1), 'umidade': round(55 + 30 * rng.random(), 1),
+            'chuva': round(rng.random() * 25, 1) if rng.random() < 0.3 else 0.0,
+            'vento': round(3 + 8 * rng.random(), 1), 'radiacao': round(150 + 150 * rng.random(), 1)
+        } for i in range(self.settings.daily_rows)]
+
+    def _forecast(self, station_id: int) -> List[Dict[str, Any]]:
+        rng = random.Random(station_id * 13)
+        hoje = datetime.now().date()
+        return [{
+            'data': (hoje + timedelta(days=i)).isoformat(),
+            'temp_min': round(16 + 4 * rng.random(), 1), 'temp_max': round(28 + 5 * rng.random(), 1),
+            'rain_prob': rng.randint(0, 90), 'rain_total': round(rng.random() * 20, 1),
+            'wind_spd': round(3 + 8 * rng.random(), 1), 'obs': rng.choice(['ensolarado', 'nublado', 'chuvoso'])
+        } for i in range(self.settings.forecast_days)]
+
+    def _count(self, path: str):
+        rota = '/' + path.strip('/').split('/')[0]
+        with self._lock:
+            self.requests[rota] = self.requests.get(rota, 0) + 1
+
+    def _fail(self) -> bool:
+        if self.settings.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.settings.error_rate
+
+    def _sleep(self, ms: float, jitter: bool = True):
+        if jitter and self.settings.jitter_ms:
+            with self._lock:
+                ms += self._random.uniform(-self.settings.jitter_ms, self.settings.jitter_ms)
+        if ms > 0:
+            time.sleep(ms / 1000)
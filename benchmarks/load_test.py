@@ -0,0 +1,250 @@
+"""
+Teste de carga com conversas simultâneas
+
+Simula N usuários, cada um conduzindo conversas com perguntas de acompanhamento
+("e a umidade?", "e em Narandiba?") que dependem do contexto da mensagem
+anterior. O número de usuários aumenta em etapas (1, 2, 4, ...) e, a cada
+etapa, são medidos vazão, latência de cauda, taxa de erro e perdas de contexto.
+A carga para quando o ponto de saturação é encontrado.
+
+Alvos:
+- em processo (padrão): ClimateChatOrchestrator com as APIs falsas locais
+- HTTP (--url): servidor da API (server.py), POST /ask com session_id
+
+Uso:
+    python -m benchmarks.load_test [--max-users 128] [--stage-seconds 10] [--think-ms 200]
+    python -m benchmarks.load_test --url http://localhost:8080 --slo-ms 2000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from benchmarks.corpus import CONVERSATIONS, STATIONS
+from benchmarks.fake_services import FakeServices, FakeSettings
+from benchmarks.pipeline_benchmark import isolate_environment, summarize
+from config import Config
+
+# Perguntas de acompanhamento usadas nas conversas geradas
+FOLLOW_UPS = ["e a umidade?", "e a chuva?", "e a temperatura?", "vento", "previsão para amanhã",
+              "e a radiação?", "dados por hora"]
+OPENINGS = ["temperatura em {}", "clima da estação {}", "umidade em {}", "chuva em {}", "previsão em {}"]
+
+def build_conversations(count: int = 40, seed: int = 7) -> List[List[str]]:
+    """Conversas do corpus mais conversas geradas sobre as estações de exemplo"""
+    rng = random.Random(seed)
+    conversas = [list(conversa) for conversa in CONVERSATIONS]
+    for _ in range(count):
+        estacao = rng.choice(STATIONS)['nome']
+        conversa = [rng.choice(OPENINGS).format(estacao)]
+        for _ in range(rng.randint(1, 4)):
+            if rng.random() < 0.25:
+                conversa.append(f"e em {rng.choice(STATIONS)['nome']}?")
+            else:
+                conversa.append(rng.choice(FOLLOW_UPS))
+        conversas.append(conversa)
+    return conversas
+
+def lost_context(turn: int, answer: str) -> bool:
+    """Pergunta de acompanhamento respondida sem a estação da mensagem anterior"""
+    return turn > 0 and 'Identifiquei' not in answer and not answer.startswith(('❌', '⚠️'))
+
+class InProcessTarget:
+    """Conversas atendidas diretamente por um orquestrador neste processo"""
+
+    def __init__(self, orchestrator):
+        self.orchestrator = orchestrator
+
+    async def start(self):
+        # Mesma configuração do servidor: chamadas bloqueantes em um pool maior
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=Config.SERVER_THREADS, thread_name_prefix='clima-load')
+        )
+
+    def new_session(self):
+        from orchestrator import ConversationSession
+        return ConversationSession()
+
+    async def ask(self, question: str, session) -> str:
+        return await self.orchestrator.process_question_async(question, session)
+
+    async def close(self):
+        pass
+
+class HttpTarget:
+    """Conversas enviadas à API HTTP (server.py)"""
+
+    def __init__(self, url: str, timeout: float = 120):
+        self.url = url.rstrip('/') + '/ask'
+        self.timeout = timeout
+        self._client = None
+
+    async def start(self):
+        import aiohttp
+        self._client = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=0),
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+
+    def new_session(self) -> str:
+        return uuid.uuid4().hex
+
+    async def ask(self, question: str, session_id: str) -> str:
+        async with self._client.post(self.url, json={'question': question, 'session_id': session_id}) as response:
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}")
+            return (await response.json())['answer']
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+
+async def run_stage(target, users: int, duration: float, think_ms: float,
+                    conversations: List[List[str]]) -> Dict[str, Any]:
+    """Mantém `users` conversas simultâneas por `duration` segundos"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    latencies: List[float] = []
+    counters = {'errors': 0, 'context_misses': 0, 'conversations': 0}
+
+    async def user(index: int):
+        rng = random.Random(index)
+        await asyncio.sleep(rng.uniform(0, think_ms / 1000))  # desencontra os usuários
+        while loop.time() < deadline:
+            session = target.new_session()
+            counters['conversations'] += 1
+            for turn, question in enumerate(rng.choice(conversations)):
+                if loop.time() >= deadline:
+                    break
+                start = time.perf_counter()
+                try:
+                    answer = await target.ask(question, session)
+                    error = answer.startswith('❌')
+                    if lost_context(turn, answer):
+                        counters['context_misses'] += 1
+                except Exception:
+                    error = True
+                latencies.append(time.perf_counter() - start)
+                counters['errors'] += error
+                if think_ms:
+                    await asyncio.sleep(think_ms / 1000 * rng.uniform(0.5, 1.5))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(users)))
+    result = summarize(latencies, counters['errors'], time.perf_counter() - started)
+    result.update(users=users, conversations=counters['conversations'], context_misses=counters['context_misses'])
+    return result
+
+def find_saturation(stages: List[Dict[str, Any]], max_error_rate: float = 0.05, slo_ms: Optional[float] = None,
+                    min_gain: float = 0.1) -> Optional[Dict[str, Any]]:
+    """
+    Primeira etapa em que o sistema satura
+
+    Critérios: taxa de erro acima do limite, p95 acima do SLO, ou vazão que
+    deixa de crescer (ganho abaixo de `min_gain`) enquanto o p95 sobe 50%.
+
+    Returns:
+        Dict com o último número de usuários atendido bem ('users'), o número
+        em que saturou e os motivos; None se nenhuma etapa saturou
+    """
+    previous = None
+    for stage in stages:
+        reasons = []
+        if stage['error_rate'] > max_error_rate:
+            reasons.append(f"taxa de erro {stage['error_rate']:.1%} > {max_error_rate:.1%}")
+        if slo_ms and stage['p95_ms'] > slo_ms:
+            reasons.append(f"p95 {stage['p95_ms']:.0f} ms > SLO {slo_ms:.0f} ms")
+        if previous is not None and stage['throughput_qps'] < previous['throughput_qps'] * (1 + min_gain) \
+                and stage['p95_ms'] > previous['p95_ms'] * 1.5:
+            reasons.append(f"vazão estagnou ({previous['throughput_qps']:.1f} -> {stage['throughput_qps']:.1f}/s) "
+                           f"com p95 {previous['p95_ms']:.0f} -> {stage['p95_ms']:.0f} ms")
+        if reasons:
+            return {
+                'users': previous['users'] if previous else 0,
+                'throughput_qps': previous['throughput_qps'] if previous else 0.0,
+                'saturated_at': stage['users'],
+                'reasons': reasons
+            }
+        previous = stage
+    return None
+
+def user_levels(start: int, maximum: int) -> List[int]:
+    """Números de usuários por etapa, dobrando a cada etapa"""
+    levels, users = [], max(1, start)
+    while users < maximum:
+        levels.append(users)
+        users *= 2
+    levels.append(maximum)
+    return levels
+
+async def ramp(target, levels: List[int], stage_seconds: float, think_ms: float, max_error_rate: float,
+               slo_ms: Optional[float], stop_on_saturation: bool = True) -> Dict[str, Any]:
+    """Executa as etapas em ordem crescente de usuários até saturar"""
+    conversations = build_conversations()
+    stages: List[Dict[str, Any]] = []
+    saturation = None
+    await target.start()
+    try:
+        for users in levels:
+            stage = await run_stage(target, users, stage_seconds, think_ms, conversations)
+            stages.append(stage)
+            _print_stage(stage)
+            saturation = find_saturation(stages, max_error_rate, slo_ms)
+            if saturation is not None and stop_on_saturation:
+                break
+    finally:
+        await target.close()
+    return {'stages': stages, 'saturation': saturation}
+
+def _print_stage(stage: Dict[str, Any]):
+    print(f"{stage['users']:>5} usuários | {stage['throughput_qps']:>8.1f} msg/s | p50 {stage['p50_ms']:>8.1f} ms | "
+          f"p95 {stage['p95_ms']:>8.1f} ms | p99 {stage['p99_ms']:>8.1f} ms | erros {stage['error_rate']:>6.1%} | "
+          f"sem contexto {stage['context_misses']}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga com conversas simultâneas")
+    parser.add_argument('--url', help="URL da API HTTP (padrão: orquestrador em processo com APIs falsas)")
+    parser.add_argument('--start-users', type=int, default=1)
+    parser.add_argument('--max-users', type=int, default=128)
+    parser.add_argument('--stage-seconds', type=float, default=10.0, help="duração de cada etapa")
+    parser.add_argument('--think-ms', type=float, default=200.0, help="pausa média entre mensagens de um usuário")
+    parser.add_argument('--slo-ms', type=float, help="p95 máximo aceitável")
+    parser.add_argument('--max-error-rate', type=float, default=0.05)
+    parser.add_argument('--no-stop', action='store_true', help="executa todas as etapas mesmo após saturar")
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="latência da iCrop falsa (em processo)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="taxa de erro da iCrop falsa (em processo)")
+    parser.add_argument('--output', help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    levels = user_levels(args.start_users, args.max_users)
+    run_args = (levels, args.stage_seconds, args.think_ms, args.max_error_rate, args.slo_ms, not args.no_stop)
+
+    if args.url:
+        print(f"Alvo: {args.url}")
+        result = asyncio.run(ramp(HttpTarget(args.url), *run_args))
+    else:
+        isolate_environment()
+        settings = FakeSettings(latency_ms=args.latency_ms, error_rate=args.error_rate)
+        with FakeServices(settings) as fake:
+            from orchestrator import ClimateChatOrchestrator
+            orchestrator = ClimateChatOrchestrator()
+            orchestrator.health.stop()
+            print(f"Alvo: orquestrador em processo (APIs falsas em {fake.url})")
+            result = asyncio.run(ramp(InProcessTarget(orchestrator), *run_args))
+
+    saturation = result['saturation']
+    if saturation is None:
+        print(f"\nSem saturação até {result['stages'][-1]['users']} usuários")
+    else:
+        print(f"\nSaturação em {saturation['saturated_at']} usuários: {'; '.join(saturation['reasons'])}")
+        print(f"Capacidade: {saturation['users']} usuários simultâneos ({saturation['throughput_qps']:.1f} msg/s)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Microbenchmark do custo de interpretação de uma pergunta
+
+Compara o código de interpretação da versão de referência (por padrão, o
+primeiro commit do repositório: RequestCollectorAgent.collect_request,
+verificação de listagem e busca da estação nas funções _find_station_by_id /
+_find_station_by_name do orquestrador) com o caminho atual do orquestrador
+(collect_request com intenção tipada + busca no catálogo indexado).
+
+A versão de referência é extraída do git e executada sem alterações em um
+processo separado; só a lista de estações é fixa (sem acesso à rede) nas
+duas versões. As rodadas das duas versões são intercaladas e vale a melhor de
+cada uma, para que variações de velocidade da máquina afetem ambas igualmente.
+
+Uso:
+    python -m benchmarks.parse_benchmark [--repeat N] [--rounds N] [--baseline REF]
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from agents.request_collector import RequestCollectorAgent, RequestIntent
+from benchmarks.corpus import QUESTIONS, STATIONS
+from services.station_catalog import StationCatalog
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Arquivos da versão de referência usados na interpretação
+BASELINE_PATHS = ('agents', 'orchestrator.py', 'config.py')
+
+# Executado no diretório da versão de referência; lê perguntas e estações do stdin
+BASELINE_SCRIPT = """
+import json, sys, time
+from agents.request_collector import RequestCollectorAgent
+from agents.station_identifier import StationIdentifierAgent
+from orchestrator import ClimateChatOrchestrator
+
+params = json.load(sys.stdin)
+identifier = StationIdentifierAgent()
+identifier.get_all_stations = lambda: params['stations']
+orchestrator = ClimateChatOrchestrator.__new__(ClimateChatOrchestrator)
+orchestrator.station_identifier = identifier
+orchestrator.request_collector = RequestCollectorAgent()
+
+def parse(question):
+    # Passos 1, 2 e 4 de ClimateChatOrchestrator.process_question da versão de referência
+    request_data = orchestrator.request_collector.collect_request(question, None)
+    if any(word in question.lower() for word in ['listar', 'todas', 'quais são', 'disponiveis', 'disponíveis']):
+        return
+    if request_data['needs_more_info'] or not request_data['station']['found']:
+        return
+    if request_data['station']['id']:
+        orchestrator._find_station_by_id(request_data['station']['id'])
+    else:
+        orchestrator._find_station_by_name(request_data['station']['name'])
+
+def measure(repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in params['questions']:
+            parse(question)
+    return (time.perf_counter() - start) / (repeat * len(params['questions'])) * 1e6
+
+measure(5)
+print(json.dumps({'us_per_question': measure(params['repeat'])}))
+"""
+
+class FixtureStationCatalog(StationCatalog):
+    """Catálogo carregado a partir das estações de exemplo, sem acesso à rede"""
+
+    def _fetch_stations(self) -> List[Dict[str, Any]]:
+        return list(STATIONS)
+
+def _git(*args: str) -> bytes:
+    return subprocess.run(['git', *args], cwd=REPO_ROOT, check=True, capture_output=True).stdout
+
+def default_baseline() -> str:
+    """Primeiro commit do repositório"""
+    return _git('rev-list', '--max-parents=0', 'HEAD').decode().split()[0]
+
+@contextmanager
+def baseline_tree(ref: str) -> Iterator[str]:
+    """Extrai os arquivos de interpretação da versão `ref` em um diretório temporário"""
+    archive = _git('archive', '--format=tar', ref, *BASELINE_PATHS)
+    with tempfile.TemporaryDirectory(prefix='clima-baseline-') as tree:
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            tar.extractall(tree, filter='data')
+        yield tree
+
+def measure_baseline(tree: str, repeat: int) -> float:
+    """Custo por pergunta (µs) do código de interpretação da versão extraída em `tree`"""
+    params = json.dumps({'questions': QUESTIONS, 'stations': STATIONS, 'repeat': repeat})
+    result = subprocess.run([sys.executable, '-c', BASELINE_SCRIPT], cwd=tree, input=params, text=True,
+                            capture_output=True, check=True, env={**os.environ, 'PYTHONPATH': tree})
+    return json.loads(result.stdout.strip().splitlines()[-1])['us_per_question']
+
+def _measure(fn: Callable[[str], Any], questions: List[str], repeat: int) -> float:
+    """Tempo médio por pergunta, em microssegundos"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in questions:
+            fn(question)
+    return (time.perf_counter() - start) / (repeat * len(questions)) * 1e6
+
+def measure_current(repeat: int) -> float:
+    """Custo por pergunta (µs) do caminho atual do orquestrador"""
+    collector = RequestCollectorAgent()
+    catalog = FixtureStationCatalog()
+    catalog.refresh()
+
+    def resolve(station_info: Dict[str, Any]):
+        if station_info['id']:
+            catalog.get_by_id(station_info['id'])
+        elif station_info['found']:
+            catalog.get_by_name(station_info['name'])
+
+    def parse(question: str):
+        # Passos 1 a 4 de ClimateChatOrchestrator._process_question_async, sem buscar dados
+        request_data = collector.collect_request(question)
+        if request_data['intent'] in (RequestIntent.LIST_STATIONS.value, RequestIntent.ANALYSIS.value) \
+                or request_data['needs_more_info']:
+            return
+        if request_data['intent'] == RequestIntent.COMPARE_STATIONS.value:
+            for station_info in request_data['stations']:
+                resolve(station_info)
+        else:
+            resolve(request_data['station'])
+
+    _measure(parse, QUESTIONS, 5)  # aquecimento
+    return _measure(parse, QUESTIONS, repeat)
+
+def run(repeat: int = 500, baseline: Optional[str] = None, rounds: int = 5) -> Dict[str, Any]:
+    """Executa o benchmark e retorna o custo médio por pergunta (melhor rodada de cada versão)"""
+    baseline = baseline or default_baseline()
+    before_us = after_us = float('inf')
+    with baseline_tree(baseline) as tree:
+        for _ in range(rounds):
+            before_us = min(before_us, measure_baseline(tree, repeat))
+            after_us = min(after_us, measure_current(repeat))
+    return {
+        'questions': len(QUESTIONS),
+        'repeat': repeat,
+        'rounds': rounds,
+        'baseline': baseline,
+        'before_us_per_question': round(before_us, 2),
+        'after_us_per_question': round(after_us, 2),
+        'speedup': round(before_us / after_us, 2) if after_us else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de interpretação por pergunta (versão de referência x atual)")
+    parser.add_argument('--repeat', type=int, default=500, help="repetições do corpus")
+    parser.add_argument('--rounds', type=int, default=5, help="rodadas intercaladas de cada versão")
+    parser.add_argument('--baseline', help="commit de referência (padrão: primeiro commit do repositório)")
+    args = parser.parse_args()
+
+    result = run(args.repeat, args.baseline, args.rounds)
+    print(f"Perguntas no corpus: {result['questions']} (x{result['repeat']}, melhor de {result['rounds']} rodadas)")
+    print(f"Referência ({result['baseline'][:10]}): {result['before_us_per_question']:.2f} µs/pergunta")
+    print(f"Atual:                   {result['after_us_per_question']:.2f} µs/pergunta")
+    print(f"Ganho: {result['speedup']}x")
+
+if __name__ == '__main__':
+    main()
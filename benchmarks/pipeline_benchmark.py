@@ -0,0 +1,222 @@
+"""
+Benchmark de ponta a ponta de ClimateChatOrchestrator.process_question
+
+Sobe as APIs falsas (benchmarks/fake_services.py), responde o corpus de
+perguntas e mede percentis de latência e vazão em dois cenários:
+
+- frio: caches de dados climáticos e do LLM limpos antes de cada pergunta
+  (custo das buscas na iCrop e das chamadas ao LLM)
+- quente: caches já populados, com `--concurrency` perguntas simultâneas
+
+Os resultados podem ser gravados como linha de base (benchmarks/baselines/)
+e comparados em execuções seguintes para evidenciar regressões na revisão.
+
+Uso:
+    python -m benchmarks.pipeline_benchmark [--rounds N] [--concurrency C] [--latency-ms MS]
+    python -m benchmarks.pipeline_benchmark --save
+    python -m benchmarks.pipeline_benchmark --compare [--tolerance 0.25]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from benchmarks.corpus import QUESTIONS
+from benchmarks.fake_services import FakeServices, FakeSettings
+from config import Config
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'pipeline_benchmark.json')
+
+# Métricas comparadas com a linha de base: (nome, True se maior é pior)
+COMPARED_METRICS = [('p50_ms', True), ('p95_ms', True), ('throughput_qps', False)]
+
+def isolate_environment():
+    """
+    Configura o processo para medir apenas o pipeline
+
+    Sem histórico em disco, cache do LLM só em memória, sem limite de taxa do
+    LLM, sem pré-carregamento e sem exportação de traces.
+    """
+    Config.HISTORY_STORE_ENABLED = False
+    Config.LLM_CACHE_DISK_PATH = ''
+    Config.LLM_RATE_LIMIT = 0
+    Config.LLM_MAX_IN_FLIGHT = max(Config.LLM_MAX_IN_FLIGHT, 64)
+    Config.PREFETCH_ENABLED = False
+    Config.TRACE_EXPORT_PATH = ''
+    Config.TRACE_OTLP_ENDPOINT = ''
+    Config.METRICS_PORT = 0
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Percentis (ms), taxa de erro e vazão de uma série de medições (s)"""
+    ms = np.asarray(latencies) * 1000
+    p50, p90, p95, p99 = np.percentile(ms, [50, 90, 95, 99]) if len(ms) else (0, 0, 0, 0)
+    return {
+        'count': len(latencies),
+        'errors': errors,
+        'error_rate': round(errors / len(latencies), 4) if latencies else 0.0,
+        'mean_ms': round(float(ms.mean()), 2) if len(ms) else 0.0,
+        'p50_ms': round(float(p50), 2),
+        'p90_ms': round(float(p90), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'max_ms': round(float(ms.max()), 2) if len(ms) else 0.0,
+        'throughput_qps': round(len(latencies) / elapsed, 2) if elapsed else 0.0
+    }
+
+def _ask(orchestrator, question: str) -> Tuple[float, bool, Dict[str, float]]:
+    """Responde uma pergunta em uma conversa nova; retorna (segundos, erro?, tempos por etapa)"""
+    from orchestrator import ConversationSession
+    session = ConversationSession()
+    start = time.perf_counter()
+    answer = orchestrator.process_question(question, session)
+    elapsed = time.perf_counter() - start
+    stages = (session.last_trace or {}).get('stages', {})
+    return elapsed, answer.startswith('❌'), stages
+
+def _mean_stages(all_stages: List[Dict[str, float]]) -> Dict[str, float]:
+    """Tempo médio por pergunta em cada etapa (ms)"""
+    totals: Dict[str, float] = {}
+    for stages in all_stages:
+        for name, ms in stages.items():
+            totals[name] = totals.get(name, 0.0) + ms
+    return {name: round(total / len(all_stages), 2) for name, total in sorted(totals.items())} if all_stages else {}
+
+def run_cold(orchestrator, fake: FakeServices, questions: List[str]) -> Dict[str, Any]:
+    """Cenário frio: limpa os caches antes de cada pergunta (sequencial)"""
+    latencies, errors, stages = [], 0, []
+    fake.reset_counters()
+    started = time.perf_counter()
+    for question in questions:
+        orchestrator.climate_data.cache.clear()
+        if orchestrator.llm_analysis.cache is not None:
+            orchestrator.llm_analysis.cache.clear()
+        elapsed, error, question_stages = _ask(orchestrator, question)
+        latencies.append(elapsed)
+        errors += error
+        stages.append(question_stages)
+    result = summarize(latencies, errors, time.perf_counter() - started)
+    result['stages_mean_ms'] = _mean_stages(stages)
+    result['upstream_requests'] = dict(fake.requests)
+    return result
+
+def run_warm(orchestrator, fake: FakeServices, questions: List[str], concurrency: int) -> Dict[str, Any]:
+    """Cenário quente: caches populados, `concurrency` perguntas simultâneas"""
+    for question in dict.fromkeys(questions):
+        _ask(orchestrator, question)  # aquecimento
+
+    fake.reset_counters()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda question: _ask(orchestrator, question), questions))
+    elapsed = time.perf_counter() - started
+
+    result = summarize([r[0] for r in results], sum(r[1] for r in results), elapsed)
+    result['concurrency'] = concurrency
+    result['stages_mean_ms'] = _mean_stages([r[2] for r in results])
+    result['upstream_requests'] = dict(fake.requests)
+    return result
+
+def run(settings: Optional[FakeSettings] = None, rounds: int = 3, concurrency: int = 8) -> Dict[str, Any]:
+    """Executa os dois cenários sobre o corpus e retorna os resultados"""
+    settings = settings or FakeSettings()
+    isolate_environment()
+    with FakeServices(settings) as fake:
+        from orchestrator import ClimateChatOrchestrator
+        orchestrator = ClimateChatOrchestrator()
+        orchestrator.health.stop()
+        questions = QUESTIONS * rounds
+        return {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'cpus': os.cpu_count()},
+            'settings': {k: v for k, v in asdict(settings).items() if k != 'stations'},
+            'questions': len(questions),
+            'scenarios': {
+                'cold': run_cold(orchestrator, fake, questions),
+                'warm': run_warm(orchestrator, fake, questions, concurrency)
+            }
+        }
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compara com a linha de base
+
+    Returns:
+        Lista de regressões (variação pior que `tolerance`, ex.: 0.25 = 25%)
+    """
+    regressions = []
+    for scenario, current in result['scenarios'].items():
+        reference = baseline.get('scenarios', {}).get(scenario)
+        if not reference:
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS:
+            before, after = reference.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = change > tolerance if higher_is_worse else change < -tolerance
+            flag = '  <-- REGRESSÃO' if worse else ''
+            print(f"  {scenario:5} {metric:15} {before:>10.2f} -> {after:>10.2f} ({change:+.1%}){flag}")
+            if worse:
+                regressions.append(f"{scenario}.{metric}: {before:.2f} -> {after:.2f} ({change:+.1%})")
+    return regressions
+
+def _print_result(result: Dict[str, Any]):
+    print(f"Perguntas por cenário: {result['questions']}")
+    for scenario, stats in result['scenarios'].items():
+        extra = f" (concorrência {stats['concurrency']})" if 'concurrency' in stats else ""
+        print(f"\n[{scenario}]{extra}")
+        print(f"  p50 {stats['p50_ms']:.1f} ms | p90 {stats['p90_ms']:.1f} ms | p95 {stats['p95_ms']:.1f} ms | "
+              f"p99 {stats['p99_ms']:.1f} ms | máx {stats['max_ms']:.1f} ms")
+        print(f"  vazão {stats['throughput_qps']:.1f} perguntas/s | erros {stats['errors']} ({stats['error_rate']:.1%})")
+        print(f"  requisições às APIs: {stats['upstream_requests']}")
+        etapas = sorted(stats['stages_mean_ms'].items(), key=lambda item: -item[1])[:6]
+        print("  etapas (ms/pergunta): " + ", ".join(f"{name} {ms:.1f}" for name, ms in etapas))
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência e vazão do pipeline com APIs falsas locais")
+    parser.add_argument('--rounds', type=int, default=3, help="repetições do corpus por cenário")
+    parser.add_argument('--concurrency', type=int, default=8, help="perguntas simultâneas no cenário quente")
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="latência média da iCrop falsa")
+    parser.add_argument('--llm-latency-ms', type=float, default=300.0, help="espera até o primeiro token do LLM falso")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fração de respostas com erro 503")
+    parser.add_argument('--hourly-rows', type=int, default=168, help="medições em /clima_por_hora")
+    parser.add_argument('--save', action='store_true', help="grava o resultado como linha de base")
+    parser.add_argument('--compare', action='store_true', help="compara com a linha de base")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="variação aceita na comparação")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="arquivo da linha de base")
+    args = parser.parse_args()
+
+    settings = FakeSettings(latency_ms=args.latency_ms, llm_latency_ms=args.llm_latency_ms,
+                            error_rate=args.error_rate, hourly_rows=args.hourly_rows)
+    result = run(settings, args.rounds, args.concurrency)
+    _print_result(result)
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"\nLinha de base não encontrada: {args.baseline}")
+            sys.exit(2)
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nComparação com a linha de base de {baseline.get('created_at')}:")
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressão(ões) acima de {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\nSem regressões")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"\nLinha de base gravada em {args.baseline}")
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,102 @@ class Config:
     # Configurações do modelo
     MODEL_NAME = "deepseek/deepseek-chat-v3.1:free"
     
+    # Cliente HTTP (pool de conexões, timeouts e retentativas)
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))  # segundos
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))  # segundos
+    HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+    HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))  # segundos
+    HTTP_MAX_BACKOFF = float(os.getenv("HTTP_MAX_BACKOFF", "10"))  # segundos
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+    LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))  # segundos
+    HTTP_SINGLE_FLIGHT = os.getenv("HTTP_SINGLE_FLIGHT", "true").lower() == "true"  # agrupa GETs idênticos simultâneos
+    HTTP_HEDGE_ENABLED = os.getenv("HTTP_HEDGE_ENABLED", "false").lower() == "true"  # GET de reserva após o p95
+    HTTP_HEDGE_PERCENTILE = float(os.getenv("HTTP_HEDGE_PERCENTILE", "95"))  # percentil da latência que dispara a reserva
+    HTTP_HEDGE_MIN_DELAY = float(os.getenv("HTTP_HEDGE_MIN_DELAY", "0.05"))  # segundos
+    HTTP_HEDGE_MIN_SAMPLES = int(os.getenv("HTTP_HEDGE_MIN_SAMPLES", "20"))  # medições do endpoint antes de usar reservas
+    HTTP_HEDGE_MAX_RATIO = float(os.getenv("HTTP_HEDGE_MAX_RATIO", "0.1"))  # fração máxima de GETs com reserva
+    LATEST_DAILY_HEDGE_DELAY = float(os.getenv("LATEST_DAILY_HEDGE_DELAY", "1.0"))  # segundos até buscar também os diários (0: só se os por hora falharem)
+    
+    # Disjuntores por endpoint da iCrop (falham na hora enquanto a API está degradada)
+    CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # falhas seguidas para abrir
+    CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))  # segundos aberto antes da chamada de teste
+    
+    # Catálogo de estações (cache em memória)
+    STATION_CATALOG_TTL = int(os.getenv("STATION_CATALOG_TTL", "3600"))  # segundos
+    STATION_MATCH_MIN_CONFIDENCE = float(os.getenv("STATION_MATCH_MIN_CONFIDENCE", "0.5"))
+    STATION_NAME_LOOKUP_CACHE_SIZE = int(os.getenv("STATION_NAME_LOOKUP_CACHE_SIZE", "1024"))  # consultas por nome memorizadas
+    STATION_KEYWORDS_FROM_CATALOG = os.getenv("STATION_KEYWORDS_FROM_CATALOG", "false").lower() == "true"
+    
+    # Cache de dados climáticos por (endpoint, estação), em segundos
+    CLIMATE_CACHE_TTL = {
+        'clima_por_hora': 600,
+        'clima_por_dia': 3600,
+        'previsao': 3 * 3600
+    }
+    CLIMATE_CACHE_STALE_TTL = {
+        'clima_por_hora': 1800,
+        'clima_por_dia': 3 * 3600,
+        'previsao': 6 * 3600
+    }
+    CLIMATE_CACHE_MAX_BYTES = int(os.getenv("CLIMATE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    
+    # Histórico local (SQLite) de todas as medições buscadas (desativado por padrão)
+    HISTORY_STORE_ENABLED = os.getenv("HISTORY_STORE_ENABLED", "false").lower() == "true"
+    HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join("data", "clima_history.db"))
+    
+    # Sincronização incremental dos dados por hora
+    HOURLY_DELTA_SYNC = os.getenv("HOURLY_DELTA_SYNC", "true").lower() == "true"
+    HOURLY_SERIES_MAX_ROWS = int(os.getenv("HOURLY_SERIES_MAX_ROWS", str(90 * 24)))  # medições mantidas por estação
+    
+    # Agendador das chamadas ao LLM (limites do plano gratuito do OpenRouter: ~20 req/min)
+    LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "0.33"))  # requisições por segundo (0 = sem limite)
+    LLM_BURST = int(os.getenv("LLM_BURST", "3"))
+    LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "2"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "60"))  # segundos
+    
+    # Orçamento de tokens do contexto climático enviado ao LLM
+    LLM_CONTEXT_MAX_TOKENS = int(os.getenv("LLM_CONTEXT_MAX_TOKENS", "1200"))
+    
+    # Cache de respostas do LLM (memória + disco opcional)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))  # segundos
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+    LLM_CACHE_DISK_PATH = os.getenv("LLM_CACHE_DISK_PATH", "")  # ex.: data/llm_cache.db (vazio = só memória)
+    
+    # Comparação entre estações
+    COMPARE_MAX_WORKERS = int(os.getenv("COMPARE_MAX_WORKERS", "6"))  # buscas simultâneas
+    
+    # Servidor HTTP (server.py)
+    SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", "8080"))
+    SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))  # processos
+    SERVER_THREADS = int(os.getenv("SERVER_THREADS", "64"))  # threads por processo para as chamadas bloqueantes
+    SERVER_SESSION_TTL = int(os.getenv("SERVER_SESSION_TTL", "1800"))  # segundos sem mensagens
+    SERVER_MAX_SESSIONS = int(os.getenv("SERVER_MAX_SESSIONS", "10000"))
+    SERVER_SESSION_DB = os.getenv("SERVER_SESSION_DB", "")  # SQLite compartilhado entre processos (vazio = memória)
+    SERVER_SESSION_LOCK_TIMEOUT = float(os.getenv("SERVER_SESSION_LOCK_TIMEOUT", "300"))  # segundos de reserva de uma sessão entre processos
+    
+    # Rastreamento da latência por etapa (services/tracing.py)
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")  # ex.: data/traces.jsonl (vazio = sem arquivo)
+    TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "")  # ex.: http://localhost:4318 (coletor OpenTelemetry)
+    TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "clima-ai")
+    
+    # Métricas no formato Prometheus (services/metrics.py)
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # ex.: 9464 (0 = sem servidor próprio; a API usa /metrics)
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    
+    # Verificação de saúde em segundo plano (status exibido no app e em /status)
+    HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "60"))  # segundos
+    
+    # Pré-carregamento em segundo plano de todas as estações
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() == "true"
+    PREFETCH_INTERVAL = int(os.getenv("PREFETCH_INTERVAL", "540"))  # segundos (abaixo do TTL por hora)
+    PREFETCH_MAX_WORKERS = int(os.getenv("PREFETCH_MAX_WORKERS", "4"))
+    PREFETCH_JITTER = float(os.getenv("PREFETCH_JITTER", "2"))  # segundos
+    
     @classmethod
     def validate(cls):
         """Valida se todas as configurações necessárias estão presentes"""
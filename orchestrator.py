@@ -1,60 +1,248 @@
 """
 Orquestrador principal que coordena todos os agentes
 """
-from typing import Dict, Any, Optional
-from agents.question_classifier import QuestionClassifierAgent, QuestionType
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, Iterator, List, NamedTuple, Optional, Tuple, Union
 from agents.station_identifier import StationIdentifierAgent
 from agents.climate_data import ClimateDataAgent
 from agents.llm_analysis import LLMAnalysisAgent
-from agents.request_collector import RequestCollectorAgent
+from agents.request_collector import RequestCollectorAgent, RequestIntent
+from config import Config
+from services.health import HealthMonitor
+from services.metrics import ERRORS, enable_span_metrics, get_metrics, start_metrics_server
+from services.prefetch import get_prefetch_scheduler
+from services.tracing import Trace, bind, span, start_trace
+
+_metrics = get_metrics()
+QUESTIONS = _metrics.counter('clima_questions_total', 'Perguntas recebidas por intenção', ('intent',))
+QUESTION_SECONDS = _metrics.histogram('clima_question_seconds', 'Tempo total de resposta às perguntas', ('kind',))
+QUESTIONS_IN_FLIGHT = _metrics.gauge('clima_questions_in_flight', 'Perguntas em processamento')
+
+class PendingAnalysis(NamedTuple):
+    """Análise com LLM pronta para ser executada (resposta completa ou em streaming)"""
+    prefix: str
+    question: str
+    climate_data: Optional[Dict[str, Any]]
+
+class ConversationSession:
+    """
+    Estado de uma conversa
+    
+    Guarda o pedido da mensagem anterior (contexto para perguntas como "e a
+    umidade?") e identifica a conversa na fila do LLM. Um mesmo orquestrador
+    atende várias sessões ao mesmo tempo. Após cada pergunta, `last_trace`
+    traz o tempo gasto em cada etapa (ver services/tracing.py).
+    """
+    
+    def __init__(self, session_id: Optional[str] = None, previous_context: Optional[Dict[str, Any]] = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.previous_context = previous_context
+        self.turns = 0
+        self.last_trace: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+    
+    def touch(self):
+        """Registra uma nova mensagem na conversa"""
+        self.turns += 1
+        self.updated_at = time.time()
+    
+    def reset(self):
+        """Esquece o contexto da conversa"""
+        self.previous_context = None
 
 class ClimateChatOrchestrator:
-    """Orquestrador principal do sistema de chat climático"""
+    """
+    Orquestrador principal do sistema de chat climático
+    
+    Não guarda estado de conversa (ver ConversationSession): uma instância
+    pode ser compartilhada por todas as sessões do processo.
+    """
     
     def __init__(self):
-        self.question_classifier = QuestionClassifierAgent()
         self.station_identifier = StationIdentifierAgent()
         self.climate_data = ClimateDataAgent()
         self.llm_analysis = LLMAnalysisAgent()
         self.request_collector = RequestCollectorAgent()
-        self.previous_context = None  # Manter contexto entre mensagens
+        self.session = ConversationSession()  # Sessão usada quando nenhuma é informada
+        self._station_keywords_version = None
+        
+        # Status de saúde calculado em segundo plano (get_cached_status)
+        self.health = HealthMonitor(self.get_system_status)
+        self.health.start()
+        
+        # Métricas por etapa (a partir dos spans) e servidor local /metrics (METRICS_PORT)
+        enable_span_metrics()
+        start_metrics_server()
+        
+        # Pré-carregamento opcional dos dados de todas as estações
+        if Config.PREFETCH_ENABLED:
+            get_prefetch_scheduler().start()
+    
+    @property
+    def previous_context(self) -> Optional[Dict[str, Any]]:
+        """Contexto da sessão padrão"""
+        return self.session.previous_context
     
-    def process_question(self, question: str) -> str:
+    @previous_context.setter
+    def previous_context(self, value: Optional[Dict[str, Any]]):
+        self.session.previous_context = value
+    
+    def process_question(self, question: str, session: Optional[ConversationSession] = None) -> str:
         """
         Processa uma pergunta do usuário usando todos os agentes
         
+        Wrapper síncrono (usado pelo Streamlit) de process_question_async.
+        
+        Args:
+            question: Pergunta do usuário
+            session: Conversa à qual a pergunta pertence (padrão: sessão do orquestrador)
+            
+        Returns:
+            str: Resposta formatada
+        """
+        return self._run_sync(self.process_question_async(question, session))
+    
+    async def process_question_async(self, question: str, session: Optional[ConversationSession] = None) -> str:
+        """
+        Processa uma pergunta do usuário de forma assíncrona
+        
         Args:
             question: Pergunta do usuário
+            session: Conversa à qual a pergunta pertence (padrão: sessão do orquestrador)
             
         Returns:
             str: Resposta formatada
         """
+        session = session or self.session
+        started = time.perf_counter()
+        with start_trace('process_question', session_id=session.session_id) as trace, \
+                QUESTIONS_IN_FLIGHT.track_inprogress():
+            result = await self._handle_question_async(question, session)
+            kind = self._question_kind(result)
+            if isinstance(result, PendingAnalysis):
+                with span('llm'):
+                    resposta = await asyncio.to_thread(
+                        self.llm_analysis.analyze_with_context, result.question, result.climate_data, session.session_id
+                    )
+                result = f"{result.prefix}{resposta}"
+        QUESTION_SECONDS.observe(time.perf_counter() - started, kind=kind)
+        self._record_trace(session, trace)
+        return result
+    
+    def process_question_stream(self, question: str, session: Optional[ConversationSession] = None) -> Iterator[str]:
+        """
+        Processa uma pergunta gerando a resposta em partes
+        
+        Respostas com dados são geradas de uma vez; análises com LLM são geradas
+        token a token, à medida que chegam do OpenRouter.
+        
+        Args:
+            question: Pergunta do usuário
+            session: Conversa à qual a pergunta pertence (padrão: sessão do orquestrador)
+            
+        Yields:
+            str: Trechos da resposta formatada
+        """
+        session = session or self.session
+        started = time.perf_counter()
+        with start_trace('process_question', session_id=session.session_id, stream=True) as trace, \
+                QUESTIONS_IN_FLIGHT.track_inprogress():
+            result = self._run_sync(self._handle_question_async(question, session))
+            kind = self._question_kind(result)
+            if not isinstance(result, PendingAnalysis):
+                yield result
+            else:
+                if result.prefix:
+                    yield result.prefix
+                with span('llm'):
+                    yield from self.llm_analysis.stream_analysis(result.question, result.climate_data, session.session_id)
+        QUESTION_SECONDS.observe(time.perf_counter() - started, kind=kind)
+        self._record_trace(session, trace)
+    
+    async def process_question_stream_async(self, question: str,
+                                            session: Optional[ConversationSession] = None) -> AsyncIterator[str]:
+        """
+        Versão assíncrona de process_question_stream (usada pelo servidor HTTP)
+        
+        Os tokens do LLM são lidos em um thread para não bloquear o loop de eventos.
+        """
+        session = session or self.session
+        started = time.perf_counter()
+        with start_trace('process_question', session_id=session.session_id, stream=True) as trace, \
+                QUESTIONS_IN_FLIGHT.track_inprogress():
+            result = await self._handle_question_async(question, session)
+            kind = self._question_kind(result)
+            if not isinstance(result, PendingAnalysis):
+                yield result
+            else:
+                if result.prefix:
+                    yield result.prefix
+                
+                with span('llm'):
+                    chunks = self.llm_analysis.stream_analysis(result.question, result.climate_data, session.session_id)
+                    try:
+                        while True:
+                            chunk = await asyncio.to_thread(next, chunks, None)
+                            if chunk is None:
+                                break
+                            yield chunk
+                    finally:
+                        chunks.close()
+        QUESTION_SECONDS.observe(time.perf_counter() - started, kind=kind)
+        self._record_trace(session, trace)
+    
+    async def _handle_question_async(self, question: str, session: ConversationSession) -> Union[str, PendingAnalysis]:
+        """
+        Interpreta a pergunta e busca os dados necessários
+        
+        Returns:
+            A resposta formatada ou, para análises, o PendingAnalysis a ser enviado ao LLM
+        """
+        session.touch()
         try:
-            # Passo 1: Coletar e estruturar o pedido em JSON com contexto
-            request_data = self.request_collector.collect_request(question, self.previous_context)
+            if Config.STATION_KEYWORDS_FROM_CATALOG:
+                await asyncio.to_thread(self._sync_station_keywords)
+            
+            # Passo 1: Coletar e estruturar o pedido em JSON com contexto (única análise do texto)
+            with span('parse') as current:
+                request_data = self.request_collector.collect_request(question, session.previous_context)
+                if current is not None:
+                    current.set(intent=request_data['intent'], data_type=request_data['data_type']['primary'])
+            QUESTIONS.inc(intent=request_data['intent'])
             
             # Passo 2: Verificar se é uma pergunta para listar estações
-            if any(word in question.lower() for word in ['listar', 'todas', 'quais são', 'disponiveis', 'disponíveis']):
+            if request_data['intent'] == RequestIntent.LIST_STATIONS.value:
                 try:
-                    estacoes = self.station_identifier.get_all_stations()
+                    with span('list_stations'):
+                        estacoes = await asyncio.to_thread(self.station_identifier.get_all_stations)
                     return self.station_identifier._format_stations_list(estacoes)
                 except Exception as e:
                     return f"Erro ao buscar estações: {str(e)}"
             
+            # Passo 2b: Análise com LLM (com os dados das estações citadas, se houver)
+            if request_data['intent'] == RequestIntent.ANALYSIS.value:
+                return await self._prepare_analysis_async(request_data, session)
+            
             # Passo 3: Se precisa de mais informações, retornar mensagem amigável
             if request_data['needs_more_info']:
                 return request_data['friendly_message']
             
+            # Passo 3b: Comparação entre várias estações
+            if request_data['intent'] == RequestIntent.COMPARE_STATIONS.value:
+                return await self._compare_stations_async(request_data, session)
+            
             # Passo 4: Identificar estação se necessário
             station = None
             station_message = ""
             
             if request_data['station']['found']:
                 # Buscar estação por ID ou nome
-                if request_data['station']['id']:
-                    station = self._find_station_by_id(request_data['station']['id'])
-                else:
-                    station = self._find_station_by_name(request_data['station']['name'])
+                with span('station_lookup'):
+                    station = await asyncio.to_thread(self._resolve_station, request_data)
                 
                 if station:
                     station_message = f"✅ Identifiquei a estação: **{station['nome']}** (ID: {station['id']})"
@@ -66,37 +254,130 @@ class ClimateChatOrchestrator:
             # Passo 5: Buscar dados baseado no JSON estruturado
             if station:
                 # Salvar contexto para próxima mensagem
-                self.previous_context = request_data.copy()
+                session.previous_context = request_data.copy()
                 
-                return f"{station_message}\n\n{self.climate_data.get_data_by_request(request_data, station)}"
+                with span('climate_data', station_id=station['id']):
+                    dados = await self.climate_data.get_data_by_request_async(request_data, station)
+                return f"{station_message}\n\n{dados}"
             else:
                 return station_message
                 
         except Exception as e:
+            ERRORS.inc(component='orchestrator', type=type(e).__name__)
             return f"❌ Erro no processamento: {str(e)}"
     
-    def _find_station_by_id(self, station_id: int) -> Optional[Dict[str, Any]]:
-        """Busca estação por ID"""
+    async def _compare_stations_async(self, request_data: Dict[str, Any], session: ConversationSession) -> str:
+        """Resolve as estações citadas e busca os dados de todas em paralelo"""
+        with span('station_lookup'):
+            stations, missing = await self._resolve_stations_async(request_data['stations'])
+        if not stations:
+            return "❌ Não consegui encontrar as estações especificadas."
+        
+        session.previous_context = request_data.copy()
+        aviso = f"\n\n⚠️ Não encontrei: {', '.join(missing)}" if missing else ""
+        
+        if len(stations) == 1:
+            with span('climate_data', station_id=stations[0]['id']):
+                dados = await self.climate_data.get_data_by_request_async(request_data, stations[0])
+            return f"✅ Identifiquei a estação: **{stations[0]['nome']}** (ID: {stations[0]['id']}){aviso}\n\n{dados}"
+        
+        nomes = ", ".join(f"**{station['nome']}**" for station in stations)
+        with span('climate_data', stations=len(stations)):
+            dados = await self.climate_data.compare_stations_async(request_data, stations)
+        return f"✅ Identifiquei as estações: {nomes}{aviso}\n\n{dados}"
+    
+    async def _prepare_analysis_async(self, request_data: Dict[str, Any], session: ConversationSession) -> PendingAnalysis:
+        """Busca em paralelo o contexto das estações citadas para a análise com LLM"""
+        question = request_data['original_input']
+        if not request_data['stations']:
+            return PendingAnalysis("", question, None)
+        
+        with span('station_lookup'):
+            stations, missing = await self._resolve_stations_async(request_data['stations'])
+        if not stations:
+            return PendingAnalysis(f"⚠️ Não encontrei: {', '.join(missing)}. Respondendo sem dados de estação.\n\n",
+                                   question, None)
+        
+        session.previous_context = request_data.copy()
+        with span('climate_data', stations=len(stations)):
+            contextos = await asyncio.gather(*(
+                asyncio.to_thread(self.climate_data.get_analysis_context, station) for station in stations
+            ))
+        climate_data = contextos[0] if len(contextos) == 1 else {'estacoes': list(contextos)}
+        nomes = ", ".join(f"**{station['nome']}**" for station in stations)
+        return PendingAnalysis(f"🧠 Analisando dados de {nomes}\n\n", question, climate_data)
+    
+    async def _resolve_stations_async(self, stations_info: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Resolve em paralelo as estações citadas no pedido
+        
+        Returns:
+            Tuple (estações encontradas, sem repetição; nomes/IDs não encontrados)
+        """
+        resolved = await asyncio.gather(*(
+            asyncio.to_thread(self._resolve_station_info, station_info) for station_info in stations_info
+        ))
+        
+        stations, ids, missing = [], set(), []
+        for station_info, station in zip(stations_info, resolved):
+            if station is None:
+                missing.append(station_info['name'] or f"ID {station_info['id']}")
+            elif station['id'] not in ids:
+                ids.add(station['id'])
+                stations.append(station)
+        return stations, missing
+    
+    def _sync_station_keywords(self):
+        """Atualiza as palavras-chave de estação do coletor quando o catálogo muda"""
+        catalog = self.station_identifier.catalog
+        try:
+            keywords = catalog.get_name_keywords()
+        except Exception:
+            return
+        if catalog.version != self._station_keywords_version:
+            self.request_collector.set_station_keywords(keywords)
+            self._station_keywords_version = catalog.version
+    
+    def _run_sync(self, coro):
+        """Executa uma corrotina a partir de código síncrono"""
         try:
-            estacoes = self.station_identifier.get_all_stations()
-            return next((e for e in estacoes if e['id'] == station_id), None)
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        
+        # Já existe um loop neste thread: executar em um thread separado
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(bind(asyncio.run), coro).result()
+    
+    def _question_kind(self, result: Union[str, PendingAnalysis]) -> str:
+        """Rótulo da pergunta nas métricas de latência"""
+        if isinstance(result, PendingAnalysis):
+            return 'analysis'
+        return 'error' if result.startswith('❌') else 'data'
+    
+    def _record_trace(self, session: ConversationSession, trace: Optional[Trace]):
+        """Guarda na sessão os tempos por etapa da última pergunta"""
+        if trace is not None:
+            session.last_trace = trace.breakdown()
+    
+    def _resolve_station(self, request_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Busca a estação do pedido estruturado"""
+        try:
+            return self.station_identifier.resolve_station(request_data)
         except:
             return None
     
-    def _find_station_by_name(self, station_name: str) -> Optional[Dict[str, Any]]:
-        """Busca estação por nome"""
+    def _resolve_station_info(self, station_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Busca uma das estações citadas no pedido"""
         try:
-            estacoes = self.station_identifier.get_all_stations()
-            station_name_lower = station_name.lower()
-            
-            for estacao in estacoes:
-                if station_name_lower in estacao['nome'].lower():
-                    return estacao
-            
-            return None
+            return self.station_identifier.resolve_station_info(station_info)
         except:
             return None
     
+    def get_cached_status(self) -> Dict[str, Any]:
+        """Retorna o último status calculado em segundo plano, sem acessar as APIs"""
+        return self.health.get_status()
+    
     def get_system_status(self) -> Dict[str, Any]:
         """Retorna o status do sistema"""
         try:
@@ -106,8 +387,14 @@ class ClimateChatOrchestrator:
             return {
                 'status': 'operational',
                 'stations_count': len(stations),
+                'station_catalog': self.station_identifier.catalog.get_stats(),
+                'climate_cache': self.climate_data.cache.get_stats(),
+                'circuit_breakers': self.climate_data.http.get_circuit_states(),
+                'prefetch': get_prefetch_scheduler().get_status(),
+                'history': self.climate_data.history.get_stats() if self.climate_data.history else None,
+                'llm_cache': self.llm_analysis.cache.get_stats() if self.llm_analysis.cache else None,
+                'llm_scheduler': self.llm_analysis.scheduler.get_stats(),
                 'agents': {
-                    'question_classifier': 'active',
                     'station_identifier': 'active',
                     'climate_data': 'active',
                     'llm_analysis': 'active',
@@ -119,7 +406,6 @@ class ClimateChatOrchestrator:
                 'status': 'error',
                 'error': str(e),
                 'agents': {
-                    'question_classifier': 'active',
                     'station_identifier': 'error',
                     'climate_data': 'error',
                     'llm_analysis': 'active',
@@ -0,0 +1,406 @@
+"""
+Servidor HTTP do Clima.AI
+
+Expõe o orquestrador como API para outros clientes (bot de WhatsApp, painéis):
+
+    POST   /ask              {"question": "...", "session_id": "...", "stream": false}
+    GET    /stations
+    GET    /status
+    GET    /metrics          (texto do Prometheus)
+    DELETE /sessions/{id}
+
+O contexto de cada conversa fica no servidor, identificado por session_id.
+Com vários processos (--workers), as sessões ficam em um SQLite compartilhado,
+e as mensagens de uma conversa são atendidas uma de cada vez mesmo quando
+chegam a processos diferentes (trava da sessão no próprio SQLite). O limite de
+chamadas ao LLM é dividido entre os processos. GET /metrics na porta da API
+traz só as métricas do processo que atendeu; com METRICS_PORT, cada processo
+expõe as suas em METRICS_PORT + i (i = 0..N-1), para o Prometheus coletar
+todos. Vários processos exigem SO_REUSEPORT (Linux/macOS); no Windows use
+--workers 1.
+
+Uso:
+    python server.py --port 8080 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from aiohttp import web
+from config import Config
+from orchestrator import ClimateChatOrchestrator, ConversationSession
+from services.metrics import get_metrics
+
+_metrics = get_metrics()
+HTTP_REQUESTS = _metrics.counter('clima_http_requests_total', 'Requisições recebidas pela API',
+                                 ('route', 'status'))
+HTTP_SECONDS = _metrics.histogram('clima_http_request_seconds', 'Latência das requisições da API', ('route',))
+HTTP_IN_FLIGHT = _metrics.gauge('clima_http_in_flight', 'Requisições da API em andamento')
+
+class SessionStore:
+    """
+    Sessões de conversa do servidor
+
+    Sem `path`, ficam em memória (LRU limitado por `max_sessions`); com `path`,
+    ficam em um arquivo SQLite, para que qualquer processo atenda qualquer
+    conversa. Sessões sem mensagens há mais de `ttl` segundos são descartadas.
+
+    A trava da sessão vale entre processos: com SQLite, cada mensagem reserva
+    a sessão na tabela session_locks por até `lock_timeout` segundos (prazo
+    que libera a sessão se o processo cair no meio da mensagem).
+    """
+
+    # Intervalo entre tentativas de reservar uma sessão ocupada por outro processo
+    LOCK_POLL_INTERVAL = 0.02
+
+    def __init__(self, ttl: Optional[int] = None, max_sessions: Optional[int] = None,
+                 path: Optional[str] = None, lock_timeout: Optional[float] = None):
+        self.lock_timeout = lock_timeout if lock_timeout is not None else Config.SERVER_SESSION_LOCK_TIMEOUT
+        self.ttl = ttl if ttl is not None else Config.SERVER_SESSION_TTL
+        self.max_sessions = max_sessions if max_sessions is not None else Config.SERVER_MAX_SESSIONS
+        self.path = path if path is not None else Config.SERVER_SESSION_DB
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self._conn = None
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            with self._lock:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS sessions (
+                        session_id TEXT PRIMARY KEY,
+                        previous_context TEXT,
+                        turns INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                """)
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS session_locks (
+                        session_id TEXT PRIMARY KEY,
+                        owner TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                """)
+                self._conn.commit()
+
+    @asynccontextmanager
+    async def lock(self, session_id: str) -> AsyncIterator[None]:
+        """Trava da sessão: as mensagens de uma mesma conversa são atendidas em ordem, em qualquer processo"""
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_id] = lock
+        async with lock:
+            if self._conn is None:
+                yield
+                return
+            owner = uuid.uuid4().hex
+            while not await asyncio.to_thread(self._acquire, session_id, owner):
+                await asyncio.sleep(self.LOCK_POLL_INTERVAL)
+            try:
+                yield
+            finally:
+                await asyncio.to_thread(self._release, session_id, owner)
+
+    def _acquire(self, session_id: str, owner: str) -> bool:
+        """Reserva a sessão no SQLite se estiver livre (ou com a reserva vencida)"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO session_locks (session_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE session_locks.expires_at < ?",
+                (session_id, owner, now + self.lock_timeout, now)
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def _release(self, session_id: str, owner: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM session_locks WHERE session_id = ? AND owner = ?", (session_id, owner))
+            self._conn.commit()
+
+    def get(self, session_id: str) -> ConversationSession:
+        """Retorna a sessão (uma nova, se não existir ou tiver expirado)"""
+        now = time.time()
+        with self._lock:
+            if self._conn is None:
+                session = self._sessions.get(session_id)
+                if session is not None and now - session.updated_at <= self.ttl:
+                    self._sessions.move_to_end(session_id)
+                    return session
+            else:
+                row = self._conn.execute(
+                    "SELECT previous_context, turns, created_at, updated_at FROM sessions WHERE session_id = ?",
+                    (session_id,)
+                ).fetchone()
+                if row is not None and now - row[3] <= self.ttl:
+                    session = ConversationSession(session_id, json.loads(row[0]) if row[0] else None)
+                    session.turns, session.created_at, session.updated_at = row[1], row[2], row[3]
+                    return session
+        return ConversationSession(session_id)
+
+    def save(self, session: ConversationSession):
+        """Armazena o estado da sessão após uma mensagem"""
+        with self._lock:
+            if self._conn is None:
+                self._sessions[session.session_id] = session
+                self._sessions.move_to_end(session.session_id)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                return
+
+            contexto = json.dumps(session.previous_context, default=str) if session.previous_context else None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, previous_context, turns, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (session.session_id, contexto, session.turns, session.created_at, session.updated_at)
+            )
+            self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> bool:
+        """Remove uma sessão; retorna se ela existia"""
+        with self._lock:
+            if self._conn is None:
+                return self._sessions.pop(session_id, None) is not None
+            cursor = self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._conn is None:
+                return len(self._sessions)
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE updated_at >= ?", (time.time() - self.ttl,)
+            ).fetchone()[0]
+
+@web.middleware
+async def metrics_middleware(request: web.Request, handler) -> web.StreamResponse:
+    """Contagem e latência das requisições por rota"""
+    route = request.match_info.route.resource.canonical if request.match_info.route.resource else 'desconhecida'
+    start = time.perf_counter()
+    status = 500
+    try:
+        with HTTP_IN_FLIGHT.track_inprogress():
+            response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        HTTP_REQUESTS.inc(route=route, status=status)
+        HTTP_SECONDS.observe(time.perf_counter() - start, route=route)
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({'error': message}, status=status)
+
+async def ask(request: web.Request) -> web.StreamResponse:
+    """POST /ask: responde uma pergunta no contexto da conversa (com os tempos por etapa em 'timings')"""
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return _error(400, "Corpo da requisição deve ser um JSON")
+    if not isinstance(body, dict):
+        return _error(400, "Corpo da requisição deve ser um objeto JSON")
+
+    question = str(body.get('question') or '').strip()
+    if not question:
+        return _error(400, "Campo 'question' é obrigatório")
+    session_id = str(body.get('session_id') or request.headers.get('X-Session-Id') or uuid.uuid4().hex)
+
+    orchestrator: ClimateChatOrchestrator = request.app['orchestrator']
+    sessions: SessionStore = request.app['sessions']
+    started = time.perf_counter()
+
+    async with sessions.lock(session_id):
+        session = await asyncio.to_thread(sessions.get, session_id)
+        try:
+            if body.get('stream'):
+                return await _stream_answer(request, orchestrator, session, question, started)
+            answer = await orchestrator.process_question_async(question, session)
+        finally:
+            await asyncio.to_thread(sessions.save, session)
+
+    return web.json_response({
+        'session_id': session_id,
+        'answer': answer,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        'timings': session.last_trace
+    }, dumps=lambda value: json.dumps(value, default=str))
+
+async def _stream_answer(request: web.Request, orchestrator: ClimateChatOrchestrator,
+                         session: ConversationSession, question: str, started: float) -> web.StreamResponse:
+    """Envia a resposta em Server-Sent Events: {"delta": ...} por trecho e, ao final, [DONE]"""
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Session-Id': session.session_id
+    })
+    await response.prepare(request)
+
+    async def send(data: str):
+        await response.write(f"data: {data}\n\n".encode('utf-8'))
+
+    stream = orchestrator.process_question_stream_async(question, session)
+    try:
+        try:
+            async for chunk in stream:
+                await send(json.dumps({'delta': chunk}, ensure_ascii=False))
+        except (ConnectionResetError, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            await send(json.dumps({'error': f"Erro no processamento: {str(e)}"}, ensure_ascii=False))
+        await send(json.dumps({
+            'session_id': session.session_id,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+            'timings': session.last_trace
+        }, default=str))
+        await send('[DONE]')
+        await response.write_eof()
+    except ConnectionResetError:
+        # O cliente desconectou: não há mais para onde escrever
+        pass
+    finally:
+        # Encerra o gerador já, liberando o stream do LLM em vez de esperar o coletor de lixo
+        await stream.aclose()
+    return response
+
+async def stations(request: web.Request) -> web.Response:
+    """GET /stations: lista as estações do catálogo"""
+    orchestrator: ClimateChatOrchestrator = request.app['orchestrator']
+    try:
+        estacoes = await asyncio.to_thread(orchestrator.station_identifier.get_all_stations)
+    except Exception as e:
+        return _error(502, str(e))
+    return web.json_response({'count': len(estacoes), 'stations': estacoes})
+
+async def status(request: web.Request) -> web.Response:
+    """
+    GET /status: status do sistema e do processo que atendeu a requisição
+    
+    O status vem da verificação em segundo plano; ?refresh=1 força uma nova.
+    """
+    orchestrator: ClimateChatOrchestrator = request.app['orchestrator']
+    sessions: SessionStore = request.app['sessions']
+    if request.query.get('refresh'):
+        await asyncio.to_thread(orchestrator.health.refresh)
+    system = orchestrator.get_cached_status()
+    system['server'] = {
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.time() - request.app['started_at'], 1),
+        'sessions': await asyncio.to_thread(len, sessions),
+        'shared_sessions': sessions.path or None
+    }
+    return web.json_response(system, dumps=lambda value: json.dumps(value, default=str))
+
+async def metrics(request: web.Request) -> web.Response:
+    """GET /metrics: métricas do processo no formato de texto do Prometheus"""
+    body = await asyncio.to_thread(_metrics.render)
+    return web.Response(text=body, content_type='text/plain', headers={'X-Worker-Pid': str(os.getpid())})
+
+async def delete_session(request: web.Request) -> web.Response:
+    """DELETE /sessions/{id}: esquece o contexto de uma conversa"""
+    sessions: SessionStore = request.app['sessions']
+    session_id = request.match_info['session_id']
+    async with sessions.lock(session_id):
+        removed = await asyncio.to_thread(sessions.delete, session_id)
+    return web.json_response({'session_id': session_id, 'deleted': removed})
+
+async def _on_startup(app: web.Application):
+    # Chamadas bloqueantes (HTTP, SQLite, LLM) rodam em threads: ampliar o pool padrão
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=Config.SERVER_THREADS, thread_name_prefix='clima-server')
+    )
+
+def create_app(session_db: Optional[str] = None) -> web.Application:
+    """
+    Cria a aplicação aiohttp com um orquestrador por processo
+
+    Args:
+        session_db: Arquivo SQLite das sessões (padrão: Config.SERVER_SESSION_DB)
+    """
+    Config.validate()
+    app = web.Application(middlewares=[metrics_middleware])
+    app['orchestrator'] = ClimateChatOrchestrator()
+    app['sessions'] = SessionStore(path=session_db)
+    app['started_at'] = time.time()
+    app.on_startup.append(_on_startup)
+    app.add_routes([
+        web.post('/ask', ask),
+        web.get('/stations', stations),
+        web.get('/status', status),
+        web.get('/metrics', metrics),
+        web.delete('/sessions/{session_id}', delete_session),
+    ])
+    return app
+
+def run_worker(host: str, port: int, session_db: Optional[str] = None, reuse_port: bool = False,
+               workers: int = 1, index: int = 0):
+    """
+    Executa um processo do servidor
+
+    Com vários processos, cada um fica com uma fração dos limites do LLM
+    (LLM_RATE_LIMIT, LLM_BURST e LLM_MAX_IN_FLIGHT), para que o total respeite
+    os limites configurados; LLM_BURST e LLM_MAX_IN_FLIGHT ficam em no mínimo 1
+    por processo. O processo `index` expõe suas métricas em METRICS_PORT + index.
+    """
+    if Config.METRICS_PORT:
+        Config.METRICS_PORT += index
+    if workers > 1:
+        Config.LLM_RATE_LIMIT = Config.LLM_RATE_LIMIT / workers
+        Config.LLM_BURST = max(1, Config.LLM_BURST // workers)
+        Config.LLM_MAX_IN_FLIGHT = max(1, Config.LLM_MAX_IN_FLIGHT // workers)
+    web.run_app(create_app(session_db), host=host, port=port, reuse_port=reuse_port,
+                print=None if reuse_port else print)
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP do Clima.AI")
+    parser.add_argument('--host', default=Config.SERVER_HOST)
+    parser.add_argument('--port', type=int, default=Config.SERVER_PORT)
+    parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS, help="número de processos")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        run_worker(args.host, args.port)
+        return
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        parser.error("--workers maior que 1 exige SO_REUSEPORT (Linux/macOS), "
+                     "indisponível neste sistema; use --workers 1")
+
+    # Vários processos escutando na mesma porta (SO_REUSEPORT), com sessões compartilhadas
+    session_db = Config.SERVER_SESSION_DB or os.path.join('data', 'server_sessions.db')
+    SessionStore(path=session_db)  # cria a tabela antes de iniciar os processos
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(args.host, args.port, session_db, True, args.workers, i),
+                                daemon=True)
+        for i in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    print(f"Clima.AI em http://{args.host}:{args.port} ({args.workers} processos)")
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Pacote de serviços compartilhados do sistema Clima.AI
+"""
+from .text import normalize_text
+from .cache import TTLCache, ClimateDataCache, get_climate_cache
+from .keyword_matcher import KeywordMatcher, KeywordHit
+from .single_flight import SingleFlight
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .http_client import HttpClient, get_icrop_client, get_openrouter_client
+from .timeseries import StationSeries
+from .aggregation import fill_calendar, period_stats, resample_daily, rolling
+from .station_index import StationNameIndex
+from .station_catalog import StationCatalog, get_station_catalog
+from .prefetch import PrefetchScheduler, get_prefetch_scheduler
+from .history_store import ClimateHistoryStore, get_history_store
+from .llm_cache import LLMResponseCache, get_llm_cache
+from .llm_context import build_climate_context, estimate_tokens
+from .llm_scheduler import LLMScheduler, get_llm_scheduler
+from .health import HealthMonitor
+from .tracing import Trace, span, start_trace
+from .metrics import MetricsRegistry, get_metrics, start_metrics_server
+
+__all__ = [
+    'normalize_text',
+    'TTLCache',
+    'ClimateDataCache',
+    'get_climate_cache',
+    'KeywordMatcher',
+    'KeywordHit',
+    'SingleFlight',
+    'CircuitBreaker',
+    'CircuitOpenError',
+    'HttpClient',
+    'get_icrop_client',
+    'get_openrouter_client',
+    'StationSeries',
+    'fill_calendar',
+    'period_stats',
+    'resample_daily',
+    'rolling',
+    'StationNameIndex',
+    'StationCatalog',
+    'get_station_catalog',
+    'PrefetchScheduler',
+    'get_prefetch_scheduler',
+    'ClimateHistoryStore',
+    'get_history_store',
+    'LLMResponseCache',
+    'get_llm_cache',
+    'build_climate_context',
+    'estimate_tokens',
+    'LLMScheduler',
+    'get_llm_scheduler',
+    'HealthMonitor',
+    'Trace',
+    'span',
+    'start_trace',
+    'MetricsRegistry',
+    'get_metrics',
+    'start_metrics_server'
+]
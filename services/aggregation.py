@@ -0,0 +1,164 @@
+"""
+Agregações vetorizadas (NumPy) sobre as séries de medições das estações
+"""
+from typing import Dict, Any, Optional
+import numpy as np
+from services.timeseries import DateLike, StationSeries, _clean
+
+# Como cada campo é consolidado ao reamostrar medições por hora em dias
+DAILY_RULES = {
+    'temp_min': 'min',
+    'temp_max': 'max',
+    'temp_med': 'mean',
+    'umidade': 'mean',
+    'chuva': 'sum',
+    'vento': 'mean',
+    'radiacao': 'mean'
+}
+
+def _group_reduce(values: np.ndarray, starts: np.ndarray, how: str) -> np.ndarray:
+    """
+    Reduz grupos contíguos de `values` (iniciados em `starts`) ignorando NaN
+
+    Grupos sem nenhum valor válido resultam em NaN.
+    """
+    valid = ~np.isnan(values)
+    counts = np.add.reduceat(valid.astype(np.int64), starts)
+    if how == 'min':
+        result = np.fmin.reduceat(values, starts)
+    elif how == 'max':
+        result = np.fmax.reduceat(values, starts)
+    else:
+        result = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        if how == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = result / counts
+    return np.where(counts > 0, result, np.nan)
+
+def resample_daily(series: StationSeries, drop_midnight: bool = False) -> StationSeries:
+    """
+    Consolida uma série por hora em uma série diária
+
+    Chuva é somada, temperatura mínima/máxima usam min/max e os demais campos
+    usam a média das medições do dia.
+
+    Args:
+        series: Série por hora (ordenada da mais recente para a mais antiga)
+        drop_midnight: Ignora as medições de 00:00:00, que na iCrop costumam
+            ser o consolidado do dia anterior
+    """
+    if not series.is_hourly:
+        return series
+    times = series.times
+    columns = series.columns
+    if drop_midnight and len(times):
+        keep = (times - times.astype('datetime64[D]')) != np.timedelta64(0, 's')
+        times = times[keep]
+        columns = {f: c[keep] for f, c in columns.items()}
+    if not len(times):
+        return StationSeries.empty('data')
+
+    # O índice é ordenado, então cada dia é um bloco contíguo
+    days = times.astype('datetime64[D]')
+    starts = np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1])))
+    daily = {
+        field: _group_reduce(column, starts, DAILY_RULES.get(field, 'mean'))
+        for field, column in columns.items()
+    }
+    return StationSeries(days[starts].astype('datetime64[s]'), daily, 'data')
+
+def fill_calendar(series: StationSeries) -> StationSeries:
+    """
+    Série diária no calendário completo, do primeiro ao último dia medido
+
+    Dias sem registro entram com NaN em todos os campos, de modo que uma
+    janela de N posições em rolling() corresponde a N dias de calendário.
+    """
+    if not len(series):
+        return series
+    days = series.times.astype('datetime64[D]')
+    calendar = np.arange(days[-1], days[0] + 1)[::-1]  # ordem decrescente, como a série
+    positions = (days[0] - days).astype(np.int64)
+    columns = {}
+    for field, values in series.columns.items():
+        column = np.full(len(calendar), np.nan)
+        column[positions] = values
+        columns[field] = column
+    return StationSeries(calendar.astype('datetime64[s]'), columns, series.time_key)
+
+def rolling(series: StationSeries, field: str, window: int, how: str = 'mean') -> np.ndarray:
+    """
+    Janela móvel de `window` medições sobre um campo da série
+
+    A janela conta medições, não tempo: para janelas em dias de uma série
+    com falhas, aplique antes fill_calendar(). O resultado fica alinhado à
+    série (posição 0 = medição mais recente) e cada valor considera a medição
+    e as `window - 1` anteriores a ela. Posições sem janela completa resultam
+    em NaN.
+
+    Args:
+        series: Série de medições
+        field: Campo agregado
+        window: Tamanho da janela (número de medições)
+        how: 'mean' ou 'sum'
+    """
+    values = series.columns[field][::-1]  # ordem cronológica
+    n = len(values)
+    result = np.full(n, np.nan)
+    if window <= 0 or n < window:
+        return result
+
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    window_sums = sums[window:] - sums[:-window]
+    window_counts = counts[window:] - counts[:-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        window_values = window_sums / window_counts if how == 'mean' else window_sums
+    result[window - 1:] = np.where(window_counts > 0, window_values, np.nan)
+    return result[::-1]
+
+def period_stats(series: StationSeries, start: Optional[DateLike] = None,
+                 end: Optional[DateLike] = None) -> Dict[str, Any]:
+    """
+    Estatísticas de um período da série (limites inclusivos)
+
+    Returns:
+        Dict com número de medições, intervalo coberto, chuva acumulada,
+        extremos e médias de cada campo (None quando não há dados)
+    """
+    window = series.between(start, end) if start is not None or end is not None else series
+    columns = window.columns
+    stats: Dict[str, Any] = {'count': len(window), 'first': None, 'last': None}
+    if len(window):
+        unit = 's' if window.is_hourly else 'D'
+        stats['first'] = np.datetime_as_string(window.times[-1], unit=unit).replace('T', ' ')
+        stats['last'] = np.datetime_as_string(window.times[0], unit=unit).replace('T', ' ')
+
+    def reduce(field: str, fn) -> Optional[float]:
+        values = columns.get(field)
+        if values is None or not len(values) or np.isnan(values).all():
+            return None
+        return _clean(round(float(fn(values)), 2))
+
+    stats.update({
+        'rain_total': reduce('chuva', np.nansum),
+        'rain_max': reduce('chuva', np.nanmax),
+        'rain_days': int(np.count_nonzero(columns['chuva'] > 0)) if 'chuva' in columns and not window.is_hourly else None,
+        'temp_min': reduce('temp_min', np.nanmin),
+        'temp_max': reduce('temp_max', np.nanmax),
+        'temp_mean': reduce('temp_med', np.nanmean),
+        'humidity_mean': reduce('umidade', np.nanmean),
+        'wind_mean': reduce('vento', np.nanmean),
+        'wind_max': reduce('vento', np.nanmax),
+        'radiation_mean': reduce('radiacao', np.nanmean)
+    })
+    return stats
+
+def argextreme(series: StationSeries, field: str, how: str = 'max') -> Optional[Dict[str, Any]]:
+    """Medição com o maior (ou menor) valor do campo, ignorando ausentes"""
+    values = series.columns.get(field)
+    if values is None or not len(values) or np.isnan(values).all():
+        return None
+    index = int(np.nanargmax(values) if how == 'max' else np.nanargmin(values))
+    return series.record(index)
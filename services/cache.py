@@ -0,0 +1,289 @@
+"""
+Caches em memória com TTL, stale-while-revalidate e despejo LRU
+"""
+import contextvars
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Hashable, Iterator, List, Optional, Tuple
+from config import Config
+from services.http_client import is_upstream_failure
+from services.metrics import get_metrics
+from services.single_flight import SingleFlight
+
+STALE_SERVED = get_metrics().counter('clima_stale_served_total',
+                                     'Dados antigos servidos porque a iCrop falhou', ('endpoint',))
+
+_stale_reads: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = \
+    contextvars.ContextVar('clima_stale_reads', default=None)
+
+@contextmanager
+def collect_stale_reads() -> Iterator[List[Dict[str, Any]]]:
+    """
+    Lista os dados antigos servidos no bloco (ClimateDataCache.get_or_fetch)
+
+    Cada item tem 'endpoint', 'station_id', 'age_seconds' (None se veio do
+    histórico local) e 'error'. Vale também para asyncio.to_thread.
+    """
+    reads: List[Dict[str, Any]] = []
+    token = _stale_reads.set(reads)
+    try:
+        yield reads
+    finally:
+        _stale_reads.reset(token)
+
+def record_stale_reads(reads: List[Dict[str, Any]]):
+    """Acrescenta à coleta em andamento dados antigos registrados em outra coleta"""
+    current = _stale_reads.get()
+    if current is not None:
+        current.extend(reads)
+
+def estimate_size(value: Any) -> int:
+    """Estima o tamanho em bytes de um valor armazenado em cache"""
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    try:
+        return len(json.dumps(value, default=str, separators=(',', ':')))
+    except (TypeError, ValueError):
+        return 0
+
+class _CacheEntry:
+    """Entrada do cache"""
+
+    __slots__ = ('value', 'expires_at', 'stale_until', 'size', 'stored_at')
+
+    def __init__(self, value: Any, ttl: float, stale_ttl: float, size: int):
+        now = time.monotonic()
+        self.stored_at = now
+        self.value = value
+        self.expires_at = now + ttl
+        self.stale_until = self.expires_at + stale_ttl
+        self.size = size
+
+class TTLCache:
+    """
+    Cache LRU com TTL por entrada e limite de memória
+
+    Entradas expiradas ainda dentro da janela de "stale" continuam sendo
+    servidas enquanto uma nova versão é carregada em segundo plano. Cargas
+    simultâneas da mesma chave são agrupadas em uma só.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_entries: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = estimate_size, name: str = 'cache'):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._total_bytes = 0
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._refresh_errors = 0
+        self._flight = SingleFlight(name)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna o valor se existir e não estiver expirado"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() > entry.expires_at:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: float, stale_ttl: float = 0):
+        """Armazena um valor com TTL (e janela opcional de stale)"""
+        entry = _CacheEntry(value, ttl, stale_ttl, self.sizeof(value))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old.size
+            self._entries[key] = entry
+            self._total_bytes += entry.size
+            self._evict()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: float, stale_ttl: float = 0) -> Any:
+        """
+        Retorna o valor do cache ou carrega com `loader`
+
+        - Entrada válida: retorna direto
+        - Entrada expirada dentro da janela de stale: retorna e recarrega em segundo plano
+        - Sem entrada utilizável: carrega de forma síncrona (uma carga por chave
+          de cada vez; chamadas simultâneas aguardam e recebem o mesmo valor)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and now <= entry.stale_until:
+                self._entries.move_to_end(key)
+                if now <= entry.expires_at:
+                    self._hits += 1
+                    return entry.value
+                self._stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    threading.Thread(
+                        target=self._background_refresh,
+                        args=(key, loader, ttl, stale_ttl),
+                        daemon=True
+                    ).start()
+                return entry.value
+            self._misses += 1
+
+        return self._load(key, loader, ttl, stale_ttl)
+
+    def refresh(self, key: Hashable, loader: Callable[[], Any], ttl: float, stale_ttl: float = 0) -> Any:
+        """Recarrega a entrada de forma síncrona, independente da validade"""
+        return self._load(key, loader, ttl, stale_ttl)
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Retorna o valor armazenado (mesmo expirado) sem afetar estatísticas"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def ttl_remaining(self, key: Hashable) -> Optional[float]:
+        """Segundos até a entrada expirar (negativo se já expirou); None se não existir"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.expires_at - time.monotonic() if entry is not None else None
+
+    def last_known_good(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Último valor armazenado (mesmo fora da janela de stale) e sua idade em segundos"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return entry.value, time.monotonic() - entry.stored_at
+
+    def invalidate(self, key: Hashable):
+        """Remove uma entrada"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total_bytes -= entry.size
+
+    def clear(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de uso do cache"""
+        with self._lock:
+            total = self._hits + self._stale_hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'stale_hits': self._stale_hits,
+                'misses': self._misses,
+                'hit_ratio': (self._hits + self._stale_hits) / total if total else 0.0,
+                'evictions': self._evictions,
+                'refresh_errors': self._refresh_errors,
+                'coalesced': self._flight.get_stats()['shared']
+            }
+
+    def _background_refresh(self, key: Hashable, loader: Callable[[], Any], ttl: float, stale_ttl: float):
+        """Recarrega uma entrada em segundo plano"""
+        try:
+            self.refresh(key, loader, ttl, stale_ttl)
+        except Exception:
+            with self._lock:
+                self._refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], ttl: float, stale_ttl: float) -> Any:
+        """Carrega e armazena a entrada, agrupando cargas simultâneas da mesma chave"""
+        def load() -> Any:
+            value = loader()
+            self.set(key, value, ttl, stale_ttl)
+            return value
+        return self._flight.do(key, load)
+
+    def _evict(self):
+        """Remove as entradas menos usadas até respeitar os limites (chamado com lock)"""
+        while self._entries and (
+            (self.max_bytes is not None and self._total_bytes > self.max_bytes) or
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size
+            self._evictions += 1
+
+class ClimateDataCache(TTLCache):
+    """Cache de dados climáticos por (endpoint, estação) com TTL alinhado à cadência de cada endpoint"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        super().__init__(max_bytes=max_bytes if max_bytes is not None else Config.CLIMATE_CACHE_MAX_BYTES,
+                         name='climate')
+        self.ttls = dict(Config.CLIMATE_CACHE_TTL)
+        self.stale_ttls = dict(Config.CLIMATE_CACHE_STALE_TTL)
+
+    def get_or_fetch(self, endpoint: str, station_id: int, loader: Callable[[], Any],
+                     fallback: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Retorna os dados do endpoint para a estação, buscando na API se necessário
+
+        Se a iCrop falhar (disjuntor aberto, timeout, conexão, 429/5xx), serve
+        o último valor conhecido, por mais antigo que seja, ou o de `fallback`
+        (ex.: histórico local), registrando-o em collect_stale_reads(). Demais
+        erros são propagados.
+        """
+        key = (endpoint, int(station_id))
+        try:
+            return self.get_or_load(key, loader, self.ttls.get(endpoint, 0), self.stale_ttls.get(endpoint, 0))
+        except Exception as error:
+            if not is_upstream_failure(error):
+                raise
+            known = self.last_known_good(key)
+            if known is not None:
+                value, age = known
+            else:
+                try:
+                    value, age = (fallback() if fallback is not None else None), None
+                except Exception:
+                    value = None
+                if not value:
+                    raise
+            STALE_SERVED.inc(endpoint=endpoint)
+            reads = _stale_reads.get()
+            if reads is not None:
+                reads.append({'endpoint': endpoint, 'station_id': int(station_id),
+                              'age_seconds': round(age) if age is not None else None, 'error': str(error)})
+            return value
+
+    def entry_ttl_remaining(self, endpoint: str, station_id: int) -> Optional[float]:
+        """Segundos até os dados do endpoint para a estação expirarem; None se não estiverem no cache"""
+        return self.ttl_remaining((endpoint, int(station_id)))
+
+    def refresh_entry(self, endpoint: str, station_id: int, loader: Callable[[], Any]) -> Any:
+        """Força a atualização dos dados do endpoint para a estação"""
+        return self.refresh(
+            (endpoint, int(station_id)), loader,
+            self.ttls.get(endpoint, 0), self.stale_ttls.get(endpoint, 0)
+        )
+
+_climate_cache: Optional[ClimateDataCache] = None
+_climate_cache_lock = threading.Lock()
+
+def get_climate_cache() -> ClimateDataCache:
+    """Retorna o cache de dados climáticos compartilhado pelo processo"""
+    global _climate_cache
+    if _climate_cache is None:
+        with _climate_cache_lock:
+            if _climate_cache is None:
+                _climate_cache = ClimateDataCache()
+    return _climate_cache
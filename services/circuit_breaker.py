@@ -0,0 +1,114 @@
+"""
+Disjuntor (circuit breaker) para chamadas a APIs externas
+
+Depois de `failure_threshold` falhas seguidas, o circuito abre e as chamadas
+falham na hora por `reset_timeout` segundos, sem esperar timeouts nem somar
+carga a uma API já degradada. Em seguida, uma única chamada de teste decide
+se o circuito fecha (sucesso) ou abre novamente (falha).
+"""
+import threading
+import time
+from typing import Dict, Any, Callable, Optional
+from config import Config
+
+class CircuitOpenError(Exception):
+    """Chamada recusada porque o circuito está aberto"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} indisponível no momento (nova tentativa em {max(retry_in, 0):.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """
+    Disjuntor de um endpoint
+
+    - fechado: chamadas passam normalmente
+    - aberto: chamadas recusadas com CircuitOpenError
+    - meio aberto: passa uma chamada de teste; as demais continuam recusadas
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None,
+                 on_state_change: Optional[Callable[[str], None]] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold if failure_threshold is not None else Config.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout if reset_timeout is not None else Config.CIRCUIT_RESET_TIMEOUT
+        self.on_state_change = on_state_change
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+        self._opens = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def is_open(self) -> bool:
+        """Indica se as chamadas estão sendo recusadas neste momento"""
+        with self._lock:
+            return self._state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def before_call(self):
+        """
+        Autoriza uma chamada
+
+        Raises:
+            CircuitOpenError: Se o circuito estiver aberto (ou já houver uma chamada de teste em andamento)
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - now
+                if remaining > 0:
+                    self._rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self._change(self.HALF_OPEN)
+            # Meio aberto: uma chamada de teste por vez (outra, se a anterior não terminou a tempo)
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                self._rejected += 1
+                raise CircuitOpenError(self.name, self._probe_started + self.reset_timeout - now)
+            self._probe_started = now
+
+    def record_success(self):
+        """Registra uma chamada bem-sucedida"""
+        with self._lock:
+            self._failures = 0
+            self._probe_started = None
+            if self._state != self.CLOSED:
+                self._change(self.CLOSED)
+
+    def record_failure(self):
+        """Registra uma falha; abre o circuito ao atingir o limite (ou se a chamada de teste falhar)"""
+        with self._lock:
+            self._failures += 1
+            self._probe_started = None
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._opens += 1
+                self._change(self.OPEN)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'opens': self._opens,
+                'rejected': self._rejected,
+                'open_for_seconds': round(time.monotonic() - self._opened_at, 1) if self._state != self.CLOSED else None
+            }
+
+    def _change(self, state: str):
+        """Troca de estado (chamado com lock)"""
+        self._state = state
+        if self.on_state_change is not None:
+            self.on_state_change(state)
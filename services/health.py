@@ -0,0 +1,83 @@
+"""
+Status de saúde do sistema calculado em segundo plano
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional
+from config import Config
+
+class HealthMonitor:
+    """
+    Executa periodicamente uma verificação de saúde e guarda o último resultado
+
+    As páginas leem o status em cache (get_status) e não esperam pelas APIs
+    externas; enquanto a primeira verificação não termina, o status é 'starting'.
+    """
+
+    def __init__(self, check: Callable[[], Dict[str, Any]], interval: Optional[float] = None):
+        self.check = check
+        self.interval = interval if interval is not None else Config.HEALTH_CHECK_INTERVAL
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._ready_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._status: Optional[Dict[str, Any]] = None
+        self._checked_at: Optional[float] = None
+        self._duration: Optional[float] = None
+
+    def start(self):
+        """Inicia as verificações (a primeira imediatamente)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="clima-health", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Interrompe as verificações"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda a primeira verificação"""
+        return self._ready_event.wait(timeout)
+
+    def refresh(self) -> Dict[str, Any]:
+        """Executa uma verificação agora e atualiza o cache"""
+        start = time.monotonic()
+        try:
+            status = self.check()
+        except Exception as e:
+            status = {'status': 'error', 'error': str(e), 'agents': {}}
+        with self._lock:
+            self._status = status
+            self._checked_at = time.time()
+            self._duration = time.monotonic() - start
+        self._ready_event.set()
+        return status
+
+    def get_status(self) -> Dict[str, Any]:
+        """Último status calculado, com a idade da verificação em 'health'"""
+        with self._lock:
+            if self._status is None:
+                return {
+                    'status': 'starting',
+                    'agents': {},
+                    'health': {'checked_at': None, 'age_seconds': None, 'interval_seconds': self.interval}
+                }
+            status = dict(self._status)
+            status['health'] = {
+                'checked_at': datetime.fromtimestamp(self._checked_at).isoformat(timespec='seconds'),
+                'age_seconds': round(time.time() - self._checked_at, 1),
+                'check_seconds': round(self._duration, 3),
+                'interval_seconds': self.interval
+            }
+            return status
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.refresh()
+            self._stop_event.wait(self.interval)
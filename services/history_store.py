@@ -0,0 +1,158 @@
+"""
+Armazenamento local (SQLite) do histórico de medições das estações
+"""
+import math
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+import numpy as np
+from config import Config
+from services.timeseries import FIELDS, DateLike, StationSeries
+
+class ClimateHistoryStore:
+    """
+    Histórico local de todas as medições já buscadas na iCrop
+
+    As medições são gravadas por (estação, granularidade, instante) em uma tabela
+    SQLite com chave primária composta, o que permite consultas por intervalo de
+    datas sem acessar a API. As gravações feitas durante as buscas
+    (save_series_async) rodam em um thread próprio, fora do caminho da
+    requisição.
+    """
+
+    GRANULARITIES = {'datahora': 'hourly', 'data': 'daily'}
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or Config.HISTORY_DB_PATH
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='clima-history')
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock:
+            if self.path != ':memory:':
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS readings (
+                    station_id INTEGER NOT NULL,
+                    granularity TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    {', '.join(f'{field} REAL' for field in FIELDS)},
+                    PRIMARY KEY (station_id, granularity, ts)
+                ) WITHOUT ROWID
+            """)
+            self._conn.commit()
+
+    def save_series(self, station_id: int, series: StationSeries) -> int:
+        """
+        Grava (ou atualiza) as medições da série
+
+        Returns:
+            int: Número de medições gravadas
+        """
+        if not len(series):
+            return 0
+        granularity = self.GRANULARITIES[series.time_key]
+        timestamps = series.times.astype('datetime64[s]').astype(np.int64).tolist()
+        columns = [series.columns[field].tolist() for field in FIELDS]
+        rows = [
+            (int(station_id), granularity, ts, *(None if math.isnan(v) else v for v in values))
+            for ts, *values in zip(timestamps, *columns)
+        ]
+        placeholders = ', '.join('?' for _ in range(3 + len(FIELDS)))
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO readings (station_id, granularity, ts, {', '.join(FIELDS)}) "
+                f"VALUES ({placeholders})",
+                rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def save_series_async(self, station_id: int, series: StationSeries):
+        """Agenda a gravação da série no thread de gravação; falhas são ignoradas"""
+        if len(series):
+            self._writer.submit(self._save_quietly, station_id, series)
+
+    def _save_quietly(self, station_id: int, series: StationSeries):
+        try:
+            self.save_series(station_id, series)
+        except Exception:
+            # O histórico é um complemento: falhas de gravação não afetam as respostas
+            pass
+
+    def query(self, station_id: int, time_key: str = 'datahora',
+              start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> StationSeries:
+        """
+        Consulta as medições de uma estação no intervalo [start, end]
+
+        Args:
+            station_id: ID da estação
+            time_key: 'datahora' (por hora) ou 'data' (por dia)
+            start: Início do intervalo (inclusivo)
+            end: Fim do intervalo (inclusivo)
+
+        Returns:
+            StationSeries com as medições encontradas (da mais recente para a mais antiga)
+        """
+        sql = f"SELECT ts, {', '.join(FIELDS)} FROM readings WHERE station_id = ? AND granularity = ?"
+        params = [int(station_id), self.GRANULARITIES[time_key]]
+        if start is not None:
+            sql += " AND ts >= ?"
+            params.append(self._to_epoch(start))
+        if end is not None:
+            sql += " AND ts <= ?"
+            params.append(self._to_epoch(end))
+        sql += " ORDER BY ts DESC"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        if not rows:
+            return StationSeries.empty(time_key)
+
+        data = np.array(rows, dtype=np.float64)
+        times = data[:, 0].astype(np.int64).astype('datetime64[s]')
+        columns = {field: data[:, i + 1] for i, field in enumerate(FIELDS)}
+        return StationSeries(times, columns, time_key)
+
+    def latest_time(self, station_id: int, time_key: str = 'datahora') -> Optional[np.datetime64]:
+        """Instante da medição mais recente armazenada para a estação"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(ts) FROM readings WHERE station_id = ? AND granularity = ?",
+                (int(station_id), self.GRANULARITIES[time_key])
+            ).fetchone()
+        return np.datetime64(int(row[0]), 's') if row and row[0] is not None else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna o tamanho do histórico"""
+        with self._lock:
+            rows, stations = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT station_id) FROM readings"
+            ).fetchone()
+        return {'path': self.path, 'readings': rows, 'stations': stations}
+
+    def close(self):
+        """Conclui as gravações pendentes e fecha a conexão com o banco"""
+        self._writer.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+    def _to_epoch(self, value: DateLike) -> int:
+        """Converte data/hora para segundos desde a época"""
+        return int(np.datetime64(value, 's').astype(np.int64))
+
+_store: Optional[ClimateHistoryStore] = None
+_store_lock = threading.Lock()
+
+def get_history_store() -> ClimateHistoryStore:
+    """Retorna o histórico local compartilhado pelo processo"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ClimateHistoryStore()
+    return _store
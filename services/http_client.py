@@ -0,0 +1,513 @@
+"""
+Cliente HTTP compartilhado com conexões persistentes, timeouts e retentativas
+"""
+import codecs
+import json
+import random
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, Any, Iterator, Optional
+from config import Config
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.metrics import get_metrics
+from services.single_flight import SingleFlight
+from services.tracing import bind, span
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_metrics = get_metrics()
+UPSTREAM_REQUESTS = _metrics.counter('clima_upstream_requests_total', 'Requisições às APIs externas por status',
+                                     ('client', 'endpoint', 'status'))
+UPSTREAM_SECONDS = _metrics.histogram('clima_upstream_request_seconds',
+                                      'Latência das APIs externas até a resposta (com retentativas)',
+                                      ('client', 'endpoint'))
+UPSTREAM_IN_FLIGHT = _metrics.gauge('clima_upstream_in_flight', 'Requisições às APIs externas em andamento',
+                                    ('client',))
+UPSTREAM_RETRIES = _metrics.counter('clima_upstream_retries_total', 'Novas tentativas de requisições às APIs externas',
+                                    ('client', 'endpoint'))
+UPSTREAM_ERRORS = _metrics.counter('clima_upstream_errors_total', 'Falhas das APIs externas por tipo',
+                                   ('client', 'endpoint', 'type'))
+UPSTREAM_HEDGES = _metrics.counter('clima_upstream_hedged_requests_total',
+                                   'Requisições de reserva disparadas após o p95 do endpoint', ('client', 'endpoint'))
+CIRCUIT_STATE = _metrics.gauge('clima_circuit_state', 'Estado do disjuntor por endpoint (0 fechado, 1 meio aberto, 2 aberto)',
+                               ('client', 'endpoint'))
+CIRCUIT_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+class _HedgedGet:
+    """GET com reserva: conexão em uso pela chamada principal e resposta vencedora"""
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.lock = threading.Lock()
+        self.connection = None
+        self.primary_done = threading.Event()
+        self.hedge_done = threading.Event()
+        self.hedged = False
+        self.winner: Optional[str] = None  # 'primary' (decidido pela chamada principal) ou 'hedge'
+        self.response: Optional[requests.Response] = None
+
+class _HedgeLost(Exception):
+    """A chamada principal foi interrompida porque a reserva respondeu antes"""
+
+# GET com reserva cuja chamada principal roda neste thread
+_calls = threading.local()
+
+def _lost_hedge() -> bool:
+    call = getattr(_calls, 'current', None)
+    return call is not None and call.winner == 'hedge'
+
+class _TrackedPoolMixin:
+    """
+    Registra a conexão da chamada principal enquanto ela a usa, para que a reserva possa interrompê-la
+
+    Sobrescreve métodos internos do pool do urllib3 2.x (versão fixada em requirements.txt).
+    """
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        call = getattr(_calls, 'current', None)
+        if call is not None:
+            with call.lock:
+                call.connection = conn
+        return conn
+
+    def _put_conn(self, conn):
+        call = getattr(_calls, 'current', None)
+        if call is not None:
+            with call.lock:
+                if call.connection is conn:
+                    call.connection = None
+        super()._put_conn(conn)
+
+class _TrackedHTTPConnectionPool(_TrackedPoolMixin, HTTPConnectionPool):
+    pass
+
+class _TrackedHTTPSConnectionPool(_TrackedPoolMixin, HTTPSConnectionPool):
+    pass
+
+class _HedgeAdapter(HTTPAdapter):
+    """Adaptador cujas conexões podem ser interrompidas por uma reserva vencedora"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TrackedHTTPConnectionPool,
+            'https': _TrackedHTTPSConnectionPool
+        }
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """
+    Indica se o erro é uma falha da API externa (fora do ar, lenta ou sobrecarregada)
+
+    Circuito aberto, timeouts, falhas de conexão (inclusive resposta truncada)
+    e respostas 429/5xx; erros do pedido (4xx), de leitura do payload ou do
+    código não contam.
+    """
+    if isinstance(error, (CircuitOpenError, requests.Timeout, requests.ConnectionError,
+                          requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in HttpClient.RETRY_STATUS
+    return False
+
+class HttpClient:
+    """
+    Cliente HTTP com pool de conexões keep-alive para um host
+
+    Opcionalmente, com um disjuntor por endpoint (`circuit_breakers`) e GETs de
+    reserva (hedge) disparados quando a resposta demora mais que o p95 do endpoint.
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        base_url: str = "",
+        headers: Optional[Dict[str, str]] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff_factor: Optional[float] = None,
+        pool_size: Optional[int] = None,
+        name: str = "http",
+        circuit_breakers: bool = False,
+        hedge: Optional[bool] = None
+    ):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else Config.HTTP_CONNECT_TIMEOUT,
+            read_timeout if read_timeout is not None else Config.HTTP_READ_TIMEOUT
+        )
+        self.max_retries = max_retries if max_retries is not None else Config.HTTP_MAX_RETRIES
+        self.backoff_factor = backoff_factor if backoff_factor is not None else Config.HTTP_BACKOFF_FACTOR
+        self.max_backoff = Config.HTTP_MAX_BACKOFF
+        self.flight = SingleFlight(name) if Config.HTTP_SINGLE_FLIGHT else None
+        self.circuit_breakers = circuit_breakers
+        self.hedge = hedge if hedge is not None else Config.HTTP_HEDGE_ENABLED
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._gets = 0
+        self._hedges = 0
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        self.pool_size = pool_size if pool_size is not None else Config.HTTP_POOL_SIZE
+        adapter_class = _HedgeAdapter if self.hedge else HTTPAdapter
+        adapter = adapter_class(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate"
+        })
+        if headers:
+            self.session.headers.update(headers)
+
+    def request(self, method: str, path: str = "", **kwargs) -> requests.Response:
+        """
+        Executa uma requisição com timeout e retentativas limitadas
+
+        Falhas de conexão, timeouts e respostas 429/5xx são repetidas com
+        backoff exponencial e jitter. Demais erros HTTP são propagados.
+
+        Raises:
+            CircuitOpenError: Se o disjuntor do endpoint estiver aberto
+        """
+        url = f"{self.base_url}{path}"
+        kwargs.setdefault('timeout', self.timeout)
+
+        endpoint = self.endpoint_label(path)
+        breaker = self.breaker(endpoint)
+        if breaker is not None:
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                UPSTREAM_ERRORS.inc(client=self.name, endpoint=endpoint, type='circuit_open')
+                raise
+
+        start = time.perf_counter()
+        failed = True
+        UPSTREAM_IN_FLIGHT.inc(client=self.name)
+        try:
+            with span(f"http {self.name}", method=method, endpoint=endpoint, path=path) as current:
+                attempt = 0
+                while True:
+                    if _lost_hedge():
+                        raise _HedgeLost()
+                    try:
+                        response = self.session.request(method, url, **kwargs)
+                    except (requests.ConnectionError, requests.Timeout) as e:
+                        if _lost_hedge():
+                            raise _HedgeLost() from e
+                        tipo = 'timeout' if isinstance(e, requests.Timeout) else 'connection'
+                        UPSTREAM_ERRORS.inc(client=self.name, endpoint=endpoint, type=tipo)
+                        if attempt >= self.max_retries or (breaker is not None and breaker.is_open()):
+                            raise
+                        UPSTREAM_RETRIES.inc(client=self.name, endpoint=endpoint)
+                        time.sleep(self._backoff_delay(attempt))
+                        attempt += 1
+                        continue
+
+                    UPSTREAM_REQUESTS.inc(client=self.name, endpoint=endpoint, status=response.status_code)
+                    if response.status_code >= 400:
+                        UPSTREAM_ERRORS.inc(client=self.name, endpoint=endpoint, type=f"http_{response.status_code}")
+
+                    if response.status_code in self.RETRY_STATUS and attempt < self.max_retries \
+                            and (breaker is None or not breaker.is_open()):
+                        UPSTREAM_RETRIES.inc(client=self.name, endpoint=endpoint)
+                        delay = self._backoff_delay(attempt, response.headers.get('Retry-After'))
+                        response.close()
+                        time.sleep(delay)
+                        attempt += 1
+                        continue
+
+                    if current is not None:
+                        current.set(status=response.status_code, attempts=attempt + 1)
+                    # Só 429/5xx indicam API degradada; demais erros HTTP são do pedido
+                    failed = response.status_code in self.RETRY_STATUS
+                    response.raise_for_status()
+                    return response
+        finally:
+            elapsed = time.perf_counter() - start
+            UPSTREAM_IN_FLIGHT.dec(client=self.name)
+            UPSTREAM_SECONDS.observe(elapsed, client=self.name, endpoint=endpoint)
+            lost = _lost_hedge()
+            if breaker is not None and not lost:
+                if failed:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if not failed and not lost and self.hedge:
+                self._record_latency(endpoint, elapsed)
+
+    def breaker(self, endpoint: str) -> Optional[CircuitBreaker]:
+        """Disjuntor do endpoint (None se o cliente não usa disjuntores)"""
+        if not self.circuit_breakers:
+            return None
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(endpoint)
+                if breaker is None:
+                    labels = {'client': self.name, 'endpoint': endpoint}
+                    breaker = CircuitBreaker(
+                        f"{self.name} {endpoint}",
+                        on_state_change=lambda state: CIRCUIT_STATE.set(CIRCUIT_STATE_VALUES[state], **labels)
+                    )
+                    CIRCUIT_STATE.set(0, **labels)
+                    self._breakers[endpoint] = breaker
+        return breaker
+
+    def get_circuit_states(self) -> Dict[str, Dict[str, Any]]:
+        """Estado dos disjuntores por endpoint"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {endpoint: breaker.get_stats() for endpoint, breaker in sorted(breakers.items())}
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """
+        Espera antes da requisição de reserva: o percentil HTTP_HEDGE_PERCENTILE
+        das latências recentes do endpoint (None sem medições suficientes)
+        """
+        with self._lock:
+            samples = sorted(self._latencies.get(endpoint, ()))
+        if len(samples) < Config.HTTP_HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * Config.HTTP_HEDGE_PERCENTILE / 100))
+        return max(Config.HTTP_HEDGE_MIN_DELAY, samples[index])
+
+    def _record_latency(self, endpoint: str, seconds: float):
+        with self._lock:
+            samples = self._latencies.get(endpoint)
+            if samples is None:
+                samples = self._latencies[endpoint] = deque(maxlen=200)
+            samples.append(seconds)
+
+    def _get(self, path: str = "", **kwargs) -> requests.Response:
+        """
+        GET com requisição de reserva (hedge)
+
+        A chamada principal roda no próprio thread; só a reserva vai para o
+        pool. Se a resposta não chegar dentro do p95 do endpoint, a reserva
+        dispara uma segunda requisição idêntica; se ela responder antes, a
+        conexão da chamada principal é interrompida e vale a resposta da
+        reserva. As reservas ficam limitadas a HTTP_HEDGE_MAX_RATIO dos GETs e
+        não são usadas com o disjuntor fora do estado fechado.
+        """
+        endpoint = self.endpoint_label(path)
+        breaker = self.breaker(endpoint)
+        delay = self.hedge_delay(endpoint) if self.hedge else None
+        if delay is None or (breaker is not None and breaker.state != CircuitBreaker.CLOSED):
+            return self.request("GET", path, **kwargs)
+
+        call = _HedgedGet(time.monotonic() + delay)
+        with self._lock:
+            self._gets += 1
+        self._hedge_pool().submit(bind(self._hedge), call, path, kwargs)
+
+        response, error = None, None
+        _calls.current = call
+        try:
+            response = self.request("GET", path, **kwargs)
+        except Exception as e:
+            error = e
+        finally:
+            _calls.current = None
+            call.primary_done.set()
+
+        with call.lock:
+            if call.winner is None and (response is not None or not call.hedged):
+                call.winner = 'primary'
+            winner = call.winner
+        if winner is None:
+            # Chamada principal falhou com a reserva em andamento: vale a reserva, se responder
+            call.hedge_done.wait()
+            winner = call.winner
+        if winner == 'hedge':
+            # A conexão da principal pode ter sido interrompida depois dos
+            # cabeçalhos (stream=True): só a resposta da reserva é confiável
+            if response is not None:
+                response.close()
+            return call.response
+        if error is not None:
+            raise error
+        return response
+
+    def _hedge(self, call: _HedgedGet, path: str, kwargs: Dict[str, Any]):
+        """Dispara a reserva se a chamada principal não terminar até o prazo"""
+        if call.primary_done.wait(max(0.0, call.deadline - time.monotonic())):
+            return
+        with self._lock:
+            allowed = self._hedges < Config.HTTP_HEDGE_MAX_RATIO * self._gets
+            if allowed:
+                self._hedges += 1
+        if not allowed:
+            return
+        with call.lock:
+            if call.winner is not None:
+                return
+            call.hedged = True
+
+        UPSTREAM_HEDGES.inc(client=self.name, endpoint=self.endpoint_label(path))
+        try:
+            response = self.request("GET", path, **kwargs)
+        except Exception:
+            response = None
+        with call.lock:
+            if response is not None and call.winner is None:
+                call.winner = 'hedge'
+                call.response = response
+                # Interrompe a leitura da chamada principal (a conexão ainda é dela enquanto registrada)
+                if call.connection is not None and getattr(call.connection, 'sock', None) is not None:
+                    try:
+                        call.connection.sock.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+            elif response is not None:
+                response.close()
+        call.hedge_done.set()
+
+    def _hedge_pool(self) -> ThreadPoolExecutor:
+        if self._hedge_executor is None:
+            with self._lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(max_workers=self.pool_size,
+                                                              thread_name_prefix=f"clima-{self.name}-hedge")
+        return self._hedge_executor
+
+    @staticmethod
+    def endpoint_label(path: str) -> str:
+        """Endpoint sem parâmetros (ex.: '/clima_por_hora/2297' -> '/clima_por_hora')"""
+        return '/' + path.strip('/').split('/')[0]
+
+    def get_json(self, path: str = "", **kwargs) -> Any:
+        """
+        Executa GET e retorna o corpo JSON
+
+        GETs idênticos (mesmo caminho e parâmetros) simultâneos compartilham
+        uma única requisição e o seu resultado.
+        """
+        if self.flight is None or set(kwargs) - {'params'}:
+            return self._get(path, **kwargs).json()
+        key = (path, json.dumps(kwargs.get('params'), sort_keys=True, default=str))
+        return self.flight.do(key, lambda: self._get(path, **kwargs).json())
+
+    def iter_json_array(self, path: str = "", chunk_size: int = 16 * 1024, **kwargs) -> Iterator[Any]:
+        """
+        Executa GET e percorre os itens de um array JSON à medida que chegam
+
+        O corpo é lido em blocos e decodificado item a item. Se o consumidor
+        interromper a iteração, a conexão é fechada sem baixar o restante.
+        """
+        response = self._get(path, stream=True, **kwargs)
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder(response.encoding or 'utf-8')()
+        buffer, pos, opened = '', 0, False
+        try:
+            for chunk in response.iter_content(chunk_size):
+                buffer = buffer[pos:] + text.decode(chunk)
+                pos = 0
+                while True:
+                    while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                        pos += 1
+                    if pos >= len(buffer):
+                        break
+                    if not opened:
+                        if buffer[pos] != '[':
+                            raise ValueError("A resposta não é um array JSON")
+                        opened = True
+                        pos += 1
+                        continue
+                    if buffer[pos] == ']':
+                        return
+                    try:
+                        item, end = decoder.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        break  # Item incompleto: aguarda o próximo bloco
+                    if end == len(buffer) and not isinstance(item, (dict, list)):
+                        break  # Escalar pode continuar no próximo bloco
+                    yield item
+                    pos = end
+            raise ValueError("Array JSON incompleto na resposta")
+        finally:
+            response.close()
+
+    def post_json(self, path: str = "", payload: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        """Executa POST com corpo JSON e retorna o corpo JSON da resposta"""
+        return self.request("POST", path, json=payload, **kwargs).json()
+
+    def stream_events(self, path: str = "", payload: Optional[Dict[str, Any]] = None, **kwargs) -> Iterator[str]:
+        """
+        Executa POST e percorre os eventos Server-Sent Events da resposta
+
+        Retorna o conteúdo de cada linha `data:` assim que chega; comentários
+        (keep-alive) são ignorados e a leitura termina em `data: [DONE]`.
+        """
+        response = self.request("POST", path, json=payload, stream=True, **kwargs)
+        try:
+            for line in response.iter_lines():
+                if not line or line.startswith(b':'):
+                    continue
+                if line.startswith(b'data:'):
+                    data = line[5:].strip().decode('utf-8')
+                    if data == '[DONE]':
+                        return
+                    yield data
+        finally:
+            response.close()
+
+    def close(self):
+        """Fecha as conexões do pool"""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        self.session.close()
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Calcula o tempo de espera antes da próxima tentativa"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        limite = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        return random.uniform(0, limite)
+
+_clients: Dict[str, HttpClient] = {}
+_clients_lock = threading.Lock()
+
+def get_icrop_client() -> HttpClient:
+    """Retorna o cliente HTTP compartilhado da API iCrop"""
+    with _clients_lock:
+        if 'icrop' not in _clients:
+            _clients['icrop'] = HttpClient(
+                Config.ICROP_BASE_URL,
+                headers={"Authorization": f"Bearer {Config.ICROP_API_KEY}"},
+                name='icrop',
+                circuit_breakers=Config.CIRCUIT_BREAKER_ENABLED
+            )
+        return _clients['icrop']
+
+def get_openrouter_client() -> HttpClient:
+    """Retorna o cliente HTTP compartilhado da API OpenRouter"""
+    with _clients_lock:
+        if 'openrouter' not in _clients:
+            _clients['openrouter'] = HttpClient(
+                Config.OPENROUTER_URL,
+                headers={
+                    "Authorization": f"Bearer {Config.OPENROUTER_API_KEY}",
+                    "Content-Type": "application/json",
+                    "HTTP-Referer": "https://clima.ai",
+                    "X-Title": "Clima.AI",
+                },
+                read_timeout=Config.LLM_READ_TIMEOUT,
+                max_retries=0,  # Retentativas ficam a cargo do agendador do LLM (services/llm_scheduler.py)
+                name='openrouter'
+            )
+        return _clients['openrouter']
@@ -0,0 +1,101 @@
+"""
+Casamento de palavras-chave em uma única passada sobre o texto
+"""
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Set, Tuple
+from services.text import normalize_text
+
+class KeywordHit(NamedTuple):
+    """Ocorrência de uma palavra-chave no texto"""
+    keyword: str
+    category: Hashable
+    start: int
+
+class KeywordMatcher:
+    """
+    Matcher compilado para várias categorias de palavras-chave
+
+    As palavras-chave são normalizadas (minúsculas, sem acento) e compiladas em
+    um autômato de Aho-Corasick. Uma passada sobre o texto, em tempo linear no
+    tamanho do texto mais o número de ocorrências, encontra todas elas,
+    inclusive sobrepostas, com a mesma semântica de `keyword in texto`.
+    """
+
+    def __init__(self, keywords: Dict[Hashable, Iterable[str]]):
+        # palavra normalizada -> [(categoria, palavra original)]
+        self._entries: Dict[str, List[Tuple[Hashable, str]]] = {}
+        for category, words in keywords.items():
+            for word in words:
+                normalized = normalize_text(word)
+                if not normalized:
+                    continue
+                entries = self._entries.setdefault(normalized, [])
+                if all(c != category for c, _ in entries):
+                    entries.append((category, word))
+
+        # Trie das palavras: transições por estado e palavras que terminam em cada estado
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[List[str]] = [[]]
+        for word in self._entries:
+            state = 0
+            for char in word:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(word)
+
+        # Links de falha em largura: cada estado herda as transições e as palavras
+        # (sufixos) do seu link, o que dispensa seguir links durante a busca
+        fail = [0] * len(self._goto)
+        self._delta: List[Dict[str, int]] = [dict(self._goto[0])] + [{} for _ in self._goto[1:]]
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            if state:
+                self._delta[state] = {**self._delta[fail[state]], **self._goto[state]}
+                self._output[state] = self._output[state] + self._output[fail[state]]
+            for char, child in self._goto[state].items():
+                fail[child] = self._delta[fail[state]].get(char, 0) if state else 0
+                queue.append(child)
+
+        # Palavras de cada estado com o comprimento já calculado, usadas na busca
+        self._matches: List[List[Tuple[int, str]]] = [[(len(word), word) for word in words]
+                                                       for words in self._output]
+
+    def find_all(self, text: str, normalized: bool = False) -> List[KeywordHit]:
+        """
+        Retorna todas as ocorrências de palavras-chave no texto, na ordem em que aparecem
+
+        Na mesma posição, as palavras mais longas vêm primeiro.
+
+        Args:
+            text: Texto original (será normalizado)
+            normalized: Indica que o texto já passou por normalize_text
+        """
+        if not self._entries:
+            return []
+
+        found = []
+        delta, matches = self._delta, self._matches
+        state = 0
+        for end, char in enumerate(text if normalized else normalize_text(text), 1):
+            state = delta[state].get(char, 0)
+            if matches[state]:
+                for size, word in matches[state]:
+                    found.append((end - size, -size, word))
+        if not found:
+            return []
+        # Mesma posição e mesmo comprimento implicam a mesma palavra: a ordem das tuplas basta
+        found.sort()
+
+        return [KeywordHit(original, category, start)
+                for start, _, word in found
+                for category, original in self._entries[word]]
+
+    def categories(self, text: str) -> Set[Hashable]:
+        """Retorna o conjunto de categorias presentes no texto"""
+        return {hit.category for hit in self.find_all(text)}
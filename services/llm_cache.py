@@ -0,0 +1,140 @@
+"""
+Cache das respostas do LLM por (modelo, pergunta normalizada, dados climáticos)
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+from config import Config
+from services.cache import TTLCache
+from services.text import normalize_text
+
+def fingerprint(value: Any) -> str:
+    """Hash estável (independe da ordem das chaves) de um valor serializável em JSON"""
+    dump = json.dumps(value, sort_keys=True, default=str, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(dump.encode('utf-8')).hexdigest()
+
+def normalize_question(question: str) -> str:
+    """Normaliza a pergunta para comparação (acentos, caixa, espaços e pontuação final)"""
+    return re.sub(r'[\s?!.]+$', '', normalize_text(question))
+
+class LLMResponseCache:
+    """
+    Cache de respostas do LLM em dois níveis
+
+    O primeiro nível fica em memória (TTL + LRU limitado por número de entradas);
+    o segundo, opcional, é um arquivo SQLite que preserva as respostas entre
+    reinícios do processo.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None,
+                 disk_path: Optional[str] = None):
+        self.ttl = ttl if ttl is not None else Config.LLM_CACHE_TTL
+        self.max_entries = max_entries if max_entries is not None else Config.LLM_CACHE_MAX_ENTRIES
+        self.memory = TTLCache(max_entries=self.max_entries)
+        self.disk_path = disk_path if disk_path is not None else Config.LLM_CACHE_DISK_PATH
+        self._lock = threading.Lock()
+        self._disk_hits = 0
+        self._misses = 0
+        self._conn = None
+        if self.disk_path:
+            if self.disk_path != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(self.disk_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.disk_path, check_same_thread=False)
+            with self._lock:
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                """)
+                self._conn.commit()
+
+    def make_key(self, model: str, question: str, climate_data: Optional[Any] = None) -> str:
+        """Chave do cache para a pergunta sobre os dados climáticos informados"""
+        data_hash = fingerprint(climate_data) if climate_data else ''
+        return fingerprint([model, normalize_question(question), data_hash])
+
+    def get(self, key: str) -> Optional[str]:
+        """Retorna a resposta armazenada (memória, depois disco) ou None"""
+        response = self.memory.get(key)
+        if response is not None:
+            return response
+
+        if self._conn is not None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None:
+                age = time.time() - row[1]
+                if age <= self.ttl:
+                    with self._lock:
+                        self._disk_hits += 1
+                    # Promover para a memória pelo tempo de vida restante
+                    self.memory.set(key, row[0], self.ttl - age)
+                    return row[0]
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, key: str, response: str):
+        """Armazena uma resposta"""
+        self.memory.set(key, response, self.ttl)
+        if self._conn is not None:
+            now = time.time()
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, now)
+                )
+                # Remove expiradas e mantém apenas as mais recentes
+                self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key NOT IN "
+                    "(SELECT key FROM responses ORDER BY created_at DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+                self._conn.commit()
+
+    def clear(self):
+        """Remove todas as respostas armazenadas"""
+        self.memory.clear()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de uso do cache"""
+        memory = self.memory.get_stats()
+        with self._lock:
+            disk_hits, misses = self._disk_hits, self._misses
+        hits = memory['hits'] + disk_hits
+        total = hits + misses
+        return {
+            'entries': memory['entries'],
+            'memory_hits': memory['hits'],
+            'disk_hits': disk_hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 3) if total else 0.0,
+            'disk_enabled': self._conn is not None
+        }
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMResponseCache:
+    """Retorna o cache de respostas do LLM compartilhado pelo processo"""
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMResponseCache()
+    return _llm_cache
@@ -0,0 +1,162 @@
+"""
+Compactação dos dados climáticos enviados como contexto ao LLM
+"""
+import json
+import math
+from typing import Dict, Any, List, Optional, Sequence
+import numpy as np
+from config import Config
+from services.aggregation import period_stats
+from services.timeseries import StationSeries, _clean
+
+# Média aproximada de caracteres por token em português com números
+CHARS_PER_TOKEN = 3.5
+
+UNITS_LINE = "Unidades: temperatura °C, umidade %, chuva mm, vento km/h, radiação W/m²"
+
+# Colunas das tabelas: (campo, título)
+SERIES_COLUMNS = [('temp_min', 'tmin'), ('temp_max', 'tmax'), ('temp_med', 'tmed'), ('umidade', 'umid'),
+                  ('chuva', 'chuva'), ('vento', 'vento'), ('radiacao', 'rad')]
+FORECAST_COLUMNS = [('data', 'data'), ('temp_min', 'tmin'), ('temp_max', 'tmax'), ('rain_prob', 'prob_chuva'),
+                    ('rain_total', 'chuva'), ('wind_spd', 'vento'), ('obs', 'obs')]
+
+# Níveis de detalhe, do mais completo ao mais enxuto: linhas por tabela
+DETAIL_LEVELS = [
+    {'dias': 30, 'horas': 24, 'previsao': 5},
+    {'dias': 14, 'horas': 12, 'previsao': 5},
+    {'dias': 7, 'horas': 8, 'previsao': 3},
+    {'dias': 7, 'horas': 0, 'previsao': 2},
+    {'dias': 0, 'horas': 0, 'previsao': 1},
+]
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa do número de tokens de um texto"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _value(value: Any) -> str:
+    """Formata um valor de forma compacta ('-' para ausente)"""
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        value = _clean(round(value, 1))
+        return '-' if value is None else str(value)
+    return str(value)
+
+def _sample_indices(n: int, max_rows: int) -> np.ndarray:
+    """Posições igualmente espaçadas (incluindo a mais recente) para reduzir uma série"""
+    if n <= max_rows:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, max_rows).round().astype(int))
+
+def format_series(series: StationSeries, max_rows: int) -> List[str]:
+    """
+    Tabela compacta de uma série (cabeçalho + linhas separadas por '|')
+
+    Séries maiores que `max_rows` são amostradas em intervalos regulares.
+    """
+    if not len(series) or max_rows <= 0:
+        return []
+    columns = [(field, title) for field, title in SERIES_COLUMNS if field in series.columns]
+    unit = 's' if series.is_hourly else 'D'
+    lines = [series.time_key + '|' + '|'.join(title for _, title in columns)]
+    for i in _sample_indices(len(series), max_rows):
+        instante = np.datetime_as_string(series.times[i], unit=unit).replace('T', ' ')
+        if series.is_hourly:
+            instante = instante[:16]
+        lines.append(instante + '|' + '|'.join(_value(float(series.columns[f][i])) for f, _ in columns))
+    return lines
+
+def format_reading(reading: Dict[str, Any]) -> str:
+    """Uma medição em uma linha"""
+    instante = reading.get('datahora') or reading.get('data')
+    valores = ', '.join(f"{title} {_value(reading.get(field))}" for field, title in SERIES_COLUMNS)
+    return f"({instante}) {valores}"
+
+def format_stats(stats: Dict[str, Any]) -> str:
+    """Resumo de period_stats em uma linha"""
+    return (
+        f"{stats['first']} a {stats['last']} ({stats['count']} dias): "
+        f"chuva total {_value(stats['rain_total'])} em {_value(stats['rain_days'])} dias; "
+        f"temp {_value(stats['temp_min'])} a {_value(stats['temp_max'])} (média {_value(stats['temp_mean'])}); "
+        f"umid média {_value(stats['humidity_mean'])}; vento médio {_value(stats['wind_mean'])}; "
+        f"rad média {_value(stats['radiation_mean'])}"
+    )
+
+def format_forecast(previsao: Sequence[Dict[str, Any]], max_rows: int) -> List[str]:
+    """Tabela compacta da previsão"""
+    if not previsao or max_rows <= 0:
+        return []
+    lines = ['|'.join(title for _, title in FORECAST_COLUMNS)]
+    for p in list(previsao)[:max_rows]:
+        lines.append('|'.join(_value(p.get(field)) for field, _ in FORECAST_COLUMNS))
+    return lines
+
+def render_station(contexto: Dict[str, Any], level: Dict[str, int]) -> str:
+    """Contexto de uma estação (formato de ClimateDataAgent.get_analysis_context) no nível de detalhe dado"""
+    estacao = contexto.get('estacao') or {}
+    lines = [f"## Estação {estacao.get('nome', '?')} (ID {estacao.get('id', '?')})"]
+    if contexto.get('aviso'):
+        lines.append(contexto['aviso'])
+
+    if contexto.get('medicao_mais_recente'):
+        lines.append("Medição mais recente " + format_reading(contexto['medicao_mais_recente']))
+
+    dias = contexto.get('dias')
+    if isinstance(dias, StationSeries) and len(dias):
+        lines.append("Resumo " + format_stats(period_stats(dias)))
+        tabela = format_series(dias, level['dias'])
+        if tabela:
+            amostra = ", amostrados" if len(tabela) - 1 < len(dias) else ""
+            lines.append(f"Diário ({len(tabela) - 1} de {len(dias)} dias{amostra}):")
+            lines.extend(tabela)
+
+    horas = contexto.get('horas')
+    if isinstance(horas, StationSeries) and len(horas):
+        tabela = format_series(horas, level['horas'])
+        if tabela:
+            amostra = ", amostradas" if len(tabela) - 1 < len(horas) else ""
+            lines.append(f"Por hora ({len(tabela) - 1} de {len(horas)} medições{amostra}):")
+            lines.extend(tabela)
+
+    tabela = format_forecast(contexto.get('previsao') or [], level['previsao'])
+    if tabela:
+        lines.append("Previsão:")
+        lines.extend(tabela)
+    return '\n'.join(lines)
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Corta o texto no limite de tokens, na última quebra de linha"""
+    limit = int(max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= limit:
+        return text
+    cut = text.rfind('\n', 0, limit)
+    return text[:cut if cut > 0 else limit] + "\n[...dados omitidos]"
+
+def build_climate_context(climate_data: Any, max_tokens: Optional[int] = None) -> str:
+    """
+    Converte os dados climáticos em um texto compacto dentro do orçamento de tokens
+
+    Contextos de estação (uma ou várias em 'estacoes') são escritos como resumo e
+    tabelas; o nível de detalhe é reduzido até caber em `max_tokens`. Outros
+    valores são serializados em JSON compacto e cortados no limite.
+
+    Args:
+        climate_data: Contexto de get_analysis_context, {'estacoes': [...]} ou qualquer valor JSON
+        max_tokens: Orçamento de tokens (padrão: Config.LLM_CONTEXT_MAX_TOKENS)
+    """
+    max_tokens = max_tokens if max_tokens is not None else Config.LLM_CONTEXT_MAX_TOKENS
+
+    if isinstance(climate_data, dict) and 'estacoes' in climate_data:
+        contextos = climate_data['estacoes']
+    elif isinstance(climate_data, dict) and 'estacao' in climate_data:
+        contextos = [climate_data]
+    else:
+        dump = json.dumps(climate_data, default=str, separators=(',', ':'), ensure_ascii=False)
+        return _truncate(dump, max_tokens)
+
+    text = ''
+    for level in DETAIL_LEVELS:
+        text = '\n\n'.join([UNITS_LINE] + [render_station(contexto, level) for contexto in contextos])
+        if estimate_tokens(text) <= max_tokens:
+            return text
+    return _truncate(text, max_tokens)
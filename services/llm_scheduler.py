@@ -0,0 +1,281 @@
+"""
+Agendador das chamadas ao LLM compartilhado pelo processo
+
+Limita a taxa (token bucket) e a concorrência das requisições ao OpenRouter,
+atende as sessões de forma justa (rodízio entre filas por sessão) e repete
+chamadas rejeitadas por limite de taxa respeitando o Retry-After.
+"""
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Deque, Iterator, Optional, TypeVar
+import requests
+from config import Config
+from services.tracing import span
+
+T = TypeVar('T')
+
+class LLMQueueTimeout(Exception):
+    """A requisição esperou na fila mais que o tempo máximo permitido"""
+
+class LLMRateLimited(Exception):
+    """O provedor continuou rejeitando a requisição após todas as tentativas"""
+
+class TokenBucket:
+    """Limitador de taxa: `rate` fichas por segundo, acumulando até `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """
+        Consome uma ficha se houver
+
+        Returns:
+            float: 0 se conseguiu; senão, segundos até a próxima ficha
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+class _Ticket:
+    """Requisição aguardando na fila de uma sessão"""
+
+    __slots__ = ('session_id', 'enqueued_at')
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.enqueued_at = time.monotonic()
+
+class LLMScheduler:
+    """
+    Fila justa com limite de taxa e de concorrência para chamadas ao LLM
+
+    Cada sessão tem sua própria fila; a vez passa de sessão em sessão, de modo
+    que uma sessão com muitas perguntas não bloqueia as demais.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None,
+                 max_in_flight: Optional[int] = None, max_retries: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        self.bucket = TokenBucket(
+            rate if rate is not None else Config.LLM_RATE_LIMIT,
+            burst if burst is not None else Config.LLM_BURST
+        )
+        self.max_in_flight = max(1, max_in_flight if max_in_flight is not None else Config.LLM_MAX_IN_FLIGHT)
+        self.max_retries = max_retries if max_retries is not None else Config.LLM_MAX_RETRIES
+        self.queue_timeout = queue_timeout if queue_timeout is not None else Config.LLM_QUEUE_TIMEOUT
+        self.max_backoff = Config.HTTP_MAX_BACKOFF
+
+        self._cond = threading.Condition()
+        self._queues: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+        self._in_flight = 0
+        self._blocked_until = 0.0  # pausa global após um 429 com Retry-After
+        self._queue_times: Deque[float] = deque(maxlen=1000)
+        self._completed = 0
+        self._failed = 0
+        self._retries = 0
+        self._rate_limited = 0
+        self._timeouts = 0
+
+    @contextmanager
+    def slot(self, session_id: str = 'default') -> Iterator[None]:
+        """Aguarda a vez da sessão e ocupa uma vaga de execução até o fim do bloco"""
+        with span('llm.queue'):
+            self._acquire(session_id)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def submit(self, fn: Callable[[], T], session_id: str = 'default') -> T:
+        """
+        Executa `fn` quando houver vaga, repetindo em caso de limite de taxa
+
+        Raises:
+            LLMQueueTimeout: Se a espera na fila exceder o tempo máximo
+            LLMRateLimited: Se o provedor rejeitar todas as tentativas
+        """
+        attempt = 0
+        while True:
+            try:
+                with self.slot(session_id):
+                    result = fn()
+                self._record(completed=True)
+                return result
+            except Exception as e:
+                if isinstance(e, LLMQueueTimeout) or not self._should_retry(e, attempt):
+                    self._record(completed=False)
+                    raise self._final_error(e)
+                attempt += 1
+
+    def stream(self, factory: Callable[[], Iterator[T]], session_id: str = 'default') -> Iterator[T]:
+        """
+        Versão em streaming de submit
+
+        A vaga fica ocupada enquanto o stream é consumido. Só há nova tentativa
+        se a falha ocorrer antes do primeiro item.
+        """
+        attempt = 0
+        while True:
+            started = False
+            try:
+                with self.slot(session_id):
+                    for item in factory():
+                        started = True
+                        yield item
+                self._record(completed=True)
+                return
+            except Exception as e:
+                if started or isinstance(e, LLMQueueTimeout) or not self._should_retry(e, attempt):
+                    self._record(completed=False)
+                    raise self._final_error(e)
+                attempt += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna métricas da fila (tamanho, vagas em uso e tempo de espera)"""
+        with self._cond:
+            waits = sorted(self._queue_times)
+            queued = sum(len(q) for q in self._queues.values())
+            stats = {
+                'queued': queued,
+                'sessions_waiting': len(self._queues),
+                'in_flight': self._in_flight,
+                'max_in_flight': self.max_in_flight,
+                'rate_per_second': self.bucket.rate,
+                'completed': self._completed,
+                'failed': self._failed,
+                'retries': self._retries,
+                'rate_limited': self._rate_limited,
+                'queue_timeouts': self._timeouts,
+                'blocked_for_seconds': round(max(0.0, self._blocked_until - time.monotonic()), 2)
+            }
+        if waits:
+            stats['queue_time_avg'] = round(sum(waits) / len(waits), 3)
+            stats['queue_time_p50'] = round(waits[len(waits) // 2], 3)
+            stats['queue_time_p95'] = round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3)
+            stats['queue_time_max'] = round(waits[-1], 3)
+        return stats
+
+    def _acquire(self, session_id: str):
+        """Entra na fila da sessão e espera a vez, uma vaga e uma ficha de taxa"""
+        ticket = _Ticket(session_id)
+        deadline = ticket.enqueued_at + self.queue_timeout if self.queue_timeout else None
+        with self._cond:
+            self._queues.setdefault(session_id, deque()).append(ticket)
+            while True:
+                now = time.monotonic()
+                wait = None
+                if self._head() is ticket and self._in_flight < self.max_in_flight:
+                    wait = self._blocked_until - now
+                    if wait <= 0:
+                        wait = self.bucket.try_acquire()
+                        if wait <= 0:
+                            self._dequeue(ticket)
+                            self._in_flight += 1
+                            self._queue_times.append(now - ticket.enqueued_at)
+                            self._cond.notify_all()
+                            return
+
+                if deadline is not None and now >= deadline:
+                    self._dequeue(ticket)
+                    self._timeouts += 1
+                    self._cond.notify_all()
+                    raise LLMQueueTimeout(f"Tempo de espera na fila do LLM excedido ({self.queue_timeout:.0f}s)")
+                if deadline is not None:
+                    wait = min(wait, deadline - now) if wait is not None else deadline - now
+                self._cond.wait(timeout=wait)
+
+    def _head(self) -> Optional[_Ticket]:
+        """Próxima requisição a ser atendida (início da fila da sessão da vez)"""
+        for queue in self._queues.values():
+            return queue[0]
+        return None
+
+    def _dequeue(self, ticket: _Ticket):
+        """Remove a requisição da fila; a sessão atendida vai para o fim do rodízio"""
+        queue = self._queues[ticket.session_id]
+        queue.remove(ticket)
+        if queue:
+            self._queues.move_to_end(ticket.session_id)
+        else:
+            del self._queues[ticket.session_id]
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        """Decide se a falha é temporária e aplica o tempo de espera antes da nova tentativa"""
+        if attempt >= self.max_retries:
+            return False
+        retry_after = None
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            status = error.response.status_code
+            if status not in (429, 500, 502, 503, 504):
+                return False
+            retry_after = error.response.headers.get('Retry-After')
+            if status == 429:
+                with self._cond:
+                    self._rate_limited += 1
+        elif not isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return False
+
+        delay = self._backoff_delay(attempt, retry_after)
+        with self._cond:
+            self._retries += 1
+            if retry_after is not None:
+                # O limite é do provedor: pausar todas as sessões
+                self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+                self._cond.notify_all()
+        if retry_after is None:
+            time.sleep(delay)
+        return True
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Tempo de espera: Retry-After se informado, senão backoff exponencial com jitter"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        limite = min(self.max_backoff, Config.HTTP_BACKOFF_FACTOR * (2 ** attempt))
+        return random.uniform(0, limite)
+
+    def _final_error(self, error: Exception) -> Exception:
+        """Converte falhas de limite de taxa em erro amigável"""
+        if isinstance(error, requests.HTTPError) and error.response is not None and error.response.status_code == 429:
+            return LLMRateLimited("O serviço de IA atingiu o limite de requisições. Tente novamente em alguns instantes.")
+        return error
+
+    def _record(self, completed: bool):
+        with self._cond:
+            if completed:
+                self._completed += 1
+            else:
+                self._failed += 1
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Retorna o agendador de chamadas ao LLM compartilhado pelo processo"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler()
+    return _scheduler
@@ -0,0 +1,385 @@
+"""
+Métricas de desempenho (contadores, medidores e histogramas) no formato Prometheus
+
+Uso:
+    metrics = get_metrics()
+    metrics.counter('clima_questions_total', 'Perguntas', ('intent',)).inc(intent='climate_data')
+    metrics.histogram('clima_question_seconds', 'Latência').observe(0.25)
+    metrics.render()    # texto para o Prometheus
+    metrics.snapshot()  # dicionário (API em processo)
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from config import Config
+from services import tracing
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Amostra produzida por um coletor: (nome, tipo, descrição, rótulos, valor)
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+class _Metric:
+    """Base das métricas: valores por combinação de rótulos"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: rótulos esperados {self.labelnames}, recebidos {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+class Counter(_Metric):
+    """Contador que só aumenta"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+class Gauge(_Metric):
+    """Valor que sobe e desce (ex.: requisições em andamento)"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels) -> Iterator[None]:
+        """Soma 1 enquanto o bloco executa"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in self._values.items()]
+
+class Histogram(_Metric):
+    """Distribuição de valores (latências) em faixas cumulativas"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            else:
+                state['counts'][-1] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observa a duração do bloco, em segundos"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            states = [(self._labels(key), dict(state, counts=list(state['counts'])))
+                      for key, state in self._values.items()]
+        out = []
+        for labels, state in states:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state['counts']):
+                cumulative += count
+                le = '+Inf' if bound == math.inf else repr(bound)
+                out.append((f"{self.name}_bucket", dict(labels, le=le), cumulative))
+            out.append((f"{self.name}_sum", labels, state['sum']))
+            out.append((f"{self.name}_count", labels, state['count']))
+        return out
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Contagem, soma, média e quantis estimados (p50/p95/p99) por combinação de rótulos"""
+        with self._lock:
+            states = [(self._labels(key), dict(state, counts=list(state['counts'])))
+                      for key, state in self._values.items()]
+        return [{
+            'labels': labels,
+            'count': state['count'],
+            'sum': round(state['sum'], 6),
+            'avg': round(state['sum'] / state['count'], 6) if state['count'] else None,
+            'p50': self._quantile(state, 0.5),
+            'p95': self._quantile(state, 0.95),
+            'p99': self._quantile(state, 0.99)
+        } for labels, state in states]
+
+    def _quantile(self, state: Dict[str, Any], q: float) -> Optional[float]:
+        """Quantil por interpolação linear dentro da faixa (como histogram_quantile)"""
+        total = state['count']
+        if not total:
+            return None
+        rank = q * total
+        cumulative, lower = 0, 0.0
+        for bound, count in zip(self.buckets, state['counts']):
+            if cumulative + count >= rank and count:
+                return round(lower + (bound - lower) * (rank - cumulative) / count, 6)
+            cumulative += count
+            lower = bound
+        return self.buckets[-1]
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: Any) -> str:
+    """Escapa um valor de rótulo (barra invertida, aspas e quebra de linha)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+class MetricsRegistry:
+    """Registro das métricas do processo"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Métrica {name} já registrada como {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Registra uma função chamada a cada leitura, para valores obtidos de outros serviços"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def _collected(self) -> List[Sample]:
+        with self._lock:
+            collectors = list(self._collectors)
+        samples: List[Sample] = []
+        for collector in collectors:
+            try:
+                samples.extend(collector())
+            except Exception:
+                # Um serviço indisponível não impede a leitura das demais métricas
+                pass
+        return samples
+
+    def render(self) -> str:
+        """Todas as métricas no formato de texto do Prometheus (versão 0.0.4)"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        declared = set()
+        for name, kind, help, labels, value in self._collected():
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Todas as métricas como dicionário (histogramas resumidos em contagem, média e quantis)"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        result: Dict[str, Any] = {}
+        for metric in metrics:
+            if isinstance(metric, Histogram):
+                values = metric.summary()
+            else:
+                values = [{'labels': labels, 'value': value} for _, labels, value in metric.samples()]
+            result[metric.name] = {'type': metric.kind, 'help': metric.help, 'values': values}
+        for name, kind, help, labels, value in self._collected():
+            entry = result.setdefault(name, {'type': kind, 'help': help, 'values': []})
+            entry['values'].append({'labels': labels, 'value': value})
+        return result
+
+def _service_samples() -> Iterable[Sample]:
+    """Estado atual dos caches, do catálogo e da fila do LLM"""
+    from services.cache import get_climate_cache
+    from services.llm_cache import get_llm_cache
+    from services.llm_scheduler import get_llm_scheduler
+    from services.station_catalog import get_station_catalog
+
+    caches = {'climate': get_climate_cache().get_stats(), 'station_catalog': get_station_catalog().get_stats()}
+    if Config.LLM_CACHE_ENABLED:
+        llm = get_llm_cache().get_stats()
+        caches['llm'] = {'hits': llm['memory_hits'] + llm['disk_hits'], 'misses': llm['misses'],
+                         'hit_ratio': llm['hit_ratio'], 'entries': llm['entries']}
+    for cache, stats in caches.items():
+        labels = {'cache': cache}
+        yield ('clima_cache_hits_total', 'counter', 'Acertos do cache',
+               labels, stats['hits'] + stats.get('stale_hits', 0))
+        yield ('clima_cache_misses_total', 'counter', 'Faltas do cache', labels, stats['misses'])
+        yield ('clima_cache_hit_ratio', 'gauge', 'Proporção de acertos do cache', labels, stats['hit_ratio'])
+        if 'entries' in stats:
+            yield ('clima_cache_entries', 'gauge', 'Entradas no cache', labels, stats['entries'])
+
+    climate = caches['climate']
+    yield ('clima_cache_stale_hits_total', 'counter', 'Acertos servidos com dados vencidos',
+           {'cache': 'climate'}, climate['stale_hits'])
+    yield ('clima_cache_bytes', 'gauge', 'Memória ocupada pelo cache', {'cache': 'climate'}, climate['bytes'])
+    yield ('clima_cache_evictions_total', 'counter', 'Entradas descartadas por falta de espaço',
+           {'cache': 'climate'}, climate['evictions'])
+
+    scheduler = get_llm_scheduler().get_stats()
+    yield ('clima_llm_queue_depth', 'gauge', 'Chamadas ao LLM aguardando na fila', {}, scheduler['queued'])
+    yield ('clima_llm_in_flight', 'gauge', 'Chamadas ao LLM em andamento', {}, scheduler['in_flight'])
+    yield ('clima_llm_calls_total', 'counter', 'Chamadas ao LLM concluídas', {'result': 'completed'},
+           scheduler['completed'])
+    yield ('clima_llm_calls_total', 'counter', 'Chamadas ao LLM concluídas', {'result': 'failed'},
+           scheduler['failed'])
+    yield ('clima_llm_retries_total', 'counter', 'Novas tentativas de chamadas ao LLM', {}, scheduler['retries'])
+    yield ('clima_llm_rate_limited_total', 'counter', 'Respostas 429 do provedor do LLM', {},
+           scheduler['rate_limited'])
+    yield ('clima_llm_queue_timeouts_total', 'counter', 'Chamadas ao LLM que excederam o tempo de fila', {},
+           scheduler['queue_timeouts'])
+
+class SpanMetricsExporter:
+    """Exportador de traces que alimenta o histograma de latência por etapa (agente, busca, LLM)"""
+
+    def __init__(self, registry: 'MetricsRegistry'):
+        self.histogram = registry.histogram('clima_stage_seconds', 'Duração das etapas do processamento (spans)',
+                                            ('stage',))
+
+    def export(self, trace: tracing.Trace):
+        with trace._lock:
+            spans = list(trace.spans)
+        for span in spans:
+            if span is not trace.root and span.duration is not None:
+                self.histogram.observe(span.duration, stage=span.name)
+
+_span_metrics_enabled = False
+
+def enable_span_metrics():
+    """Registra (uma vez) o exportador que converte os spans em métricas por etapa"""
+    global _span_metrics_enabled
+    with _metrics_lock:
+        if _span_metrics_enabled:
+            return
+        _span_metrics_enabled = True
+    tracing.add_exporter(SpanMetricsExporter(get_metrics()))
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics em texto do Prometheus"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = get_metrics().render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+
+def get_metrics() -> MetricsRegistry:
+    """Retorna o registro de métricas compartilhado pelo processo"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                registry = MetricsRegistry()
+                registry.register_collector(_service_samples)
+                _metrics = registry
+    return _metrics
+
+# Erros por componente (orquestrador, dados climáticos, LLM), compartilhados pelos módulos
+ERRORS = get_metrics().counter('clima_errors_total', 'Erros por componente e tipo', ('component', 'type'))
+
+def start_metrics_server(port: Optional[int] = None, host: Optional[str] = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Inicia (uma vez por processo) o servidor HTTP local com GET /metrics
+
+    Returns:
+        O servidor, ou None se a porta for 0 ou já estiver em uso
+    """
+    global _server
+    port = port if port is not None else Config.METRICS_PORT
+    if not port:
+        return None
+    with _metrics_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host or Config.METRICS_HOST, port), _MetricsHandler)
+            except OSError:
+                # Outro processo (ou instância) já expõe as métricas nesta porta
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="clima-metrics", daemon=True).start()
+    return _server
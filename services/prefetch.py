@@ -0,0 +1,153 @@
+"""
+Agendador de pré-carregamento (warm-up) dos dados climáticos de todas as estações
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from config import Config
+from services.station_catalog import get_station_catalog
+
+class PrefetchScheduler:
+    """
+    Atualiza periodicamente, em segundo plano, o cache de todas as estações do catálogo
+
+    A cada ciclo, só são atualizadas as entradas ausentes ou que expirariam
+    antes do próximo ciclo; cada endpoint é atualizado, assim, no ritmo do
+    seu próprio TTL (a previsão, por exemplo, a cada poucas horas).
+    """
+
+    ENDPOINTS = ('clima_por_hora', 'clima_por_dia', 'previsao')
+
+    def __init__(self, climate_agent=None, catalog=None, interval: Optional[float] = None,
+                 max_workers: Optional[int] = None, jitter: Optional[float] = None):
+        if climate_agent is None:
+            from agents.climate_data import ClimateDataAgent
+            climate_agent = ClimateDataAgent()
+        self.climate_agent = climate_agent
+        self.catalog = catalog or get_station_catalog()
+        self.interval = interval if interval is not None else Config.PREFETCH_INTERVAL
+        self.max_workers = max_workers if max_workers is not None else Config.PREFETCH_MAX_WORKERS
+        self.jitter = jitter if jitter is not None else Config.PREFETCH_JITTER
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._warm_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cycles = 0
+        self._last_cycle: Optional[Dict[str, Any]] = None
+        self._next_run_at: Optional[str] = None
+
+    def start(self):
+        """Inicia o agendador (warm-up imediato seguido de ciclos periódicos)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="clima-prefetch", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Interrompe o agendador após o ciclo em andamento"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wait_until_warm(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda o fim da fase de warm-up"""
+        return self._warm_event.wait(timeout)
+
+    def run_cycle(self, phase: str = 'cycle') -> Dict[str, Any]:
+        """
+        Executa um ciclo completo de atualização
+
+        Returns:
+            Dict com duração, número de estações e falhas do ciclo
+        """
+        started_at = datetime.now()
+        start = time.monotonic()
+        failures: List[Dict[str, Any]] = []
+
+        try:
+            estacoes = self.catalog.get_stations()
+        except Exception as e:
+            estacoes = []
+            failures.append({'station_id': None, 'endpoint': 'estacoes', 'error': str(e)})
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for station_failures in executor.map(self._refresh_station, estacoes):
+                failures.extend(station_failures)
+
+        cycle = {
+            'phase': phase,
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'duration_seconds': round(time.monotonic() - start, 3),
+            'stations': len(estacoes),
+            'failures_count': len(failures),
+            'failures': failures
+        }
+        with self._lock:
+            self._cycles += 1
+            self._last_cycle = cycle
+        return cycle
+
+    def get_status(self) -> Dict[str, Any]:
+        """Retorna o status do agendador para exibição em get_system_status"""
+        with self._lock:
+            return {
+                'enabled': Config.PREFETCH_ENABLED,
+                'running': self._thread is not None and self._thread.is_alive(),
+                'warmed_up': self._warm_event.is_set(),
+                'interval_seconds': self.interval,
+                'cycles': self._cycles,
+                'last_cycle': self._last_cycle,
+                'next_run_at': self._next_run_at
+            }
+
+    def _run(self):
+        """Laço principal do agendador"""
+        try:
+            self.run_cycle(phase='warmup')
+        finally:
+            self._warm_event.set()
+
+        while True:
+            wait = self.interval + random.uniform(0, self.jitter)
+            with self._lock:
+                self._next_run_at = datetime.fromtimestamp(time.time() + wait).isoformat(timespec='seconds')
+            if self._stop_event.wait(wait):
+                break
+            self.run_cycle()
+
+    def _needs_refresh(self, endpoint: str, station_id: int) -> bool:
+        """Indica se a entrada está ausente ou expira antes do próximo ciclo"""
+        remaining = self.climate_agent.cache.entry_ttl_remaining(endpoint, station_id)
+        return remaining is None or remaining <= self.interval + self.jitter
+
+    def _refresh_station(self, station: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Atualiza os endpoints da estação prestes a expirar, com jitter para evitar rajadas na iCrop"""
+        failures = []
+        for endpoint in self.ENDPOINTS:
+            if self._stop_event.is_set():
+                break
+            if not self._needs_refresh(endpoint, station['id']):
+                continue
+            time.sleep(random.uniform(0, self.jitter))
+            try:
+                self.climate_agent.refresh_station_data(endpoint, station['id'])
+            except Exception as e:
+                failures.append({'station_id': station['id'], 'endpoint': endpoint, 'error': str(e)})
+        return failures
+
+_scheduler: Optional[PrefetchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+def get_prefetch_scheduler() -> PrefetchScheduler:
+    """Retorna o agendador de pré-carregamento compartilhado pelo processo"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = PrefetchScheduler()
+    return _scheduler
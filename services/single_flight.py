@@ -0,0 +1,77 @@
+"""
+Agrupamento (single-flight) de chamadas idênticas simultâneas
+
+Enquanto uma chamada com determinada chave está em andamento, novas chamadas
+com a mesma chave aguardam e recebem o mesmo resultado (ou a mesma exceção),
+em vez de repetirem o trabalho. Rajadas de N buscas iguais, comuns quando uma
+entrada de cache acaba de expirar, viram uma só.
+
+Uso:
+    flight = SingleFlight('icrop')
+    dados = flight.do(('/clima_por_hora/2297',), lambda: client.request(...).json())
+"""
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Hashable, TypeVar
+from services.metrics import get_metrics
+from services.tracing import span
+
+T = TypeVar('T')
+
+SHARED_CALLS = get_metrics().counter('clima_single_flight_shared_total',
+                                     'Chamadas atendidas pelo resultado de uma chamada idêntica em andamento',
+                                     ('group',))
+
+class SingleFlight:
+    """Executa no máximo uma chamada por chave de cada vez, compartilhando o resultado"""
+
+    def __init__(self, group: str = 'default'):
+        self.group = group
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        Executa `fn` ou aguarda a execução em andamento com a mesma chave
+
+        Funciona entre threads; tarefas asyncio chegam aqui por
+        asyncio.to_thread e também são agrupadas.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self._leaders += 1
+            else:
+                self._shared += 1
+
+        if not leader:
+            SHARED_CALLS.inc(group=self.group)
+            with span('single_flight.wait', group=self.group):
+                return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        """Número de chamadas em andamento"""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Chamadas executadas e chamadas que reaproveitaram uma execução em andamento"""
+        with self._lock:
+            return {'calls': self._leaders, 'shared': self._shared, 'in_flight': len(self._calls)}
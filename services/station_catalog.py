@@ -0,0 +1,222 @@
+"""
+Catálogo de estações compartilhado com TTL, atualização em segundo plano e índices
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from config import Config
+from services.http_client import get_icrop_client
+from services.station_index import StationNameIndex, STOP_WORDS
+from services.text import normalize_text
+
+class StationCatalog:
+    """Catálogo em memória das estações da iCrop com índices de busca pré-calculados"""
+
+    def __init__(self, ttl: Optional[int] = None):
+        self.config = Config
+        self.ttl = ttl if ttl is not None else Config.STATION_CATALOG_TTL
+        self._lock = threading.Lock()
+        self._stations: Optional[List[Dict[str, Any]]] = None
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        self._by_word: Dict[str, List[Dict[str, Any]]] = {}
+        self._name_index = StationNameIndex([])
+        self._name_lookups: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+        self._lookups_lock = threading.Lock()
+        self._loaded_at = 0.0
+        self._refreshing = False
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._errors = 0
+
+    def get_stations(self) -> List[Dict[str, Any]]:
+        """
+        Retorna todas as estações, usando o cache sempre que possível
+
+        Se o cache expirou, os dados atuais continuam sendo servidos enquanto
+        uma nova versão é buscada em segundo plano.
+        """
+        self._ensure_loaded()
+        return list(self._stations)
+
+    def get_by_id(self, station_id: int) -> Optional[Dict[str, Any]]:
+        """Busca estação por ID (consulta O(1) no índice)"""
+        self._ensure_loaded()
+        try:
+            return self._by_id.get(int(station_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca estação por nome (completo ou parcial)
+
+        Ordem de busca: nome exato, palavras do nome e, por último, busca aproximada
+        no índice de trigramas (com confiança mínima STATION_MATCH_MIN_CONFIDENCE).
+        O resultado de cada consulta fica memorizado (LRU de até
+        STATION_NAME_LOOKUP_CACHE_SIZE consultas) até a próxima atualização do catálogo.
+        """
+        self._ensure_loaded()
+        query = normalize_text(name)
+        if not query:
+            return None
+
+        lookups = self._name_lookups
+        with self._lookups_lock:
+            if query in lookups:
+                lookups.move_to_end(query)
+                return lookups[query]
+
+        station = self._by_name.get(query)
+        if station is None:
+            station = self._find_by_words(query)
+        if station is None:
+            station, confidence = self._name_index.best_match(query)
+            if confidence < self.config.STATION_MATCH_MIN_CONFIDENCE:
+                station = None
+
+        with self._lookups_lock:
+            lookups[query] = station
+            while len(lookups) > self.config.STATION_NAME_LOOKUP_CACHE_SIZE:
+                lookups.popitem(last=False)
+        return station
+
+    def search_by_name(self, text: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        Busca aproximada da estação mais parecida com o texto
+
+        Returns:
+            Tuple[Optional[Dict], float]: (melhor estação, confiança de 0 a 1)
+        """
+        self._ensure_loaded()
+        return self._name_index.best_match(text)
+
+    @property
+    def version(self) -> int:
+        """Número de atualizações do catálogo (muda a cada nova versão dos dados)"""
+        return self._refreshes
+
+    def get_name_keywords(self) -> List[str]:
+        """
+        Gera palavras-chave de estação a partir dos nomes do catálogo
+
+        Ex.: "Usina Estrela" -> "estrela", "São Paulo" -> "sao paulo"
+        """
+        self._ensure_loaded()
+        keywords = []
+        for nome in self._by_name:
+            palavras = [p for p in nome.split() if p.strip('.') not in STOP_WORDS]
+            keyword = ' '.join(palavras) or nome
+            if len(keyword) > 2:
+                keywords.append(keyword)
+        return list(dict.fromkeys(keywords))
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """Força a atualização do catálogo a partir da API"""
+        try:
+            estacoes = self._fetch_stations()
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+
+        by_id, by_name, by_word = self._build_indexes(estacoes)
+        name_index = StationNameIndex(estacoes)
+        with self._lock:
+            self._stations = estacoes
+            self._by_id = by_id
+            self._by_name = by_name
+            self._by_word = by_word
+            self._name_index = name_index
+            self._name_lookups = OrderedDict()
+            self._loaded_at = time.monotonic()
+            self._refreshes += 1
+        return list(estacoes)
+
+    def invalidate(self):
+        """Marca o catálogo como expirado"""
+        with self._lock:
+            self._loaded_at = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores de uso do cache"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': self._hits / total if total else 0.0,
+                'refreshes': self._refreshes,
+                'errors': self._errors,
+                'stations_count': len(self._stations) if self._stations is not None else 0,
+                'age_seconds': time.monotonic() - self._loaded_at if self._stations is not None else None
+            }
+
+    def _ensure_loaded(self):
+        """Garante que o catálogo está carregado, disparando atualização quando expirado"""
+        with self._lock:
+            loaded = self._stations is not None
+            expired = time.monotonic() - self._loaded_at > self.ttl
+            if loaded:
+                self._hits += 1
+                start_refresh = expired and not self._refreshing
+                if start_refresh:
+                    self._refreshing = True
+            else:
+                self._misses += 1
+                start_refresh = False
+
+        if not loaded:
+            self.refresh()
+        elif start_refresh:
+            threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self):
+        """Atualiza o catálogo em segundo plano, mantendo os dados antigos em caso de erro"""
+        try:
+            self.refresh()
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _fetch_stations(self) -> List[Dict[str, Any]]:
+        """Busca o catálogo completo na API iCrop"""
+        return get_icrop_client().get_json("/estacoes")
+
+    def _build_indexes(self, estacoes: List[Dict[str, Any]]):
+        """Constrói os índices id->estação, nome->estação e palavra->estações"""
+        by_id = {}
+        by_name = {}
+        by_word = {}
+        for estacao in estacoes:
+            by_id[estacao['id']] = estacao
+            nome = normalize_text(estacao['nome'])
+            by_name.setdefault(nome, estacao)
+            for palavra in set(nome.split()):
+                by_word.setdefault(palavra, []).append(estacao)
+        return by_id, by_name, by_word
+
+    def _find_by_words(self, query: str) -> Optional[Dict[str, Any]]:
+        """Busca a primeira estação cujo nome contém todas as palavras da consulta"""
+        palavras = query.split()
+        candidatos = self._by_word.get(palavras[0], [])
+        for palavra in palavras[1:]:
+            ids = {e['id'] for e in self._by_word.get(palavra, [])}
+            candidatos = [e for e in candidatos if e['id'] in ids]
+        return candidatos[0] if candidatos else None
+
+_catalog: Optional[StationCatalog] = None
+_catalog_lock = threading.Lock()
+
+def get_station_catalog() -> StationCatalog:
+    """Retorna o catálogo de estações compartilhado pelo processo"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = StationCatalog()
+    return _catalog
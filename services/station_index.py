@@ -0,0 +1,113 @@
+"""
+Índice de nomes de estações com busca aproximada por trigramas
+"""
+import re
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Set, Tuple
+from services.text import normalize_text
+
+# Palavras que não fazem parte de nomes de estação (já normalizadas, sem acento)
+STOP_WORDS = {
+    'estacao', 'estacoes', 'da', 'de', 'do', 'das', 'dos', 'em', 'na', 'no', 'nas', 'nos',
+    'temperatura', 'clima', 'atual', 'hoje', 'agora', 'ontem', 'amanha', 'quero', 'saber',
+    'qual', 'quais', 'a', 'o', 'as', 'os', 'e', 'essa', 'esse', 'esta', 'este', 'com', 'id',
+    'usina', 'reg', 'como', 'para', 'por', 'hora', 'dia', 'dados', 'tempo', 'previsao',
+    'umidade', 'chuva', 'vento', 'radiacao', 'me', 'mostre', 'diga', 'sobre', 'fazenda', 'faz'
+}
+
+def _tokenize(text: str) -> List[str]:
+    """Divide texto normalizado em palavras alfanuméricas"""
+    return re.findall(r'[a-z0-9]+', normalize_text(text))
+
+def _trigrams(token: str) -> Set[str]:
+    """Trigramas de uma palavra, com preenchimento nas bordas"""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class StationNameIndex:
+    """
+    Índice invertido de trigramas sobre os nomes das estações
+
+    A busca compara cada palavra da consulta com as palavras dos nomes por
+    similaridade de Dice entre trigramas, soma a melhor similaridade por palavra
+    e retorna a estação mais bem pontuada com um grau de confiança (0 a 1), que
+    combina a qualidade das palavras encontradas e quanto do nome foi coberto.
+    """
+
+    def __init__(self, estacoes: List[Dict[str, Any]], min_similarity: float = 0.5):
+        self.min_similarity = min_similarity
+        self._stations = list(estacoes)
+        self._station_token_counts: List[int] = []
+        self._tokens: List[str] = []
+        self._token_trigram_counts: List[int] = []
+        self._token_stations: List[List[int]] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+
+        token_ids: Dict[str, int] = {}
+        for station_idx, estacao in enumerate(self._stations):
+            tokens = _tokenize(estacao['nome'])
+            significant = [t for t in tokens if t not in STOP_WORDS] or tokens
+            self._station_token_counts.append(len(set(significant)))
+            for token in set(significant):
+                token_id = token_ids.get(token)
+                if token_id is None:
+                    token_id = len(self._tokens)
+                    token_ids[token] = token_id
+                    self._tokens.append(token)
+                    self._token_stations.append([])
+                    trigrams = _trigrams(token)
+                    self._token_trigram_counts.append(len(trigrams))
+                    for trigram in trigrams:
+                        self._postings[trigram].append(token_id)
+                self._token_stations[token_id].append(station_idx)
+
+    def __len__(self) -> int:
+        return len(self._stations)
+
+    def search(self, text: str, limit: int = 5) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Busca as estações mais parecidas com o texto
+
+        Args:
+            text: Pergunta ou nome (parcial) da estação
+            limit: Número máximo de candidatos
+
+        Returns:
+            Lista de (estação, confiança) ordenada da melhor para a pior
+        """
+        query_tokens = [t for t in dict.fromkeys(_tokenize(text)) if t not in STOP_WORDS and len(t) > 2]
+        if not query_tokens:
+            return []
+
+        # best[station_idx][query_idx] = melhor similaridade da palavra da consulta com o nome
+        best: Dict[int, Dict[int, float]] = defaultdict(dict)
+        for query_idx, query_token in enumerate(query_tokens):
+            query_trigrams = _trigrams(query_token)
+            shared: Dict[int, int] = defaultdict(int)
+            for trigram in query_trigrams:
+                for token_id in self._postings.get(trigram, ()):
+                    shared[token_id] += 1
+
+            for token_id, count in shared.items():
+                similarity = 2 * count / (len(query_trigrams) + self._token_trigram_counts[token_id])
+                if similarity < self.min_similarity:
+                    continue
+                for station_idx in self._token_stations[token_id]:
+                    if similarity > best[station_idx].get(query_idx, 0.0):
+                        best[station_idx][query_idx] = similarity
+
+        ranked = []
+        for station_idx, similarities in best.items():
+            score = sum(similarities.values())
+            quality = score / len(similarities)
+            coverage = min(1.0, score / max(self._station_token_counts[station_idx], 1))
+            confidence = (quality + coverage) / 2
+            ranked.append((score, confidence, -station_idx))
+        ranked.sort(reverse=True)
+
+        return [(self._stations[-neg_idx], round(confidence, 3)) for _, confidence, neg_idx in ranked[:limit]]
+
+    def best_match(self, text: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Retorna a melhor estação para o texto e sua confiança (ou (None, 0.0))"""
+        results = self.search(text, limit=1)
+        return results[0] if results else (None, 0.0)
@@ -0,0 +1,32 @@
+"""
+Utilitários de normalização de texto
+"""
+import re
+import unicodedata
+
+# Caracteres que não são ASCII nem acentos do bloco de diacríticos combinantes
+# (U+034F, o "combining grapheme joiner", não é combinante e fica de fora)
+_NOT_FOLDABLE = re.compile('[^\\x00-\\x7f\\u0300-\\u034e\\u0350-\\u036f]')
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza texto para comparação: minúsculas, sem acentos e sem espaços extras
+
+    Args:
+        text: Texto original
+
+    Returns:
+        str: Texto normalizado (ex.: "São Cipriano" -> "sao cipriano")
+    """
+    if not text:
+        return ""
+    sem_acentos = str(text).lower()
+    if not sem_acentos.isascii():
+        decomposed = unicodedata.normalize('NFKD', sem_acentos)
+        if _NOT_FOLDABLE.search(decomposed) is None:
+            # Só restam ASCII e acentos combinantes: basta descartar o que não é ASCII
+            sem_acentos = decomposed.encode('ascii', 'ignore').decode('ascii')
+        else:
+            sem_acentos = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.split())
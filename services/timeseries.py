@@ -0,0 +1,192 @@
+"""
+Representação colunar das medições climáticas de uma estação
+"""
+import math
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Union
+import numpy as np
+
+# Campos numéricos comuns a /clima_por_hora e /clima_por_dia
+FIELDS = ('temp_min', 'temp_max', 'temp_med', 'umidade', 'chuva', 'vento', 'radiacao')
+
+DateLike = Union[str, np.datetime64, datetime]
+
+def to_datetime64(values: Iterable[Any]) -> np.ndarray:
+    """
+    Converte datas da iCrop para datetime64[s]
+
+    Tenta primeiro o formato ISO (conversão vetorizada do NumPy); se algum
+    valor não for ISO, converte um a um com parse_datetime, de modo que datas
+    ISO nunca são lidas com dia antes do mês e valores inválidos viram NaT.
+    """
+    values = list(values)
+    try:
+        return np.array(values, dtype='datetime64[s]')
+    except (ValueError, TypeError):
+        parsed = [parse_datetime(value) for value in values]
+        return np.array([np.datetime64('NaT') if p is None else p for p in parsed], dtype='datetime64[s]')
+
+def parse_datetime(value: Any) -> Optional[np.datetime64]:
+    """Converte uma única data da iCrop para datetime64[s] (None se inválida)"""
+    if not value:
+        return None
+    try:
+        return np.datetime64(value, 's')
+    except (ValueError, TypeError):
+        pass
+    for fmt in ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y'):
+        try:
+            return np.datetime64(datetime.strptime(str(value), fmt), 's')
+        except ValueError:
+            continue
+    return None
+
+def _to_float(value: Any) -> float:
+    """Converte um valor da API para float (NaN se ausente ou inválido); aceita vírgula decimal ("23,5")"""
+    if isinstance(value, str) and ',' in value:
+        value = value.replace('.', '').replace(',', '.')
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _clean(value: float) -> Optional[Union[int, float]]:
+    """Converte um valor da série para exibição (None para ausente, int quando inteiro)"""
+    value = float(value)
+    if math.isnan(value):
+        return None
+    return int(value) if value.is_integer() else value
+
+class StationSeries:
+    """
+    Série temporal colunar de uma estação
+
+    Os valores ficam em arrays NumPy (float64) por campo, com índice datetime64
+    ordenado da medição mais recente para a mais antiga.
+    """
+
+    def __init__(self, times: np.ndarray, columns: Dict[str, np.ndarray], time_key: str = 'datahora'):
+        self.times = times
+        self.columns = columns
+        self.time_key = time_key
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], time_key: Optional[str] = None) -> 'StationSeries':
+        """
+        Constrói a série a partir do payload da iCrop (lista de dicts)
+
+        Args:
+            records: Registros de /clima_por_hora ou /clima_por_dia
+            time_key: Campo de data ('datahora' ou 'data'); detectado se omitido
+        """
+        if time_key is None:
+            time_key = 'datahora' if records and 'datahora' in records[0] else 'data'
+        if not records:
+            return cls.empty(time_key)
+
+        times = to_datetime64(r.get(time_key) for r in records)
+        columns = {
+            field: np.fromiter((_to_float(r.get(field)) for r in records), dtype=np.float64, count=len(records))
+            for field in FIELDS
+        }
+
+        # Descartar registros sem data e ordenar do mais recente para o mais antigo
+        valid = ~np.isnat(times)
+        order = np.argsort(times[valid], kind='stable')[::-1]
+        return cls(times[valid][order], {f: c[valid][order] for f, c in columns.items()}, time_key)
+
+    @classmethod
+    def empty(cls, time_key: str = 'datahora') -> 'StationSeries':
+        """Série sem medições"""
+        return cls(np.array([], dtype='datetime64[s]'), {f: np.array([], dtype=np.float64) for f in FIELDS}, time_key)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelos arrays da série"""
+        return int(self.times.nbytes + sum(c.nbytes for c in self.columns.values()))
+
+    @property
+    def is_hourly(self) -> bool:
+        return self.time_key == 'datahora'
+
+    def record(self, index: int) -> Dict[str, Any]:
+        """Retorna a medição da posição `index` no formato de dict da iCrop"""
+        unit = 's' if self.is_hourly else 'D'
+        record = {self.time_key: np.datetime_as_string(self.times[index], unit=unit).replace('T', ' ')}
+        for field, column in self.columns.items():
+            record[field] = _clean(column[index])
+        return record
+
+    def head(self, n: int = 5) -> List[Dict[str, Any]]:
+        """As `n` medições mais recentes"""
+        return [self.record(i) for i in range(min(n, len(self)))]
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Converte toda a série para lista de dicts"""
+        return [self.record(i) for i in range(len(self))]
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """A medição mais recente"""
+        return self.record(0) if len(self) else None
+
+    def latest_valid(self) -> Optional[Dict[str, Any]]:
+        """
+        A medição mais recente que não seja de 00:00:00
+
+        Nas séries por hora, o registro de meia-noite costuma ser o consolidado
+        do dia; se só houver registros de meia-noite, retorna o mais recente.
+        """
+        if not len(self):
+            return None
+        if not self.is_hourly:
+            return self.record(0)
+        # A medição procurada quase sempre está no início; só varre tudo se preciso
+        for times in (self.times[:48], self.times):
+            not_midnight = (times - times.astype('datetime64[D]')) != np.timedelta64(0, 's')
+            if not_midnight.any():
+                return self.record(int(np.argmax(not_midnight)))
+        return self.record(0)
+
+    def between(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> 'StationSeries':
+        """
+        Recorte da série no intervalo [start, end] (limites inclusivos)
+
+        Usa busca binária sobre o índice ordenado.
+        """
+        # O índice é decrescente; a busca é feita sobre a versão crescente
+        ascending = self.times[::-1]
+        lo = 0 if start is None else int(np.searchsorted(ascending, np.datetime64(start, 's'), side='left'))
+        hi = len(ascending) if end is None else int(np.searchsorted(ascending, np.datetime64(end, 's'), side='right'))
+        n = len(self)
+        sl = slice(n - hi, n - lo)
+        return StationSeries(self.times[sl], {f: c[sl] for f, c in self.columns.items()}, self.time_key)
+
+    def select(self, fields: Iterable[str]) -> 'StationSeries':
+        """Série apenas com os campos pedidos"""
+        return StationSeries(self.times, {f: self.columns[f] for f in fields if f in self.columns}, self.time_key)
+
+    def merge(self, other: 'StationSeries', max_rows: Optional[int] = None) -> 'StationSeries':
+        """
+        Une duas séries, mantendo a medição de `other` em datas repetidas
+
+        Args:
+            other: Série com medições novas
+            max_rows: Limite opcional de medições mantidas (as mais recentes)
+        """
+        times = np.concatenate([other.times, self.times])
+        fields = [f for f in self.columns if f in other.columns]
+        columns = {f: np.concatenate([other.columns[f], self.columns[f]]) for f in fields}
+
+        _, first = np.unique(times, return_index=True)
+        order = first[np.argsort(times[first], kind='stable')[::-1]]
+        if max_rows is not None:
+            order = order[:max_rows]
+        return StationSeries(times[order], {f: c[order] for f, c in columns.items()}, self.time_key)
+
+    def __repr__(self) -> str:
+        first = self.times[-1] if len(self) else None
+        last = self.times[0] if len(self) else None
+        return f"StationSeries({self.time_key}, {len(self)} medições, {first} .. {last})"
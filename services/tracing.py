@@ -0,0 +1,327 @@
+"""
+Rastreamento (tracing) da latência de cada etapa do processamento de uma pergunta
+
+Uso:
+    with start_trace('process_question') as trace:
+        with span('parse'):
+            ...
+    trace.breakdown()  # tempos por etapa
+
+Os spans são propagados por contextvars (inclusive para asyncio.to_thread);
+para ThreadPoolExecutor, use bind(). Fora de um trace, span() não registra
+nada e custa apenas a leitura de uma ContextVar.
+"""
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator, List, Optional, TypeVar
+import requests
+from config import Config
+
+T = TypeVar('T')
+
+_current_trace: contextvars.ContextVar[Optional['Trace']] = contextvars.ContextVar('clima_trace', default=None)
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('clima_span', default=None)
+
+class Span:
+    """Etapa medida de um trace"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'error',
+                 'start_time', '_start', 'duration')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def set(self, **attributes):
+        """Adiciona atributos ao span"""
+        self.attributes.update(attributes)
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+
+    @property
+    def duration_ms(self) -> float:
+        duration = self.duration if self.duration is not None else time.perf_counter() - self._start
+        return round(duration * 1000, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_time': self.start_time,
+            'duration_ms': self.duration_ms,
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+class Trace:
+    """Conjunto de spans de uma requisição"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = os.urandom(16).hex()
+        self.root: Optional[Span] = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def breakdown(self) -> Dict[str, Any]:
+        """
+        Tempos da requisição
+
+        Returns:
+            Dict com o total, o tempo somado por etapa ('stages') e a lista de
+            spans em ordem de árvore, com profundidade e início relativo em ms
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s._start)
+        if not spans:
+            return {'trace_id': self.trace_id, 'name': self.name, 'total_ms': 0.0, 'stages': {}, 'spans': []}
+
+        origin = self.root._start if self.root is not None else spans[0]._start
+        by_id = {s.span_id: s for s in spans}
+        root_id = self.root.span_id if self.root is not None else None
+        children: Dict[Optional[str], List[Span]] = {}
+        for s in spans:
+            # Etapas cujo pai ainda está em andamento (ex.: busca cancelada) ficam sob a raiz
+            parent_id = s.parent_id if s.parent_id in by_id or s is self.root else root_id
+            children.setdefault(parent_id, []).append(s)
+
+        # Ordem de árvore: cada span seguido das suas etapas internas
+        ordered = []
+        pending = [(s, 0) for s in reversed(children.get(None, []))]
+        while pending:
+            s, depth = pending.pop()
+            ordered.append((s, depth))
+            pending.extend((child, depth + 1) for child in reversed(children.get(s.span_id, [])))
+
+        stages: Dict[str, float] = {}
+        items = []
+        for s, depth in ordered:
+            if s is not self.root:
+                stages[s.name] = round(stages.get(s.name, 0.0) + s.duration_ms, 2)
+            item = {'name': s.name, 'depth': depth, 'start_ms': round((s._start - origin) * 1000, 2),
+                    'ms': s.duration_ms}
+            if s.attributes:
+                item['attributes'] = s.attributes
+            if s.error:
+                item['error'] = s.error
+            items.append(item)
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'total_ms': self.root.duration_ms if self.root is not None else items[-1]['ms'],
+            'stages': stages,
+            'spans': items
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = list(self.spans)
+        return {'trace_id': self.trace_id, 'name': self.name, 'spans': [s.to_dict() for s in spans]}
+
+def _reset(var: contextvars.ContextVar, token: contextvars.Token):
+    try:
+        var.reset(token)
+    except ValueError:
+        # Gerador encerrado em outro contexto: nada a restaurar
+        pass
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Mede um bloco como etapa do trace atual (não faz nada fora de um trace)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(name, trace.trace_id, parent.span_id if parent is not None else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.finish()
+        _reset(_current_span, token)
+        trace.add(current)
+
+@contextmanager
+def start_trace(name: str, **attributes) -> Iterator[Optional[Trace]]:
+    """
+    Inicia um trace (ou, se já houver um ativo, um span dentro dele)
+
+    Ao final, o trace é enviado aos exportadores configurados. Retorna None
+    com o rastreamento desativado (Config.TRACING_ENABLED).
+    """
+    if not Config.TRACING_ENABLED:
+        yield None
+        return
+
+    active = _current_trace.get()
+    if active is not None:
+        with span(name, **attributes):
+            yield active
+        return
+
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        with span(name, **attributes) as root:
+            trace.root = root
+            yield trace
+    finally:
+        _reset(_current_trace, token)
+        _export(trace)
+
+def current_span() -> Optional[Span]:
+    """Span em andamento no contexto atual"""
+    return _current_span.get()
+
+def bind(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Prende a função ao contexto atual, para que spans criados em outro thread
+    (ThreadPoolExecutor) façam parte do trace em andamento
+    """
+    if _current_trace.get() is None:
+        return fn
+    context = contextvars.copy_context()
+
+    def bound(*args, **kwargs) -> T:
+        return context.copy().run(fn, *args, **kwargs)
+    return bound
+
+class JsonLinesExporter:
+    """Grava cada trace como uma linha JSON em um arquivo local"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def export(self, trace: Trace):
+        line = json.dumps(trace.to_dict(), default=str, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+class OTLPExporter:
+    """
+    Envia os traces a um coletor OpenTelemetry (OTLP/HTTP com JSON)
+
+    O envio é feito em segundo plano, em lotes; se a fila encher, os traces
+    excedentes são descartados para não afetar as respostas.
+    """
+
+    def __init__(self, endpoint: str, service_name: Optional[str] = None, max_queue: int = 1000):
+        endpoint = endpoint.rstrip('/')
+        self.endpoint = endpoint if endpoint.endswith('/v1/traces') else f"{endpoint}/v1/traces"
+        self.service_name = service_name or Config.TRACE_SERVICE_NAME
+        self.dropped = 0
+        self._queue: "queue.Queue[Trace]" = queue.Queue(maxsize=max_queue)
+        self._session = requests.Session()
+        self._thread = threading.Thread(target=self._run, name="clima-otlp", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 100:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._session.post(self.endpoint, json=self._payload(batch), timeout=5)
+            except requests.RequestException:
+                self.dropped += len(batch)
+
+    def _payload(self, traces: List[Trace]) -> Dict[str, Any]:
+        spans = []
+        for trace in traces:
+            with trace._lock:
+                trace_spans = list(trace.spans)
+            for s in trace_spans:
+                start = int(s.start_time * 1e9)
+                item = {
+                    'traceId': s.trace_id,
+                    'spanId': s.span_id,
+                    'name': s.name,
+                    'kind': 1,
+                    'startTimeUnixNano': str(start),
+                    'endTimeUnixNano': str(start + int((s.duration or 0) * 1e9)),
+                    'attributes': [_otlp_attribute(k, v) for k, v in s.attributes.items()],
+                    'status': {'code': 2, 'message': s.error} if s.error else {'code': 1}
+                }
+                if s.parent_id:
+                    item['parentSpanId'] = s.parent_id
+                spans.append(item)
+        return {'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attribute('service.name', self.service_name)]},
+            'scopeSpans': [{'scope': {'name': 'clima.ai'}, 'spans': spans}]
+        }]}
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+_exporters: Optional[List[Any]] = None
+_exporters_lock = threading.Lock()
+
+def get_exporters() -> List[Any]:
+    """Exportadores configurados (TRACE_EXPORT_PATH e TRACE_OTLP_ENDPOINT)"""
+    global _exporters
+    if _exporters is None:
+        with _exporters_lock:
+            if _exporters is None:
+                exporters: List[Any] = []
+                if Config.TRACE_EXPORT_PATH:
+                    exporters.append(JsonLinesExporter(Config.TRACE_EXPORT_PATH))
+                if Config.TRACE_OTLP_ENDPOINT:
+                    exporters.append(OTLPExporter(Config.TRACE_OTLP_ENDPOINT))
+                _exporters = exporters
+    return _exporters
+
+def add_exporter(exporter: Any):
+    """Registra um exportador adicional (qualquer objeto com export(trace))"""
+    exporters = get_exporters()
+    with _exporters_lock:
+        exporters.append(exporter)
+
+def _export(trace: Trace):
+    for exporter in get_exporters():
+        try:
+            exporter.export(trace)
+        except Exception:
+            # Falhas de exportação não afetam a resposta
+            pass
@@ -0,0 +1,24 @@
+import numpy as np
+from services.aggregation import fill_calendar, rolling
+from services.timeseries import StationSeries
+
+def test_fill_calendar_inserts_missing_days():
+    dias = StationSeries.from_records([
+        {'data': '2025-03-10', 'chuva': 5.0},
+        {'data': '2025-03-07', 'chuva': 1.0},
+    ], 'data')
+    calendario = fill_calendar(dias)
+    assert list(calendario.times) == [np.datetime64(f'2025-03-{d:02d}T00:00:00') for d in (10, 9, 8, 7)]
+    assert np.isnan(calendario.columns['chuva'][1:3]).all()
+
+def test_three_day_rain_window_uses_calendar_days():
+    # Dias 08 e 09 sem registro: 07 e 10 não podem cair na mesma janela de 3 dias
+    dias = StationSeries.from_records([
+        {'data': '2025-03-10', 'chuva': 5.0},
+        {'data': '2025-03-07', 'chuva': 1.0},
+        {'data': '2025-03-06', 'chuva': 2.0},
+    ], 'data')
+    assert rolling(dias, 'chuva', 3, 'sum')[0] == 8.0  # janela por contagem de medições
+    acumulado = rolling(fill_calendar(dias), 'chuva', 3, 'sum')
+    assert acumulado[0] == 5.0
+    assert np.nanmax(acumulado) == 5.0
@@ -0,0 +1,44 @@
+import time
+import pytest
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker('teste', failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker('teste', failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker('teste', failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()  # chamada de teste
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_failed_probe_reopens_the_circuit():
+    changes = []
+    breaker = CircuitBreaker('teste', failure_threshold=1, reset_timeout=0.05, on_state_change=changes.append)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert changes == [CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN, CircuitBreaker.OPEN]
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from services import http_client
+from services.circuit_breaker import CircuitOpenError
+from services.http_client import HttpClient
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.calls += 1
+            call = server.calls
+        if self.path.startswith('/falha'):
+            self._send(503, b'{}')
+            return
+        if call in server.slow_calls:
+            time.sleep(1.5)
+        self._send(200, json.dumps([{'call': call}]).encode())
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.lock = threading.Lock()
+    httpd.calls = 0
+    httpd.slow_calls = set()
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+
+def _client(server, **kwargs):
+    return HttpClient(f"http://127.0.0.1:{server.server_address[1]}", max_retries=0, read_timeout=5, **kwargs)
+
+def _warm(client, endpoint, seconds=0.02):
+    for _ in range(http_client.Config.HTTP_HEDGE_MIN_SAMPLES):
+        client._record_latency(endpoint, seconds)
+
+def test_hedge_answers_when_primary_is_slow(server):
+    client = _client(server, hedge=True)
+    _warm(client, '/dados')
+    server.slow_calls = {1}
+    start = time.perf_counter()
+    assert client.get_json('/dados/1') == [{'call': 2}]
+    assert time.perf_counter() - start < 1.0
+    assert server.calls == 2
+    client.close()
+
+def test_streamed_primary_losing_to_hedge_returns_hedge_response(monkeypatch):
+    client = HttpClient('http://exemplo', hedge=True)
+    _warm(client, '/dados')
+
+    class FakeResponse:
+        def __init__(self, name):
+            self.name = name
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    primary = FakeResponse('primary')
+    hedge_started = threading.Event()
+
+    def fake_request(method, path, **kwargs):
+        call = getattr(http_client._calls, 'current', None)
+        if call is not None:
+            # Principal: cabeçalhos recebidos, mas a reserva decide antes dela
+            assert call.hedge_done.wait(2)
+            return primary
+        hedge_started.set()
+        return FakeResponse('hedge')
+
+    monkeypatch.setattr(client, 'request', fake_request)
+    response = client._get('/dados/1', stream=True)
+    assert hedge_started.is_set()
+    assert response.name == 'hedge' and not response.closed
+    assert primary.closed
+    client.close()
+
+def test_breaker_opens_and_fails_fast(server, monkeypatch):
+    monkeypatch.setattr(http_client.Config, 'CIRCUIT_FAILURE_THRESHOLD', 2)
+    client = _client(server, circuit_breakers=True)
+    for _ in range(2):
+        with pytest.raises(Exception):
+            client.get_json('/falha/1')
+    calls = server.calls
+    with pytest.raises(CircuitOpenError):
+        client.get_json('/falha/1')
+    assert server.calls == calls
+    assert client.get_circuit_states()['/falha']['state'] == 'open'
+    assert client.get_json('/dados/1')  # outros endpoints seguem livres
+    client.close()
@@ -0,0 +1,21 @@
+from services.keyword_matcher import KeywordHit, KeywordMatcher
+
+def test_overlapping_and_prefix_keywords():
+    matcher = KeywordMatcher({'chuva': ['chuva', 'chuv'], 'previsao': ['previsão de chuva'], 'vento': ['vento']})
+    hits = matcher.find_all("Previsão de chuva e VENTO")
+    assert hits == [
+        KeywordHit('previsão de chuva', 'previsao', 0),
+        KeywordHit('chuva', 'chuva', 12),
+        KeywordHit('chuv', 'chuva', 12),
+        KeywordHit('vento', 'vento', 20),
+    ]
+
+def test_same_semantics_as_substring_search():
+    keywords = {'a': ['umidade', 'mid'], 'b': ['dade', 'temperatura'], 'c': ['ura', 'atu']}
+    matcher = KeywordMatcher(keywords)
+    text = "umidade e temperatura"
+    expected = {c for c, words in keywords.items() for w in words if w in text}
+    assert matcher.categories(text) == expected
+
+def test_empty_matcher():
+    assert KeywordMatcher({}).find_all("qualquer texto") == []
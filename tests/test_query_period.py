@@ -0,0 +1,34 @@
+import numpy as np
+from agents.climate_data import ClimateDataAgent
+from services.history_store import ClimateHistoryStore
+from services.timeseries import StationSeries
+
+def _daily(*dates):
+    return StationSeries.from_records([{'data': d, 'chuva': 1.0} for d in dates], 'data')
+
+def _agent(history, api_series):
+    agent = ClimateDataAgent.__new__(ClimateDataAgent)
+    agent.history = history
+    agent.get_daily_climate = lambda station_id: api_series
+    return agent
+
+def test_history_covering_the_range_skips_the_api():
+    store = ClimateHistoryStore(':memory:')
+    store.save_series(1, _daily('2025-03-10', '2025-03-11', '2025-03-12'))
+    agent = _agent(store, None)
+    series = agent._query_period(1, 'data', '2025-03-10 00:00:00', '2025-03-12 23:59:59')
+    assert len(series) == 3
+
+def test_partial_history_is_completed_by_the_api():
+    store = ClimateHistoryStore(':memory:')
+    store.save_series(1, _daily('2025-03-12'))
+    agent = _agent(store, _daily('2025-03-09', '2025-03-10', '2025-03-11', '2025-03-12'))
+    series = agent._query_period(1, 'data', '2025-03-10 00:00:00', '2025-03-12 23:59:59')
+    assert list(series.times) == [np.datetime64('2025-03-12'), np.datetime64('2025-03-11'), np.datetime64('2025-03-10')]
+
+def test_history_with_an_internal_gap_is_completed_by_the_api():
+    store = ClimateHistoryStore(':memory:')
+    store.save_series(1, _daily('2025-03-10', '2025-03-12'))
+    agent = _agent(store, _daily('2025-03-10', '2025-03-11', '2025-03-12'))
+    series = agent._query_period(1, 'data', '2025-03-10 00:00:00', '2025-03-12 23:59:59')
+    assert list(series.times) == [np.datetime64('2025-03-12'), np.datetime64('2025-03-11'), np.datetime64('2025-03-10')]
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from agents.request_collector import RequestCollectorAgent
+
+NOW = datetime(2025, 3, 15, 10, 30, 12, 500)
+
+def _datetime(question):
+    collector = RequestCollectorAgent()
+    collector._now = lambda: NOW
+    return collector.collect_request(question)['datetime']
+
+def test_last_hours_is_a_relative_period():
+    for question in ("chuva nas últimas 12h em estrela", "chuva nas ultimas 12 horas em estrela"):
+        info = _datetime(question)
+        assert info['time'] is None
+        assert (info['period'], info['start'], info['end']) == ('hours', '2025-03-14 22:30:12', '2025-03-15 10:30:12')
+
+def test_last_days_include_today():
+    info = _datetime("chuva nos últimos 3 dias em guarani")
+    assert (info['period'], info['start'], info['end']) == ('days', '2025-03-13 00:00:00', '2025-03-15 23:59:59')
+
+def test_specific_hour_is_still_an_hour():
+    info = _datetime("umidade às 14h em lucinha")
+    assert info['time'] == '14h'
+    assert (info['period'], info['start'], info['end']) == ('hour', '2025-03-15 14:00:00', '2025-03-15 14:59:59')
+
+def test_out_of_range_relative_period_is_ignored():
+    info = _datetime("chuva nos últimos 99999999 dias")
+    assert info['period'] is None and not info['is_current']
+
+def test_stations_keep_the_order_of_the_question():
+    request = RequestCollectorAgent().collect_request("compare a chuva de estrela com a estação id 12")
+    assert [(station['name'], station['id']) for station in request['stations']] == [('estrela', None), (None, 12)]
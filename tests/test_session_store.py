@@ -0,0 +1,30 @@
+import asyncio
+from server import SessionStore
+
+def test_session_lock_is_shared_between_stores(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    first, second = SessionStore(path=path), SessionStore(path=path)  # um por processo
+    order = []
+
+    async def turn(store, name):
+        async with store.lock('abc'):
+            order.append(f'{name}:início')
+            await asyncio.sleep(0.1)
+            order.append(f'{name}:fim')
+
+    async def main():
+        await asyncio.gather(turn(first, 'a'), turn(second, 'b'))
+
+    asyncio.run(main())
+    assert order in (['a:início', 'a:fim', 'b:início', 'b:fim'], ['b:início', 'b:fim', 'a:início', 'a:fim'])
+
+def test_expired_session_lock_is_taken_over(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    crashed, store = SessionStore(path=path, lock_timeout=0), SessionStore(path=path)
+    assert crashed._acquire('abc', 'processo-que-caiu')
+
+    async def main():
+        async with store.lock('abc'):
+            return True
+
+    assert asyncio.run(asyncio.wait_for(main(), timeout=2))
@@ -0,0 +1,54 @@
+import time
+import pytest
+import requests
+from services.cache import ClimateDataCache, collect_stale_reads
+from services.circuit_breaker import CircuitOpenError
+
+def _cache():
+    cache = ClimateDataCache()
+    cache.ttls = {'clima_por_hora': 0.01}
+    cache.stale_ttls = {'clima_por_hora': 0}
+    return cache
+
+def _fail(error):
+    def loader():
+        raise error
+    return loader
+
+def test_upstream_failure_serves_last_known_value():
+    cache = _cache()
+    assert cache.get_or_fetch('clima_por_hora', 1, lambda: 'dados') == 'dados'
+    time.sleep(0.02)
+    with collect_stale_reads() as stale:
+        value = cache.get_or_fetch('clima_por_hora', 1, _fail(requests.ConnectionError('fora do ar')))
+    assert value == 'dados'
+    assert [(r['endpoint'], r['station_id']) for r in stale] == [('clima_por_hora', 1)]
+    assert stale[0]['age_seconds'] is not None
+
+def test_open_circuit_uses_fallback_without_cache():
+    with collect_stale_reads() as stale:
+        value = _cache().get_or_fetch('clima_por_hora', 1, _fail(CircuitOpenError('icrop', 10)),
+                                      fallback=lambda: 'historico')
+    assert value == 'historico'
+    assert stale[0]['age_seconds'] is None
+
+def test_server_error_falls_back_but_client_error_is_raised():
+    cache = _cache()
+    cache.get_or_fetch('clima_por_hora', 1, lambda: 'dados')
+    time.sleep(0.02)
+
+    def http_error(status):
+        response = requests.Response()
+        response.status_code = status
+        return requests.HTTPError(response=response)
+
+    assert cache.get_or_fetch('clima_por_hora', 1, _fail(http_error(503))) == 'dados'
+    with pytest.raises(requests.HTTPError):
+        cache.get_or_fetch('clima_por_hora', 1, _fail(http_error(404)))
+
+def test_non_upstream_errors_are_raised():
+    cache = _cache()
+    cache.get_or_fetch('clima_por_hora', 1, lambda: 'dados')
+    time.sleep(0.02)
+    with pytest.raises(ValueError):
+        cache.get_or_fetch('clima_por_hora', 1, _fail(ValueError('payload inválido')))
@@ -0,0 +1,63 @@
+import numpy as np
+from agents.climate_data import ClimateDataAgent
+from services.timeseries import StationSeries
+
+KNOWN = [{'datahora': '2025-03-10 10:00:00', 'temp_med': 20.0},
+         {'datahora': '2025-03-10 09:00:00', 'temp_med': 19.0}]
+
+class FakeCache:
+    def __init__(self, series):
+        self.series = series
+
+    def peek(self, key):
+        return self.series
+
+class FakeHttp:
+    def __init__(self, records):
+        self.records = records
+        self.read = 0
+
+    def iter_json_array(self, path):
+        for record in self.records:
+            self.read += 1
+            yield record
+
+def _agent(records, known=KNOWN):
+    agent = ClimateDataAgent.__new__(ClimateDataAgent)
+    agent.history = None
+    agent.cache = FakeCache(StationSeries.from_records(known, 'datahora'))
+    agent.http = FakeHttp(records)
+    return agent
+
+def _hour(hour, temp_med):
+    return {'datahora': f'2025-03-10 {hour:02d}:00:00', 'temp_med': temp_med}
+
+def _temperatures(series):
+    return dict(zip(series.times.astype(str), series.columns['temp_med']))
+
+def test_descending_payload_stops_after_the_known_boundary():
+    agent = _agent([_hour(12, 23.0), _hour(11, 22.0), _hour(10, 20.0), _hour(9, 19.0), _hour(8, 18.0)])
+    series = agent._sync_hourly(1)
+    assert agent.http.read == 4  # lê a fronteira (10h) e para na primeira medição anterior
+    assert list(series.times) == [np.datetime64('2025-03-10T12:00:00'), np.datetime64('2025-03-10T11:00:00'),
+                                  np.datetime64('2025-03-10T10:00:00'), np.datetime64('2025-03-10T09:00:00')]
+
+def test_ascending_payload_skips_older_rows():
+    agent = _agent([_hour(8, 18.0), _hour(9, 19.0), _hour(10, 20.0), _hour(11, 22.0)])
+    series = agent._sync_hourly(1)
+    assert agent.http.read == 4
+    assert _temperatures(series) == {'2025-03-10T11:00:00': 22.0, '2025-03-10T10:00:00': 20.0,
+                                     '2025-03-10T09:00:00': 19.0}
+
+def test_payload_without_new_rows_keeps_known_series():
+    agent = _agent([_hour(10, 20.0), _hour(9, 19.0), _hour(8, 18.0)])
+    series = agent._sync_hourly(1)
+    assert agent.http.read == 2
+    assert _temperatures(series) == {'2025-03-10T10:00:00': 20.0, '2025-03-10T09:00:00': 19.0}
+
+def test_revised_boundary_row_replaces_the_known_value():
+    for records in ([_hour(11, 22.0), _hour(10, 21.5), _hour(9, 19.0)],
+                    [_hour(9, 19.0), _hour(10, 21.5), _hour(11, 22.0)]):
+        series = _agent(records)._sync_hourly(1)
+        assert _temperatures(series)['2025-03-10T10:00:00'] == 21.5
+        assert _temperatures(series)['2025-03-10T09:00:00'] == 19.0
@@ -0,0 +1,18 @@
+import unicodedata
+
+from services.text import normalize_text
+
+def _reference(text):
+    decomposed = unicodedata.normalize('NFKD', str(text).lower())
+    return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+def test_removes_accents_case_and_extra_spaces():
+    assert normalize_text("  São   Cipriano ") == "sao cipriano"
+    assert normalize_text("PARAGUAÇU") == "paraguacu"
+    assert normalize_text("") == ""
+    assert normalize_text(None) == ""
+
+def test_matches_full_unicode_normalization():
+    texts = ["previsão amanhã", "ﬁm do mês", "chuva 🌧️ hoje", "é a͏", "temperatura ℃", "Straße"]
+    for text in texts:
+        assert normalize_text(text) == _reference(text)
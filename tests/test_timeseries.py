@@ -0,0 +1,37 @@
+import math
+import numpy as np
+from services.timeseries import StationSeries, _to_float, to_datetime64
+
+def test_iso_dates_are_kept_when_a_value_is_malformed():
+    times = to_datetime64(['2025-03-12 14:00:00', '2025-03-12 15:00:00', 'bad'])
+    assert times[0] == np.datetime64('2025-03-12T14:00:00')
+    assert times[1] == np.datetime64('2025-03-12T15:00:00')
+    assert np.isnat(times[2])
+
+def test_mixed_iso_and_day_first_dates():
+    times = to_datetime64(['2025-03-12 14:00:00', '13/03/2025 15:00', '14/03/2025'])
+    assert list(times) == [np.datetime64('2025-03-12T14:00:00'), np.datetime64('2025-03-13T15:00:00'),
+                           np.datetime64('2025-03-14T00:00:00')]
+
+def test_missing_dates_become_nat():
+    times = to_datetime64([None, '', '2025-03-12'])
+    assert np.isnat(times[0]) and np.isnat(times[1])
+    assert times[2] == np.datetime64('2025-03-12T00:00:00')
+
+def test_comma_decimal_values():
+    assert _to_float('23,5') == 23.5
+    assert _to_float('1.234,5') == 1234.5
+    assert _to_float('23.5') == 23.5
+    assert _to_float(18) == 18.0
+    assert math.isnan(_to_float(None))
+    assert math.isnan(_to_float('n/d'))
+
+def test_series_from_records_with_comma_decimals():
+    series = StationSeries.from_records([
+        {'datahora': '2025-03-12 15:00:00', 'temp_med': '23,5', 'umidade': '80'},
+        {'datahora': '12/03/2025 14:00', 'temp_med': 22.1, 'umidade': None},
+    ])
+    latest = series.latest()
+    assert latest['datahora'].startswith('2025-03-12 15:00')
+    assert latest['temp_med'] == 23.5
+    assert len(series) == 2